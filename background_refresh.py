@@ -0,0 +1,171 @@
+import threading
+import time
+
+# Intervalo (em segundos) entre as consultas aos metadados no Drive
+REFRESH_INTERVAL_SECONDS = 300
+
+# Tempo máximo (em segundos) que uma sessão espera pela primeira carga dos dados
+FIRST_LOAD_TIMEOUT_SECONDS = 600
+
+# Espera (em segundos) antes da primeira nova tentativa enquanto nenhuma versão
+# foi carregada; dobra a cada falha seguida, até REFRESH_INTERVAL_SECONDS
+RETRY_INITIAL_SECONDS = 5
+
+_refresher = None
+_refresher_lock = threading.Lock()
+
+
+class Dataset:
+    """
+    Versão imutável do conjunto de dados compartilhada por todas as sessões.
+
+    Parameters:
+        data (pd.DataFrame): Frame de multas já limpo (e geocodificado).
+        version (str): Versão dos dados (a de df.attrs["versao_dados"]).
+        loaded_at (float): Instante (time.time()) em que a versão ficou pronta.
+    """
+
+    def __init__(self, data, version, loaded_at):
+        self.data = data
+        self.version = version
+        self.loaded_at = loaded_at
+
+
+class BackgroundRefresher:
+    """
+    Mantém o conjunto de dados atualizado fora das execuções do script.
+
+    Uma thread consulta periodicamente a versão dos dados na origem ('probe',
+    barata: só metadados) e, quando ela difere da versão em uso, reconstrói o
+    conjunto ('load' e depois 'prepare', por exemplo geocodificação) e troca a
+    referência atual de uma só vez. As sessões apenas leem current(), sem
+    bloqueio; uma versão com falha nunca substitui a anterior.
+
+    Apenas uma reconstrução roda por vez (single-flight): quem chama refresh()
+    enquanto outra está em andamento não inicia uma segunda.
+
+    Enquanto nenhuma versão foi carregada, as falhas são repetidas com espera
+    exponencial (de 'retry_initial' segundos até 'interval'). A exceção original
+    da última falha fica em last_exception.
+
+    Parameters:
+        load (callable): Retorna o DataFrame limpo; em caso de falha, lança uma exceção.
+        probe (callable): Retorna a versão atual na origem, ou None se desconhecida.
+        prepare (callable | None): Recebe o DataFrame e o completa antes da troca.
+        interval (float): Segundos entre as consultas a 'probe'.
+        retry_initial (float): Primeira espera após uma falha sem versão carregada.
+    """
+
+    def __init__(self, load, probe, prepare=None, interval=REFRESH_INTERVAL_SECONDS,
+                 retry_initial=RETRY_INITIAL_SECONDS):
+        self.load = load
+        self.probe = probe
+        self.prepare = prepare
+        self.interval = interval
+        self.retry_initial = retry_initial
+        self.last_exception = None
+        self._consecutive_failures = 0
+        self._current = None
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._refresh_lock = threading.Lock()
+        self._thread = None
+        self.stats = {"checks": 0, "refreshes": 0, "failures": 0, "skipped": 0,
+                      "last_check": None, "last_duration": None, "last_error": None}
+
+    def current(self):
+        """Retorna a versão em uso (Dataset) ou None se nenhuma carga terminou."""
+        return self._current
+
+    def wait_ready(self, timeout=FIRST_LOAD_TIMEOUT_SECONDS):
+        """Espera a primeira carga e retorna a versão em uso (ou None ao esgotar o tempo)."""
+        self._ready.wait(timeout)
+        return self._current
+
+    def refresh(self, force=False):
+        """
+        Reconstrói o conjunto se a versão na origem mudou (ou se 'force').
+
+        Returns:
+            bool: True se uma nova versão foi publicada; False se nada mudou, se
+            outra reconstrução já estava em andamento ou se a carga falhou (a
+            exceção fica em last_exception).
+        """
+        if not self._refresh_lock.acquire(blocking=False):
+            self.stats["skipped"] += 1
+            return False
+        try:
+            self.stats["checks"] += 1
+            self.stats["last_check"] = time.time()
+            version = self.probe()
+            if not force and version is not None and self._current is not None \
+                    and version == self._current.version:
+                return False
+
+            inicio = time.perf_counter()
+            data = self.load()
+            if data is None:
+                raise ValueError("A carga não retornou dados.")
+            if self.prepare is not None:
+                data = self.prepare(data)
+            self._current = Dataset(data, data.attrs.get("versao_dados") or version, time.time())
+            self.stats["refreshes"] += 1
+            self.stats["last_duration"] = time.perf_counter() - inicio
+            self.stats["last_error"] = None
+            self.last_exception = None
+            self._consecutive_failures = 0
+            return True
+        except Exception as e:
+            self.stats["failures"] += 1
+            self.stats["last_error"] = f"{type(e).__name__}: {e}"
+            self.last_exception = e
+            self._consecutive_failures += 1
+            print(f"Erro ao atualizar os dados em segundo plano: {self.stats['last_error']}")
+            return False
+        finally:
+            self._refresh_lock.release()
+            if self._current is not None:
+                self._ready.set()
+
+    def next_wait(self):
+        """Segundos até a próxima consulta: o intervalo normal ou, sem versão carregada após falhas, a espera exponencial."""
+        if self._current is not None or not self._consecutive_failures:
+            return self.interval
+        return min(self.retry_initial * 2 ** (self._consecutive_failures - 1), self.interval)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.refresh()
+            if self._current is None and self.last_exception is not None:
+                # Sem nenhuma versão válida, libera quem espera para exibir o erro
+                self._ready.set()
+            self._stop.wait(self.next_wait())
+
+    def start(self):
+        """Inicia a thread de atualização (uma única vez)."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="background-refresh", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        """Pede o encerramento da thread e espera por ele."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+def get_background_refresher(load, probe, prepare=None, interval=REFRESH_INTERVAL_SECONDS):
+    """
+    Retorna o atualizador do processo, criando-o e iniciando-o na primeira
+    chamada; as chamadas seguintes (outras sessões e reruns) o reaproveitam e
+    ignoram os argumentos.
+
+    Returns:
+        BackgroundRefresher: O atualizador compartilhado.
+    """
+    global _refresher
+    with _refresher_lock:
+        if _refresher is None:
+            _refresher = BackgroundRefresher(load, probe, prepare, interval).start()
+        return _refresher
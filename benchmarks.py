@@ -0,0 +1,526 @@
+import io
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+import openpyxl
+from tests.helpers import (
+    DriveLocal, formatar_real, gerar_frame_multas_sintetico, gerar_planilha_sintetica, servidor_opencage_local,
+)
+
+
+def medir(funcao, *args):
+    """
+    Executa a função medindo tempo de parede e pico de memória alocada.
+    O tempo é medido numa execução sem tracemalloc, que distorce o tempo de
+    código Python puro; o pico de memória, numa segunda execução rastreada.
+    Argumentos que sejam buffers são rebobinados entre as execuções.
+
+    Returns:
+        tuple: (resultado, segundos, pico em MB)
+    """
+    inicio = time.perf_counter()
+    resultado = funcao(*args)
+    segundos = time.perf_counter() - inicio
+
+    for arg in args:
+        if hasattr(arg, "seek"):
+            arg.seek(0)
+    tracemalloc.start()
+    funcao(*args)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return resultado, segundos, pico / (1024 * 1024)
+
+
+def benchmark_leitura_planilha(n_linhas=500_000):
+    """Compara pd.read_excel completo com os leitores com projeção de colunas."""
+    from data_loader import LEITORES_PLANILHA
+
+    planilha = gerar_planilha_sintetica(n_linhas).getvalue()
+    candidatos = {"pd.read_excel (atual)": lambda buffer: pd.read_excel(buffer)}
+    candidatos.update(LEITORES_PLANILHA)
+    for nome, leitor in candidatos.items():
+        try:
+            df, segundos, pico = medir(leitor, io.BytesIO(planilha))
+        except ImportError as e:
+            print(f"{nome}: indisponível ({e})")
+            continue
+        print(f"{nome}: {segundos:.2f}s, pico {pico:.1f} MB, {df.shape[1]} colunas")
+
+
+def _executar_medindo_rss(fila, funcao, args):
+    """Executa a função no processo filho e envia o acréscimo do pico de RSS (MB) e a duração."""
+    inicial = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    inicio = time.perf_counter()
+    resultado = funcao(*args)
+    segundos = time.perf_counter() - inicio
+    pico = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - inicial) / 1024
+    fila.put((pico, segundos, len(resultado)))
+
+
+def medir_pico_rss(funcao, *args):
+    """
+    Executa a função num processo separado, para que o pico de RSS medido
+    (ru_maxrss) seja apenas o dela. O RSS herdado do processo pai no fork é
+    descontado.
+
+    Returns:
+        tuple: (acréscimo do pico de RSS em MB, segundos, número de linhas do resultado)
+    """
+    contexto = multiprocessing.get_context("fork")
+    fila = contexto.Queue()
+    processo = contexto.Process(target=_executar_medindo_rss, args=(fila, funcao, args))
+    processo.start()
+    resultado = fila.get()
+    processo.join()
+    return resultado
+
+
+def _limpeza_atual(buffer):
+    """Fluxo anterior: lê tudo, padroniza tudo e só então filtra as não pagas."""
+    from data_loader import padronizar_dataframe
+
+    df = padronizar_dataframe(pd.read_excel(buffer))
+    return df[df['Status de Pagamento'] == 'NÃO PAGO']
+
+
+def _ler_em_lotes(buffer, tamanho_lote, motor=None):
+    """Só percorre os lotes da planilha, sem limpeza; devolve as linhas lidas."""
+    from data_loader import ler_planilha_em_lotes
+
+    return range(sum(len(lote) for lote in ler_planilha_em_lotes(buffer, tamanho_lote, motor)))
+
+
+def benchmark_limpeza_em_lotes(n_linhas=200_000, proporcao_pagas=0.9):
+    """
+    Compara o pico de RSS do fluxo completo com o pipeline em lotes, este com
+    o leitor padrão (o usado na carga), e o da leitura sozinha: a planilha
+    inteira de uma vez e em lotes de tamanhos diferentes, com cada leitor.
+    """
+    from data_loader import carregar_multas_nao_pagas, ler_planilha, motor_planilha_padrao
+
+    planilha = gerar_planilha_sintetica(n_linhas, proporcao_pagas).getvalue()
+    motor = motor_planilha_padrao()
+    candidatos = {
+        "leitura completa + filtro final (atual)": _limpeza_atual,
+        f"pipeline em lotes ({motor})": carregar_multas_nao_pagas,
+        f"só leitura, planilha inteira ({motor})": ler_planilha,
+    }
+    for leitor, tamanho_lote in ((motor, 5_000), (motor, 50_000), ("openpyxl", 5_000)):
+        candidatos[f"só leitura, lotes de {tamanho_lote} ({leitor})"] = (
+            lambda buffer, tamanho_lote=tamanho_lote, leitor=leitor: _ler_em_lotes(buffer, tamanho_lote, leitor))
+    for nome, funcao in candidatos.items():
+        pico, segundos, linhas = medir_pico_rss(funcao, io.BytesIO(planilha))
+        print(f"{nome}: pico RSS +{pico:.1f} MB, {segundos:.2f}s, {linhas} linhas")
+
+
+def _moeda_regex(serie):
+    """Conversão anterior, baseada em substituições com expressões regulares."""
+    return pd.to_numeric(serie.replace({r'[^\d,]': '', ',': '.'}, regex=True), errors='coerce')
+
+
+def benchmark_conversao_moeda(n_valores=1_000_000, n_distintos=None):
+    """
+    Compara a conversão vetorizada de valores monetários com o caminho por regex
+    em 'n_valores' textos no formato 'R$ 1.234,56', conferindo que os resultados
+    são idênticos.
+    """
+    from data_loader import process_currency_column, _converter_textos_moeda
+
+    rng = np.random.default_rng(0)
+    centavos = rng.integers(0, 10_000_000, n_distintos or n_valores)
+    textos = pd.Series([formatar_real(c) for c in centavos], dtype=object)
+    if n_distintos:
+        textos = textos.sample(n_valores, replace=True, random_state=0).reset_index(drop=True)
+
+    esperado, segundos_regex, _ = medir(_moeda_regex, textos)
+    obtido, segundos_vetorizado, _ = medir(process_currency_column, textos)
+    _, segundos_sem_dedup, _ = medir(_converter_textos_moeda, textos.to_numpy(dtype=str))
+    assert np.allclose(esperado.to_numpy(), obtido.to_numpy()), "Resultados divergentes"
+    print(f"regex (atual): {segundos_regex:.2f}s")
+    print(f"vetorizado: {segundos_vetorizado:.2f}s ({segundos_regex / segundos_vetorizado:.1f}x)")
+    print(f"vetorizado sem deduplicação: {segundos_sem_dedup:.2f}s")
+
+
+def _datas_inferencia(serie):
+    """Conversão anterior, com inferência de formato a cada chamada."""
+    return pd.to_datetime(serie, dayfirst=True, errors='coerce')
+
+
+def benchmark_conversao_datas(n_valores=1_000_000):
+    """
+    Compara a conversão de datas com formato inferido e deduplicação com
+    pd.to_datetime(dayfirst=True) em 'n_valores' textos 'dd/mm/aaaa'.
+    """
+    from data_loader import process_date_column
+
+    rng = np.random.default_rng(0)
+    dias = pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 1_800, n_valores), unit="D")
+    textos = pd.Series(dias.strftime("%d/%m/%Y"), dtype=object)
+
+    esperado, segundos_atual, _ = medir(_datas_inferencia, textos)
+    obtido, segundos_novo, _ = medir(process_date_column, textos)
+    assert (esperado.to_numpy() == obtido.to_numpy()).all(), "Resultados divergentes"
+    _, segundos_ja_convertido, _ = medir(process_date_column, obtido)
+    print(f"pd.to_datetime(dayfirst=True) (atual): {segundos_atual:.2f}s")
+    print(f"formato inferido + deduplicação: {segundos_novo:.2f}s ({segundos_atual / segundos_novo:.1f}x)")
+    print(f"coluna já em datetime64: {segundos_ja_convertido * 1000:.3f}ms")
+
+
+def _geocodificacao_por_linha(df, api_key, cache):
+    """Fluxo anterior: uma chamada por linha, com gravação do cache a cada ausência."""
+    from geo_utils import get_cached_coordinates
+
+    # Sem limite de taxa efetivo, como no fluxo em lote: a imitação local não tem cota
+    df[['Latitude', 'Longitude']] = df['Local da Infração'].astype(object).apply(
+        lambda x: pd.Series(get_cached_coordinates(x, api_key, cache, rate_limit=10_000))
+    )
+    return df
+
+
+def benchmark_geocodificacao_lote(n_linhas=100_000, n_locais=2_000):
+    """
+    Compara a geocodificação linha a linha com a geocodificação em lote, com o
+    cache inicialmente vazio e depois aquecido, contra um OpenCage local.
+    """
+    import geo_utils
+    from cache_manager import JsonFileCache
+
+    rng = np.random.default_rng(0)
+    locais = [f"RUA {i} -CIDADE {i % 50}" for i in range(n_locais)]
+    df = pd.DataFrame({"Local da Infração": pd.Series(rng.choice(locais, n_linhas)).astype("category")})
+    candidatos = {
+        "por linha (atual)": _geocodificacao_por_linha,
+        # Sem limite de taxa efetivo: a imitação local não tem cota
+        "em lote": lambda df, api_key, cache: geo_utils.add_coordinates(
+            df, api_key, cache, max_workers=16, rate_limit=10_000
+        ),
+    }
+    with tempfile.TemporaryDirectory() as pasta, servidor_opencage_local() as servidor:
+        for nome, funcao in candidatos.items():
+            cache = JsonFileCache(os.path.join(pasta, f"{nome}.json"))
+            for estado in ("cache vazio", "cache aquecido"):
+                servidor.RequestHandlerClass.chamadas = 0
+                resultado, segundos, _ = medir(funcao, df.copy(), "chave", cache)
+                print(f"{nome}, {estado}: {segundos:.2f}s, "
+                      f"{servidor.RequestHandlerClass.chamadas} chamadas à API")
+
+
+def benchmark_armazenamento_coordenadas(n_entradas=50_000, n_consultas=2_000, n_novas=200):
+    """
+    Compara o cache JSON monolítico com o GeocodeStore (SQLite) em 'n_entradas':
+    custo de abrir/carregar, de consultar 'n_consultas' chaves e de gravar
+    'n_novas' entradas uma a uma (como no fluxo antigo) e em lote.
+    """
+    from geo_store import GeocodeStore
+
+    rng = np.random.default_rng(0)
+    cache = {f"RUA {i} -CIDADE {i % 500}": [float(rng.uniform(-33, 5)), float(rng.uniform(-73, -35))]
+             for i in range(n_entradas)}
+    consultas = [f"RUA {i} -CIDADE {i % 500}" for i in rng.integers(0, n_entradas * 2, n_consultas)]
+    novas = {f"NOVA {i}": (1.0, 2.0) for i in range(n_novas)}
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho_json = os.path.join(pasta, "cache.json")
+        with open(caminho_json, "w") as file:
+            json.dump(cache, file)
+        store = GeocodeStore(os.path.join(pasta, "geocodes.sqlite3"))
+        store.import_json(caminho_json)
+
+        def carregar_json():
+            with open(caminho_json) as file:
+                return json.load(file)
+
+        def gravar_json_uma_a_uma(dados):
+            for chave, coords in novas.items():
+                dados[chave] = coords
+                with open(caminho_json, "w") as file:
+                    json.dump(dados, file)
+
+        def gravar_store_uma_a_uma():
+            for chave, coords in novas.items():
+                store.upsert_many({chave: coords})
+
+        dados, t_json_carga, _ = medir(carregar_json)
+        _, t_store_carga, _ = medir(lambda: GeocodeStore(store.path))
+        _, t_json_consulta, _ = medir(lambda: {c: dados[c] for c in consultas if c in dados})
+        _, t_store_consulta, _ = medir(lambda: store.get_many(consultas))
+        _, t_json_escrita, _ = medir(lambda: gravar_json_uma_a_uma(carregar_json()))
+        _, t_store_escrita, _ = medir(gravar_store_uma_a_uma)
+        _, t_store_lote, _ = medir(lambda: store.upsert_many(novas))
+
+    print(f"carregar/abrir: JSON {t_json_carga * 1000:.1f}ms, SQLite {t_store_carga * 1000:.1f}ms")
+    print(f"{n_consultas} consultas: JSON (já carregado) {t_json_consulta * 1000:.1f}ms, "
+          f"SQLite {t_store_consulta * 1000:.1f}ms")
+    print(f"{n_novas} gravações uma a uma: JSON {t_json_escrita:.2f}s, SQLite {t_store_escrita * 1000:.1f}ms")
+    print(f"{n_novas} gravações em lote: SQLite {t_store_lote * 1000:.1f}ms")
+
+
+def benchmark_indice_espacial(n_linhas=100_000, n_pontos=5_000, n_cliques=1_000, casas=6):
+    """
+    Compara a busca da multa clicada no mapa por igualdade exata (varredura de
+    todas as linhas) com o SpatialIndex, em 'n_linhas' multas distribuídas por
+    'n_pontos' coordenadas. Os cliques chegam arredondados a 'casas' decimais,
+    como o Leaflet pode devolvê-los.
+    """
+    from spatial_index import SpatialIndex
+
+    rng = np.random.default_rng(0)
+    pontos_lat = rng.uniform(-33, 5, n_pontos)
+    pontos_lng = rng.uniform(-73, -35, n_pontos)
+    escolhidos = rng.integers(0, n_pontos, n_linhas)
+    df = pd.DataFrame({"Latitude": pontos_lat[escolhidos], "Longitude": pontos_lng[escolhidos]})
+    cliques = rng.integers(0, n_pontos, n_cliques)
+    cliques_lat = np.round(pontos_lat[cliques], casas)
+    cliques_lng = np.round(pontos_lng[cliques], casas)
+
+    def busca_exata():
+        return [np.flatnonzero((df["Latitude"] == lat) & (df["Longitude"] == lng))
+                for lat, lng in zip(cliques_lat, cliques_lng)]
+
+    def busca_indice():
+        return [indice.query(lat, lng) for lat, lng in zip(cliques_lat, cliques_lng)]
+
+    indice, t_construcao, _ = medir(lambda: SpatialIndex.from_frame(df))
+    exatos, t_exata, _ = medir(busca_exata)
+    encontrados, t_indice, _ = medir(busca_indice)
+    esperados = [np.flatnonzero(escolhidos == c) for c in cliques]
+    corretos = sum(np.array_equal(np.sort(a), b) for a, b in zip(encontrados, esperados))
+
+    print(f"{n_linhas} linhas, {len(indice)} coordenadas distintas; índice construído em {t_construcao * 1000:.1f}ms")
+    print(f"{n_cliques} cliques (arredondados a {casas} casas): igualdade exata {t_exata:.2f}s "
+          f"({sum(len(e) > 0 for e in exatos)} encontrados), "
+          f"índice {t_indice * 1000:.1f}ms ({corretos} corretos)")
+
+
+def benchmark_renderizacao_mapa(n_multas=50_000, n_locais=2_000):
+    """
+    Compara o mapa com um marcador por multa com o mapa agregado por local e
+    agrupado no navegador e com a camada de densidade: tempo de montagem +
+    renderização do HTML e tamanho do HTML que o Streamlit envia ao navegador,
+    com 'n_multas' em 'n_locais' pontos.
+    """
+    from graph_geo_distribution import (
+        MAP_MODE_CLUSTERED, MAP_MODE_DENSITY, MAP_MODE_INDIVIDUAL, build_fines_map, get_fines_map, new_map_cache
+    )
+
+    rng = np.random.default_rng(0)
+    locais_lat = rng.uniform(-33, 5, n_locais)
+    locais_lng = rng.uniform(-73, -35, n_locais)
+    escolhidos = rng.integers(0, n_locais, n_multas)
+    map_data = pd.DataFrame({
+        "Local da Infração": pd.Categorical([f"RUA {i} -CIDADE" for i in escolhidos]),
+        "Valor a ser pago R$": rng.uniform(88, 2_000, n_multas).round(2),
+        "Data da Infração": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 365, n_multas), unit="D"),
+        "Latitude": locais_lat[escolhidos],
+        "Longitude": locais_lng[escolhidos],
+    })
+
+    for modo in (MAP_MODE_INDIVIDUAL, MAP_MODE_CLUSTERED, MAP_MODE_DENSITY):
+        # Sem medir(): a execução rastreada pelo tracemalloc levaria minutos no modo individual
+        inicio = time.perf_counter()
+        html_mapa = build_fines_map(map_data, modo).get_root().render()
+        tempo = time.perf_counter() - inicio
+        print(f"{modo}: {tempo:.2f}s, HTML {len(html_mapa.encode()) / 2**20:.2f} MiB")
+
+    # Rerun sem mudança nos dados: o mapa vem do cache da sessão
+    cache = new_map_cache()
+    _, t_primeira, _ = medir(lambda: get_fines_map(map_data, new_map_cache()))
+    get_fines_map(map_data, cache)
+    _, t_repetida, _ = medir(lambda: get_fines_map(map_data, cache))
+    print(f"get_fines_map ({MAP_MODE_CLUSTERED}): montagem {t_primeira * 1000:.1f}ms, "
+          f"reaproveitado do cache {t_repetida * 1000:.1f}ms")
+
+
+def benchmark_cubo_diario(n_linhas=1_000_000, n_periodos=20):
+    """
+    Compara, em 'n_linhas' multas, o caminho por linhas (filtro por período +
+    métricas, ranking de locais, infrações e dias da semana) com o DailyCube,
+    verificando que os resultados são os mesmos em 'n_periodos' períodos.
+    """
+    from daily_cube import DailyCube
+    from data_processing import calcular_metricas, calcular_ranking_localidades, filtrar_dados_por_periodo
+    from graph_common_infractions import get_infraction_frequencies
+    from graph_weekday_infractions import get_weekday_counts
+
+    df = gerar_frame_multas_sintetico(n_linhas)
+    rng = np.random.default_rng(1)
+    inicios = pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 300, n_periodos), unit="D")
+    periodos = [(inicio, inicio + pd.Timedelta(days=int(d))) for inicio, d in zip(inicios, rng.integers(0, 120, n_periodos))]
+
+    def por_linhas(inicio, fim):
+        filtrado = filtrar_dados_por_periodo(df, inicio, fim)
+        return (calcular_metricas(filtrado), calcular_ranking_localidades(filtrado),
+                get_infraction_frequencies(filtrado), get_weekday_counts(filtrado))
+
+    def pelo_cubo(inicio, fim):
+        return (cubo.metrics(inicio, fim), cubo.location_ranking(inicio, fim),
+                cubo.infraction_frequencies(inicio, fim), cubo.weekday_counts(inicio, fim))
+
+    cubo, t_construcao, pico = medir(lambda: DailyCube(df))
+    esperados, t_linhas, _ = medir(lambda: [por_linhas(*periodo) for periodo in periodos])
+    obtidos, t_cubo, _ = medir(lambda: [pelo_cubo(*periodo) for periodo in periodos])
+    for esperado, obtido in zip(esperados, obtidos):
+        assert esperado[0][0] == obtido[0][0] and esperado[0][2] == obtido[0][2]
+        assert np.isclose(esperado[0][1], obtido[0][1])
+        # Valores empatados podem trocar de posição no ranking: a soma do cubo é
+        # exata (centavos) e a do groupby difere dela no último bit
+        for tabela_esperada, tabela_obtida in zip(esperado[1:], obtido[1:]):
+            pd.testing.assert_frame_equal(tabela_esperada.sort_index(), tabela_obtida.sort_index())
+
+    print(f"{n_linhas} linhas: cubo construído em {t_construcao:.2f}s (pico {pico:.0f} MB)")
+    print(f"por período: linhas {t_linhas / n_periodos * 1000:.1f}ms, cubo {t_cubo / n_periodos * 1000:.1f}ms "
+          f"({n_periodos} períodos, resultados idênticos)")
+
+
+def benchmark_filtro_periodo(n_linhas=1_000_000, n_periodos=20):
+    """
+    Mede o custo, por rerun, do filtro por período em 'n_linhas' multas:
+    comparação linha a linha (máscara booleana) contra busca binária no
+    frame ordenado por 'Dia da Consulta' e na permutação de 'Data da Infração'.
+    """
+    from data_processing import filtrar_dados_por_periodo, obter_indice_datas, ordenar_por_data
+
+    df = gerar_frame_multas_sintetico(n_linhas)
+    ordenado, t_ordenacao, _ = medir(lambda: ordenar_por_data(df.copy()))
+    _, t_remarcacao, _ = medir(lambda: ordenar_por_data(ordenado))
+    _, t_permutacao, _ = medir(lambda: obter_indice_datas(ordenado, 'Data da Infração'))
+
+    rng = np.random.default_rng(1)
+    inicios = pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 300, n_periodos), unit="D")
+    periodos = [(inicio, inicio + pd.Timedelta(days=int(d))) for inicio, d in zip(inicios, rng.integers(0, 120, n_periodos))]
+
+    print(f"{n_linhas} linhas: ordenação {t_ordenacao:.2f}s (uma vez, no snapshot); "
+          f"verificação de frame já ordenado {t_remarcacao * 1000:.1f}ms; "
+          f"permutação de 'Data da Infração' {t_permutacao * 1000:.1f}ms (uma vez por frame)")
+    for coluna in ('Dia da Consulta', 'Data da Infração'):
+        _, t_mascara, _ = medir(lambda: [ordenado[(ordenado[coluna] >= a) & (ordenado[coluna] <= b)] for a, b in periodos])
+        resultados, t_indice, _ = medir(lambda: [filtrar_dados_por_periodo(ordenado, a, b, coluna) for a, b in periodos])
+        linhas = sum(len(r) for r in resultados) / n_periodos
+        print(f"{coluna} (média de {linhas:.0f} linhas por período): linha a linha {t_mascara / n_periodos * 1000:.1f}ms, "
+              f"busca binária {t_indice / n_periodos * 1000:.2f}ms")
+
+
+def _planilha_de_frame(df):
+    """Grava um DataFrame bruto (como lido da planilha) num buffer .xlsx."""
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(list(df.columns))
+    for linha in df.itertuples(index=False):
+        sheet.append(list(linha))
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    buffer.seek(0)
+    return buffer
+
+
+def benchmark_atualizacao_incremental(n_linhas=200_000, n_novas=2_000, n_alteradas=1_000):
+    """
+    Compara a recarga completa com a atualização incremental da base por Auto de
+    Infração quando a planilha ganha 'n_novas' consultas e 'n_alteradas' multas
+    mudam de status (pagas numa consulta mais recente).
+    """
+    from data_loader import (atualizar_base, carregar_multas_nao_pagas, ler_planilha_em_lotes,
+                             multas_nao_pagas_da_base)
+
+    original = gerar_planilha_sintetica(n_linhas, proporcao_pagas=0.5)
+    bruto = pd.concat(ler_planilha_em_lotes(original), ignore_index=True)
+    base, _, hashes = atualizar_base(None, io.BytesIO(original.getvalue()))
+
+    rng = np.random.default_rng(2)
+    alteradas = bruto.iloc[rng.choice(n_linhas, n_alteradas, replace=False)].copy()
+    alteradas["Status de Pagamento"] = "PAGO"
+    alteradas["Dia da Consulta"] = "31/12/2024"
+    novas = bruto.iloc[:n_novas].copy()
+    novas["Auto de Infração"] = [f"N{i:08d}" for i in range(n_novas)]
+    novas["Dia da Consulta"] = "31/12/2024"
+    atualizada = _planilha_de_frame(pd.concat([bruto, alteradas, novas], ignore_index=True)).getvalue()
+
+    completo, t_completo, pico_completo = medir(carregar_multas_nao_pagas, io.BytesIO(atualizada))
+    (nova_base, resumo, hashes), t_incremental, pico_incremental = medir(
+        atualizar_base, base, io.BytesIO(atualizada), hashes)
+    (_, resumo_repetido, _), t_repetido, _ = medir(atualizar_base, nova_base, io.BytesIO(atualizada), hashes)
+    _, t_leitura, _ = medir(lambda: sum(len(lote) for lote in ler_planilha_em_lotes(io.BytesIO(atualizada))))
+
+    # A recarga completa mantém a consulta antiga (não paga) das multas pagas depois; a base, só a mais recente
+    esperado = set(completo['Auto de Infração']) - set(alteradas['Auto de Infração'])
+    iguais = esperado == set(multas_nao_pagas_da_base(nova_base)['Auto de Infração'])
+    print(f"{n_linhas} linhas + {n_novas} novas + {n_alteradas} alteradas: resumo {resumo}")
+    print(f"recarga completa {t_completo:.2f}s (pico {pico_completo:.1f} MB); "
+          f"incremental {t_incremental:.2f}s (pico {pico_incremental:.1f} MB), "
+          f"dos quais {t_leitura:.2f}s de leitura do .xlsx; mesmas multas não pagas: {iguais}")
+    print(f"reprocessar a mesma planilha: {t_repetido:.2f}s, resumo {resumo_repetido}")
+
+
+def benchmark_historico_pasta(n_planilhas=6, n_linhas=20_000):
+    """
+    Monta um histórico a partir de 'n_planilhas' mensais numa pasta local
+    (DriveLocal), com metade dos Autos de cada mês repetidos no mês seguinte,
+    comparando a leitura sequencial com a paralela e validando a deduplicação.
+    """
+    import data_loader
+
+    bruto = pd.concat(data_loader.ler_planilha_em_lotes(gerar_planilha_sintetica(n_linhas)), ignore_index=True)
+    with tempfile.TemporaryDirectory() as pasta, tempfile.TemporaryDirectory() as trabalho:
+        for mes in range(1, n_planilhas + 1):
+            planilha = bruto.assign(**{
+                "Auto de Infração": [f"A{i + (mes - 1) * n_linhas // 2:08d}" for i in range(n_linhas)],
+                "Dia da Consulta": f"01/{mes:02d}/2025",
+            })
+            with open(os.path.join(pasta, f"resultado_2025_{mes:02d}.xlsx"), "wb") as f:
+                f.write(_planilha_de_frame(planilha).getbuffer())
+
+        drive = DriveLocal(pasta)
+        diretorio_original = os.getcwd()
+        os.chdir(trabalho)
+        try:
+            arquivos = data_loader.listar_planilhas_pasta(drive, "pasta")
+            _, t_sequencial, _ = medir(lambda: [data_loader.limpar_planilha_historico(
+                data_loader.baixar_se_modificado(drive, a["id"], a).getvalue()) for a in arquivos])
+            inicio = time.perf_counter()
+            df = data_loader.load_data_historico(drive, "pasta")
+            t_paralelo = time.perf_counter() - inicio
+            inicio = time.perf_counter()
+            repetido = data_loader.load_data_historico(drive, "pasta")
+            t_repetido = time.perf_counter() - inicio
+        finally:
+            os.chdir(diretorio_original)
+
+    autos_esperados = n_linhas + (n_planilhas - 1) * n_linhas // 2
+    nao_pagas = bruto["Status de Pagamento"].eq("NÃO PAGO").to_numpy()
+    print(f"{len(arquivos)} planilhas de {n_linhas} linhas: sequencial {t_sequencial:.2f}s, "
+          f"paralelo (downloads em threads, leitura em processos) {t_paralelo:.2f}s, "
+          f"sem planilhas novas {t_repetido:.2f}s")
+    print(f"{len(df)} multas não pagas (esperadas até {autos_esperados} Autos, {nao_pagas.mean():.0%} não pagos); "
+          f"Autos únicos: {df['Auto de Infração'].is_unique}; "
+          f"consultas por mês: {df['Dia da Consulta'].dt.month.value_counts().sort_index().to_dict()}; "
+          f"mesma versão na segunda carga: {df.attrs == repetido.attrs}")
+
+
+BENCHMARKS = {
+    "leitura": benchmark_leitura_planilha,
+    "lotes": benchmark_limpeza_em_lotes,
+    "moeda": benchmark_conversao_moeda,
+    "datas": benchmark_conversao_datas,
+    "geocodificacao": benchmark_geocodificacao_lote,
+    "armazenamento": benchmark_armazenamento_coordenadas,
+    "indice_espacial": benchmark_indice_espacial,
+    "mapa": benchmark_renderizacao_mapa,
+    "cubo": benchmark_cubo_diario,
+    "filtro": benchmark_filtro_periodo,
+    "incremental": benchmark_atualizacao_incremental,
+    "historico": benchmark_historico_pasta,
+}
+
+if __name__ == "__main__":
+    # Uso: python benchmarks.py [nome ...]
+    for nome in sys.argv[1:] or BENCHMARKS:
+        print(f"== {nome} ==")
+        BENCHMARKS[nome]()
@@ -1,44 +1,279 @@
+import abc
 import json
 import os
+import threading
+import time
+from collections import OrderedDict
 import streamlit as st
 
 # Caminho para o arquivo de cache
 CACHE_FILE = os.path.join(os.getcwd(), "coordinates_cache.json")
 
-def load_cache():
-    """Carregar o cache de coordenadas se disponível ou do secrets.toml"""
-    cache = {}
-    
-    # Verificar se há coordenadas no secrets.toml
-    if "coordinates" in st.secrets["image"]:
-        coordinates = st.secrets["image"]["coordinates"]
-        # Caso as coordenadas estejam no secrets, as retornamos
-        cache["coordinates"] = coordinates
-        return cache
-    
-    # Caso contrário, buscamos o cache do arquivo
-    if os.path.exists(CACHE_FILE):
+# Número máximo de entradas mantidas na camada em memória
+MEMORY_MAX_ENTRIES = 20_000
+
+
+class CacheBackend(abc.ABC):
+    """
+    Interface comum dos caches de chave -> valor.
+
+    As operações trabalham em lote: get_many retorna apenas as chaves presentes
+    (um valor None é uma entrada válida, por exemplo "sem resultado") e set_many
+    grava várias entradas de uma vez. Cada backend mantém contadores de acertos,
+    ausências e remoções, consultados por stats().
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._stats_lock = threading.Lock()
+
+    @abc.abstractmethod
+    def get_many(self, keys):
+        """Retorna chave -> valor das chaves presentes."""
+
+    @abc.abstractmethod
+    def set_many(self, items):
+        """Grava as entradas do dicionário 'items'."""
+
+    def get(self, key, default=None):
+        """Busca uma única chave; retorna 'default' se ausente."""
+        return self.get_many([key]).get(key, default)
+
+    @abc.abstractmethod
+    def __len__(self):
+        """Retorna o número de entradas."""
+
+    def _count(self, hits, misses, evictions=0):
+        with self._stats_lock:
+            self.hits += hits
+            self.misses += misses
+            self.evictions += evictions
+
+    def stats(self):
+        """Retorna os contadores de acertos, ausências e remoções e o tamanho atual."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self),
+        }
+
+
+class MemoryLRUCache(CacheBackend):
+    """
+    Cache em memória limitado a 'max_entries' entradas e, opcionalmente, a
+    'max_bytes' bytes (medidos por 'sizeof' a cada gravação), removendo as
+    usadas há mais tempo. Entradas com valor None ("sem resultado") expiram
+    após 'none_ttl' segundos, se informado. Seguro entre threads.
+    """
+
+    def __init__(self, max_entries=MEMORY_MAX_ENTRIES, max_bytes=None, sizeof=None, none_ttl=None):
+        super().__init__()
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.none_ttl = none_ttl
+        self.bytes = 0
+        self._data = OrderedDict()
+        self._sizes = {}
+        self._expires = {}
+        self._lock = threading.Lock()
+
+    def _remove(self, key):
+        del self._data[key]
+        self.bytes -= self._sizes.pop(key, 0)
+        self._expires.pop(key, None)
+
+    def get_many(self, keys):
+        found = {}
+        now = time.monotonic()
+        with self._lock:
+            for key in keys:
+                if key in self._data:
+                    if self._expires.get(key, now + 1) <= now:
+                        self._remove(key)
+                        continue
+                    self._data.move_to_end(key)
+                    found[key] = self._data[key]
+        self._count(len(found), len(set(keys)) - len(found))
+        return found
+
+    def set_many(self, items):
+        sizes = {key: self.sizeof(value) for key, value in items.items()} if self.sizeof else {}
+        expires = time.monotonic() + self.none_ttl if self.none_ttl is not None else None
+        evicted = 0
+        with self._lock:
+            for key, value in items.items():
+                self.bytes += sizes.get(key, 0) - self._sizes.pop(key, 0)
+                if key in sizes:
+                    self._sizes[key] = sizes[key]
+                if value is None and expires is not None:
+                    self._expires[key] = expires
+                else:
+                    self._expires.pop(key, None)
+                self._data[key] = value
+                self._data.move_to_end(key)
+            while len(self._data) > self.max_entries or (
+                self.max_bytes is not None and self.bytes > self.max_bytes and len(self._data) > 1
+            ):
+                self._remove(next(iter(self._data)))
+                evicted += 1
+        self._count(0, 0, evicted)
+
+    def entry_sizes(self):
+        """Retorna chave -> bytes de cada entrada (0 sem 'sizeof'), da menos à mais recente."""
+        with self._lock:
+            return {key: self._sizes.get(key, 0) for key in self._data}
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._sizes.clear()
+            self._expires.clear()
+            self.bytes = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        stats = super().stats()
+        stats["bytes"] = self.bytes
+        return stats
+
+
+class SqliteCache(CacheBackend):
+    """Adapta um GeocodeStore (SQLite) à interface de cache."""
+
+    def __init__(self, store):
+        super().__init__()
+        self.store = store
+
+    def get_many(self, keys):
+        found = self.store.get_many(keys)
+        self._count(len(found), len(set(keys)) - len(found))
+        return found
+
+    def set_many(self, items):
+        self.store.upsert_many(items)
+
+    def __len__(self):
+        return len(self.store)
+
+
+class TieredCache(CacheBackend):
+    """
+    Combina uma camada em memória com um backend persistente. As consultas vão
+    primeiro à memória; só as ausências chegam ao disco, e o que for encontrado
+    lá é promovido para a memória. As gravações vão para as duas camadas.
+    """
+
+    def __init__(self, memory, persistent):
+        super().__init__()
+        self.memory = memory
+        self.persistent = persistent
+
+    def get_many(self, keys):
+        keys = list(dict.fromkeys(keys))
+        found = self.memory.get_many(keys)
+        missing = [key for key in keys if key not in found]
+        if missing:
+            from_disk = self.persistent.get_many(missing)
+            self.memory.set_many(from_disk)
+            found.update(from_disk)
+        self._count(len(found), len(keys) - len(found))
+        return found
+
+    def set_many(self, items):
+        self.persistent.set_many(items)
+        self.memory.set_many(items)
+
+    def __len__(self):
+        return len(self.persistent)
+
+    def stats(self):
+        """Retorna os contadores gerais e os de cada camada."""
+        stats = super().stats()
+        stats["memory"] = self.memory.stats()
+        stats["persistent"] = self.persistent.stats()
+        return stats
+
+
+
+class JsonFileCache(CacheBackend):
+    """
+    Cache persistido num arquivo JSON no formato {chave: valor}. O arquivo é
+    lido na criação e regravado de forma atômica a cada set_many, uma vez por
+    lote. Se 'normalize' for informado, é aplicado às chaves lidas do arquivo;
+    quando várias colapsam na mesma, prevalece a primeira com valor.
+    """
+
+    def __init__(self, path=CACHE_FILE, normalize=None):
+        super().__init__()
+        self.path = path
+        self._data = {}
+        self._lock = threading.RLock()
+        for key, value in read_json(path).items():
+            key = normalize(key) if normalize else key
+            if self._data.get(key) is None:
+                self._data[key] = value
+
+    def get_many(self, keys):
+        with self._lock:
+            found = {key: self._data[key] for key in keys if key in self._data}
+        self._count(len(found), len(set(keys)) - len(found))
+        return found
+
+    def set_many(self, items):
+        with self._lock:
+            self._data.update(items)
+            self.save()
+
+    def save(self):
+        """Regrava o arquivo com o conteúdo atual."""
+        with self._lock:
+            write_json(self.path, self._data)
+
+    def clear(self):
+        """Remove todas as entradas e o arquivo."""
+        with self._lock:
+            self._data.clear()
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+    def __len__(self):
+        return len(self._data)
+
+def read_json(path):
+    """Lê um arquivo JSON de cache; retorna um dicionário vazio se ausente ou corrompido."""
+    if os.path.exists(path):
         try:
-            with open(CACHE_FILE, 'r') as f:
-                cache = json.load(f)
-        except json.JSONDecodeError:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except (IOError, json.JSONDecodeError):
             print("Erro ao carregar o cache. O arquivo está corrompido ou não pode ser lido.")
-            return {}
-    return cache
+    return {}
+
 
-def save_cache(cache):
-    """Salvar as coordenadas no cache"""
+def write_json(path, data):
+    """Grava o cache JSON de forma atômica."""
+    temporario = f"{path}.tmp"
     try:
-        with open(CACHE_FILE, 'w') as f:
-            json.dump(cache, f)
+        with open(temporario, 'w') as f:
+            json.dump(data, f)
+        os.replace(temporario, path)
     except Exception as e:
         print(f"Erro ao salvar o cache: {e}")
+        if os.path.exists(temporario):
+            os.remove(temporario)
 
-def clear_cache():
-    """Limpar o cache"""
-    if os.path.exists(CACHE_FILE):
-        try:
-            os.remove(CACHE_FILE)
-            print("Cache limpo com sucesso.")
-        except Exception as e:
-            print(f"Erro ao limpar o cache: {e}")
+
+def coordinates_from_secrets():
+    """Retorna as coordenadas configuradas em secrets.toml (image.coordinates), se houver."""
+    try:
+        if "coordinates" in st.secrets["image"]:
+            return dict(st.secrets["image"]["coordinates"])
+    except Exception:
+        pass
+    return {}
@@ -0,0 +1,103 @@
+import hashlib
+import threading
+
+import numpy as np
+import pandas as pd
+
+from cache_manager import MemoryLRUCache
+
+# Limites do cache de gráficos (compartilhado pelo processo)
+CHART_CACHE_MAX_ENTRIES = 128
+CHART_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+
+# Bytes atribuídos a cada figura além dos dados dos traços (layout e template,
+# cerca de 6,5 KB no JSON de uma figura vazia)
+CHART_BASE_BYTES = 8 * 1024
+
+# Atributos dos traços que guardam os arrays de dados
+CHART_DATA_ATTRIBUTES = ("x", "y", "z", "text", "customdata", "labels", "values", "lat", "lon")
+
+
+def figure_size(fig):
+    """
+    Estimativa, em bytes, do tamanho da figura: a soma dos arrays de dados dos
+    traços mais CHART_BASE_BYTES, sem serializar a figura.
+    """
+    total = CHART_BASE_BYTES
+    for trace in fig.data:
+        for nome in CHART_DATA_ATTRIBUTES:
+            valores = trace[nome] if nome in trace else None
+            if valores is not None:
+                total += np.asarray(valores).nbytes
+    return total
+
+
+_chart_cache = MemoryLRUCache(CHART_CACHE_MAX_ENTRIES, max_bytes=CHART_CACHE_MAX_BYTES, sizeof=figure_size)
+_chart_stats = {}
+_chart_stats_lock = threading.Lock()
+
+
+def dataset_version(df):
+    """
+    Identifica a versão do conjunto de dados: a registrada pelo carregador em
+    df.attrs["versao_dados"] (o md5Checksum da planilha) ou, na falta dela, um
+    hash do conteúdo do DataFrame.
+    """
+    versao = df.attrs.get("versao_dados")
+    if versao:
+        return versao
+    hashes = pd.util.hash_pandas_object(df, index=True)
+    return hashlib.blake2b(hashes.to_numpy().tobytes(), digest_size=16).hexdigest()
+
+
+def get_chart(name, builder, df, *args, key):
+    """
+    Retorna o gráfico 'name' do cache ou o constrói com builder(df, *args).
+
+    A chave combina o nome, 'key' (versão dos dados e período filtrado, por
+    exemplo) e os argumentos extras (como a opção de período), de modo que o
+    DataFrame filtrado não precisa ser percorrido para identificar o gráfico.
+
+    Parameters:
+        name (str): Nome do gráfico, usado nas estatísticas.
+        builder (callable): Função que constrói a figura.
+        df (pd.DataFrame): Dados já filtrados.
+        key (tuple): Identifica os dados: (versão dos dados, data inicial, data final).
+
+    Returns:
+        plotly.graph_objects.Figure: A figura.
+    """
+    chave = (name, key, args)
+    fig = _chart_cache.get(chave)
+    with _chart_stats_lock:
+        contadores = _chart_stats.setdefault(name, {"hits": 0, "misses": 0})
+        contadores["hits" if fig is not None else "misses"] += 1
+    if fig is None:
+        fig = builder(df, *args)
+        _chart_cache.set_many({chave: fig})
+    return fig
+
+
+def chart_cache_report():
+    """
+    Retorna as estatísticas do cache de gráficos: acertos, ausências, taxa de
+    acerto, entradas e bytes por gráfico, mais os totais do cache.
+
+    Returns:
+        tuple: (pd.DataFrame por gráfico, dict com os totais)
+    """
+    tamanhos = _chart_cache.entry_sizes()
+    with _chart_stats_lock:
+        linhas = [
+            {
+                "Gráfico": name,
+                "Acertos": contadores["hits"],
+                "Ausências": contadores["misses"],
+                "Taxa de Acerto": contadores["hits"] / (contadores["hits"] + contadores["misses"]),
+                "Entradas": sum(1 for chave in tamanhos if chave[0] == name),
+                "Bytes": sum(tamanho for chave, tamanho in tamanhos.items() if chave[0] == name),
+            }
+            for name, contadores in _chart_stats.items()
+        ]
+    return pd.DataFrame(linhas), _chart_cache.stats()
@@ -0,0 +1,187 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from cache_manager import MemoryLRUCache
+from chart_cache import dataset_version
+from graph_weekday_infractions import DIAS_SEMANA
+
+# Cubos mantidos em memória (um por versão dos dados)
+CUBE_CACHE_ENTRIES = 2
+
+_cube_cache = MemoryLRUCache(CUBE_CACHE_ENTRIES)
+_cube_lock = threading.Lock()
+
+
+def _prefix_sums(dias, codigos, n_codigos, n_dias, pesos=None):
+    """
+    Soma acumulada, por dia, de uma medida em cada código de uma dimensão.
+
+    Returns:
+        np.ndarray: Matriz (n_dias + 1) x n_codigos; a linha i tem o total dos
+        dias anteriores a i, de modo que o total de [i0, i1) é P[i1] - P[i0].
+    """
+    validas = (dias >= 0) & (codigos >= 0)
+    posicoes = dias[validas] * n_codigos + codigos[validas]
+    totais = np.bincount(posicoes, weights=None if pesos is None else pesos[validas],
+                         minlength=n_dias * n_codigos)
+    totais = totais.astype("int64").reshape(n_dias, n_codigos)
+    prefixos = np.zeros((n_dias + 1, n_codigos), dtype="int64")
+    np.cumsum(totais, axis=0, out=prefixos[1:])
+    return prefixos
+
+
+class DailyCube:
+    """
+    Agregados diários das multas para responder a qualquer período de
+    'Dia da Consulta' sem percorrer as linhas.
+
+    Para cada dimensão (local, infração e dia da semana da infração) o cubo
+    guarda somas acumuladas, por dia de consulta, da quantidade de multas e do
+    valor em centavos (inteiros, para que os totais sejam exatos). O total de
+    um período é a diferença entre duas linhas dessas somas. Os Autos de
+    Infração distintos, que não podem ser somados entre dias, ficam ordenados
+    por dia e são contados na faixa do período.
+
+    Parameters:
+        df (pd.DataFrame): Frame de multas tipado (veja criar_frame_multas).
+    """
+
+    def __init__(self, df):
+        consultas = df['Dia da Consulta']
+        self.days = pd.DatetimeIndex(np.sort(consultas.dropna().unique()))
+        n_dias = len(self.days)
+        dias = np.full(len(df), -1, dtype="int64")
+        validas = consultas.notna().to_numpy()
+        dias[validas] = self.days.get_indexer(consultas[validas])
+
+        centavos = np.rint(df['Valor a ser pago R$'].fillna(0).to_numpy(dtype="float64") * 100)
+        autos, self._n_autos = self._codes(df['Auto de Infração'])
+
+        # Dimensões: códigos por linha e rótulos de cada código (tipo categórico,
+        # DataFrame de pares ou lista de nomes)
+        self.labels = {}
+        self._counts = {}
+        self._cents = {}
+        locais = df['Local da Infração'].astype('category')
+        self._add_dimension('local', locais.dtype, len(locais.cat.categories),
+                            locais.cat.codes.to_numpy(dtype="int64"), dias, n_dias, centavos)
+
+        # Infração: par (enquadramento, descrição); conta Autos preenchidos, como o gráfico
+        enquadramento = df['Enquadramento da Infração'].astype('category')
+        descricao = df['Descrição'].astype('category')
+        cod_enq = enquadramento.cat.codes.to_numpy(dtype="int64")
+        cod_desc = descricao.cat.codes.to_numpy(dtype="int64")
+        pares = np.where((cod_enq >= 0) & (cod_desc >= 0) & (autos >= 0),
+                         cod_enq * len(descricao.cat.categories) + cod_desc, -1)
+        pares_unicos, codigos = np.unique(pares, return_inverse=True)
+        codigos = codigos.ravel() - (1 if len(pares_unicos) and pares_unicos[0] == -1 else 0)
+        pares_unicos = pares_unicos[pares_unicos >= 0]
+        rotulos = pd.DataFrame({
+            'Enquadramento da Infração': pd.Categorical.from_codes(
+                pares_unicos // len(descricao.cat.categories), dtype=enquadramento.dtype),
+            'Descrição': pd.Categorical.from_codes(
+                pares_unicos % len(descricao.cat.categories), dtype=descricao.dtype),
+        })
+        self._add_dimension('infracao', rotulos, len(rotulos), codigos, dias, n_dias, centavos)
+
+        # Dia da semana da infração (0 = segunda-feira)
+        infracoes = df['Data da Infração']
+        semana = np.where(infracoes.notna(), infracoes.dt.weekday.fillna(-1), -1).astype("int64")
+        self._add_dimension('dia_semana', DIAS_SEMANA, len(DIAS_SEMANA), semana, dias, n_dias, centavos)
+        self._total_cents = _prefix_sums(dias, np.zeros(len(df), dtype="int64"), 1, n_dias, centavos)[:, 0]
+
+        # Autos de Infração ordenados por dia, para contar os distintos de um período
+        ordem = np.argsort(dias, kind="stable")
+        ordem = ordem[dias[ordem] >= 0]
+        self._autos_por_dia = autos[ordem]
+        self._offsets = np.searchsorted(dias[ordem], np.arange(n_dias + 1))
+
+    @staticmethod
+    def _codes(serie):
+        codigos, unicos = pd.factorize(serie)
+        return codigos.astype("int64"), len(unicos)
+
+    def _add_dimension(self, dimensao, rotulos, n_codigos, codigos, dias, n_dias, centavos):
+        self.labels[dimensao] = rotulos
+        self._counts[dimensao] = _prefix_sums(dias, codigos, n_codigos, n_dias)
+        self._cents[dimensao] = _prefix_sums(dias, codigos, n_codigos, n_dias, centavos)
+
+    def day_range(self, data_inicial, data_final):
+        """Posições [i0, i1) dos dias de consulta entre as datas (inclusive), como no filtro por período."""
+        inicio = self.days.searchsorted(pd.Timestamp(data_inicial), side="left")
+        fim = self.days.searchsorted(pd.Timestamp(data_final), side="right")
+        return inicio, max(inicio, fim)
+
+    def by_dimension(self, dimensao, data_inicial, data_final):
+        """
+        Quantidade de multas e valor total por código de uma dimensão no período.
+
+        Returns:
+            tuple: (quantidades, valores em reais), arrays alinhados a self.labels[dimensao].
+        """
+        inicio, fim = self.day_range(data_inicial, data_final)
+        quantidades = self._counts[dimensao][fim] - self._counts[dimensao][inicio]
+        centavos = self._cents[dimensao][fim] - self._cents[dimensao][inicio]
+        return quantidades, centavos / 100
+
+    def metrics(self, data_inicial, data_final):
+        """Mesmo resultado de calcular_metricas sobre o período: (multas distintas, valor total, última consulta)."""
+        inicio, fim = self.day_range(data_inicial, data_final)
+        if inicio == fim:
+            return 0, 0.0, "Dados não disponíveis"
+        autos = self._autos_por_dia[self._offsets[inicio]:self._offsets[fim]]
+        presentes = np.zeros(self._n_autos, dtype=bool)
+        presentes[autos[autos >= 0]] = True
+        valor_total = (self._total_cents[fim] - self._total_cents[inicio]) / 100
+        return int(presentes.sum()), float(valor_total), self.days[fim - 1].strftime('%d/%m/%Y')
+
+    def location_ranking(self, data_inicial, data_final):
+        """Mesmo resultado de calcular_ranking_localidades sobre o período."""
+        quantidades, valores = self.by_dimension('local', data_inicial, data_final)
+        presentes = quantidades > 0
+        return pd.DataFrame({
+            'Local da Infração': pd.Categorical.from_codes(np.flatnonzero(presentes), dtype=self.labels['local']),
+            'Valor_Total': valores[presentes],
+            'Total_Multas': quantidades[presentes],
+        }).sort_values(by='Valor_Total', ascending=False)
+
+    def infraction_frequencies(self, data_inicial, data_final):
+        """Mesmo resultado de get_infraction_frequencies sobre o período."""
+        quantidades, _ = self.by_dimension('infracao', data_inicial, data_final)
+        presentes = quantidades > 0
+        frequencias = self.labels['infracao'][presentes].reset_index(drop=True)
+        frequencias['Frequência'] = quantidades[presentes]
+        return frequencias
+
+    def weekday_counts(self, data_inicial, data_final):
+        """Mesmo resultado de get_weekday_counts sobre o período."""
+        quantidades, _ = self.by_dimension('dia_semana', data_inicial, data_final)
+        contagens = pd.Series(quantidades, index=DIAS_SEMANA)
+        if (quantidades == 0).any():
+            # value_counts().reindex() deixa NaN nos dias sem multas
+            contagens = contagens.where(contagens > 0)
+        return pd.DataFrame({'Dia da Semana': DIAS_SEMANA, 'Quantidade de Multas': contagens.to_numpy()})
+
+
+def get_daily_cube(df):
+    """
+    Retorna o cubo diário do frame de multas, construindo-o uma única vez por
+    versão dos dados (os cubos ficam num cache LRU do processo).
+
+    Parameters:
+        df (pd.DataFrame): Frame de multas completo, antes do filtro por período.
+
+    Returns:
+        DailyCube: O cubo.
+    """
+    chave = dataset_version(df)
+    cubo = _cube_cache.get(chave)
+    if cubo is None:
+        with _cube_lock:
+            cubo = _cube_cache.get(chave)
+            if cubo is None:
+                cubo = DailyCube(df)
+                _cube_cache.set_many({chave: cubo})
+    return cubo
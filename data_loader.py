@@ -1,19 +1,118 @@
 import pandas as pd
+import hashlib
 import io
 import json
+import multiprocessing
+import numpy as np
+import os
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+import httplib2
+import openpyxl
+import pyarrow as pa
+import pyarrow.feather as feather
+from google_auth_httplib2 import AuthorizedHttp
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseDownload
+from googleapiclient.http import HttpRequest, MediaIoBaseDownload
+from google.auth.exceptions import GoogleAuthError
 from google.oauth2.service_account import Credentials
 import streamlit as st
 
+# Erros do carregamento: as funções de carga não exibem mensagens nem
+# interrompem o script (podem rodar fora dele, numa thread de atualização);
+# quem as chama decide como apresentar a falha.
+class ErroCarregamentoDados(Exception):
+    """Falha ao carregar os dados de multas."""
+
+
+class ErroConfiguracao(ErroCarregamentoDados):
+    """Configuração ausente ou inválida em secrets.toml."""
+
+
+class DadosInvalidos(ErroCarregamentoDados, ValueError):
+    """Os dados carregados não têm as colunas ou os valores esperados."""
+
+
+# Cliente do Google Drive compartilhado por todas as sessões do processo
+_drive_lock = threading.Lock()
+_drive_credentials = None
+_drive_service = None
+_drive_thread_local = threading.local()
+_drive_estatisticas = {"tempo_construcao": 0.0, "reutilizacoes": 0}
+
+# Função para obter as credenciais de serviço compartilhadas
+def obter_credenciais():
+    """
+    Retorna as credenciais de serviço do processo, criando-as na primeira chamada.
+    Aceita o secret 'CREDENTIALS' tanto como dicionário quanto como string JSON.
+    O token obtido é reaproveitado (e renovado) por todas as sessões. Lança
+    ErroConfiguracao se o secret estiver ausente ou não for uma conta de serviço válida.
+    """
+    global _drive_credentials
+    with _drive_lock:
+        if _drive_credentials is None:
+            try:
+                info = st.secrets["CREDENTIALS"]
+                if isinstance(info, str):
+                    info = json.loads(info)
+                _drive_credentials = Credentials.from_service_account_info(
+                    dict(info),
+                    scopes=["https://www.googleapis.com/auth/drive.readonly"]
+                )
+            except (KeyError, ValueError, FileNotFoundError, GoogleAuthError) as e:
+                raise ErroConfiguracao(f"Credenciais do Google Drive ausentes ou inválidas: {e}") from e
+        return _drive_credentials
+
+# Função para criar requisições com um cliente HTTP por thread
+def _criar_requisicao(http, *args, **kwargs):
+    """
+    Cria a requisição usando uma conexão HTTP autorizada própria da thread atual,
+    já que httplib2 não é thread-safe. As credenciais continuam compartilhadas.
+    """
+    if getattr(_drive_thread_local, "http", None) is None:
+        _drive_thread_local.http = AuthorizedHttp(_drive_credentials, http=httplib2.Http())
+    return HttpRequest(_drive_thread_local.http, *args, **kwargs)
+
+# Função para obter o serviço do Google Drive compartilhado
+def obter_servico_drive():
+    """
+    Retorna o serviço do Google Drive do processo, construindo-o apenas uma vez
+    com o documento de descoberta estático (sem parse a cada execução).
+    """
+    global _drive_service
+    credentials = obter_credenciais()
+    with _drive_lock:
+        if _drive_service is None:
+            inicio = time.perf_counter()
+            _drive_service = build(
+                "drive", "v3",
+                credentials=credentials,
+                requestBuilder=_criar_requisicao,
+                static_discovery=True,
+                cache_discovery=False
+            )
+            _drive_estatisticas["tempo_construcao"] = time.perf_counter() - inicio
+        else:
+            _drive_estatisticas["reutilizacoes"] += 1
+        return _drive_service
+
+# Função para consultar o custo economizado com o cliente compartilhado
+def estatisticas_servico_drive():
+    """
+    Retorna o tempo de construção do serviço, o número de reutilizações e o
+    tempo total economizado (em segundos) por não reconstruí-lo a cada execução.
+    """
+    with _drive_lock:
+        estatisticas = dict(_drive_estatisticas)
+    estatisticas["tempo_economizado"] = estatisticas["tempo_construcao"] * estatisticas["reutilizacoes"]
+    return estatisticas
+
 # Função para autenticar no Google Drive
 def autenticar_google_drive():
-    """Autentica no Google Drive usando credenciais de serviço."""
-    credentials = Credentials.from_service_account_info(
-        st.secrets["CREDENTIALS"], 
-        scopes=["https://www.googleapis.com/auth/drive.readonly"]
-    )
-    return build("drive", "v3", credentials=credentials)
+    """Autentica no Google Drive usando o cliente de serviço compartilhado."""
+    return obter_servico_drive()
 
 # Função para obter o ID da última planilha a partir do arquivo JSON
 def obter_id_ultima_planilha():
@@ -23,56 +122,1145 @@ def obter_id_ultima_planilha():
         file_id = st.secrets["file_data"]["ultima_planilha_id"]
         return file_id
     except Exception as e:
-        st.error(f"Erro ao carregar o ID da última planilha: {e}")
-        st.stop()
+        raise ErroConfiguracao(f"Erro ao carregar o ID da última planilha: {e}") from e
+
+# Diretório local onde ficam os snapshots colunares da planilha já limpa
+SNAPSHOT_DIR = ".cache_dados"
+
+# Função para obter os metadados do arquivo no Google Drive
+def obter_metadados_arquivo(drive_service, file_id):
+    """Obtém os metadados usados para identificar a versão do arquivo no Drive."""
+    return drive_service.files().get(
+        fileId=file_id, fields="md5Checksum,modifiedTime,size"
+    ).execute()
+
+# Função para gerar a chave do snapshot a partir dos metadados
+def chave_snapshot(metadados):
+    """
+    Gera a chave do snapshot a partir dos metadados do arquivo.
+    Usa o md5Checksum quando disponível e, caso contrário, o modifiedTime.
+    """
+    chave = metadados.get("md5Checksum") or metadados.get("modifiedTime")
+    if not chave:
+        return None
+    return re.sub(r"[^0-9A-Za-z_-]", "_", chave)
+
+# Função para montar o caminho do snapshot
+def caminho_snapshot(chave):
+    """Retorna o caminho do arquivo de snapshot para a chave informada."""
+    return os.path.join(SNAPSHOT_DIR, f"planilha_{chave}.feather")
+
+# Função para gravar um DataFrame em Feather que possa ser lido sem cópia
+def gravar_feather(df, caminho):
+    """
+    Grava o DataFrame em Feather sem compressão e num único record batch, de
+    modo que ler_feather_mapeado possa usar as colunas numéricas e de data
+    diretamente do arquivo mapeado em memória.
+    """
+    tabela = pa.Table.from_pandas(df.reset_index(drop=True), preserve_index=False).combine_chunks()
+    feather.write_feather(tabela, caminho, compression="uncompressed", chunksize=max(tabela.num_rows, 1))
+
+# Função para ler um arquivo Feather via memory mapping, sem copiar as colunas
+def ler_feather_mapeado(caminho):
+    """
+    Lê o arquivo Feather via memory mapping. Colunas numéricas e de data sem
+    valores ausentes viram arrays somente leitura sobre o próprio arquivo
+    (split_blocks evita consolidá-las num bloco novo e self_destruct libera a
+    tabela Arrow coluna a coluna); as demais são convertidas normalmente.
+    """
+    return feather.read_table(caminho, memory_map=True).to_pandas(split_blocks=True, self_destruct=True)
+
+# Função para carregar o snapshot local
+def carregar_snapshot(chave):
+    """
+    Carrega o DataFrame do snapshot local via memory mapping (veja ler_feather_mapeado).
+    Retorna None se o snapshot não existir ou estiver corrompido.
+    """
+    caminho = caminho_snapshot(chave)
+    if not os.path.exists(caminho):
+        return None
+    try:
+        return ler_feather_mapeado(caminho)
+    except (OSError, pa.ArrowInvalid) as e:
+        print(f"Erro ao carregar o snapshot: {e}")
+        return None
+
+# Função para salvar o snapshot local
+def salvar_snapshot(df, chave):
+    """
+    Salva o DataFrame limpo em formato Feather (sem compressão, para permitir
+    memory mapping) e remove os snapshots de versões anteriores.
+    """
+    caminho = caminho_snapshot(chave)
+    temporario = f"{caminho}.tmp"
+    try:
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        gravar_feather(df, temporario)
+        os.replace(temporario, caminho)
+    except (OSError, pa.ArrowException) as e:
+        print(f"Erro ao salvar o snapshot: {e}")
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        return
+    for nome in os.listdir(SNAPSHOT_DIR):
+        antigo = os.path.join(SNAPSHOT_DIR, nome)
+        if nome.startswith("planilha_") and antigo != caminho:
+            os.remove(antigo)
+
+# Arquivo com as impressões digitais (metadados) dos arquivos já baixados
+FINGERPRINT_FILE = os.path.join(SNAPSHOT_DIR, "fingerprints.json")
+
+# Campos dos metadados que identificam uma versão do arquivo
+CAMPOS_FINGERPRINT = ("md5Checksum", "modifiedTime", "size")
+
+# Arquivos a partir deste tamanho são baixados em partes paralelas
+LIMITE_DOWNLOAD_PARALELO = 16 * 1024 * 1024
+TAMANHO_PARTE_DOWNLOAD = 4 * 1024 * 1024
+MAX_CONEXOES_DOWNLOAD = 8
+
+# Estatísticas da última transferência realizada
+_download_estatisticas = {}
+
+# Serializa a atualização do arquivo de impressões digitais entre downloads simultâneos
+_fingerprints_lock = threading.Lock()
+
+# Função para baixar intervalos de bytes em paralelo
+def baixar_intervalos_paralelos(obter_http, uri, tamanho, tamanho_parte=TAMANHO_PARTE_DOWNLOAD,
+                                max_conexoes=MAX_CONEXOES_DOWNLOAD):
+    """
+    Baixa o conteúdo de 'uri' com requisições HTTP Range concorrentes.
+
+    Parameters:
+        obter_http (callable): Retorna o cliente HTTP a ser usado pela thread atual.
+        uri (str): Endereço do conteúdo.
+        tamanho (int): Tamanho total do conteúdo em bytes.
+        tamanho_parte (int): Tamanho de cada intervalo.
+        max_conexoes (int): Número máximo de requisições simultâneas.
+
+    Returns:
+        bytearray: Buffer pré-alocado preenchido com o conteúdo.
+    """
+    buffer = bytearray(tamanho)
+    destino = memoryview(buffer)
+
+    def baixar_parte(inicio):
+        fim = min(inicio + tamanho_parte, tamanho) - 1
+        resposta, conteudo = obter_http().request(uri, "GET", headers={"range": f"bytes={inicio}-{fim}"})
+        if int(resposta.status) != 206 or len(conteudo) != fim - inicio + 1:
+            raise IOError(f"Resposta inválida para o intervalo {inicio}-{fim}: status {resposta.status}")
+        destino[inicio:fim + 1] = conteudo
+
+    inicio_transferencia = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_conexoes) as executor:
+        # list() propaga a primeira exceção ocorrida em qualquer parte
+        list(executor.map(baixar_parte, range(0, tamanho, tamanho_parte)))
+    segundos = time.perf_counter() - inicio_transferencia
+
+    _download_estatisticas.update({
+        "bytes": tamanho,
+        "segundos": segundos,
+        "mb_por_segundo": tamanho / (1024 * 1024) / segundos if segundos else 0.0,
+        "paralelo": True
+    })
+    return buffer
+
+# Função para consultar a vazão do último download
+def estatisticas_download():
+    """Retorna bytes, duração e vazão (MB/s) do último download realizado."""
+    return dict(_download_estatisticas)
+
+# Função para baixar o conteúdo do arquivo do Google Drive
+def baixar_arquivo(drive_service, file_id, tamanho=None):
+    """
+    Baixa o arquivo do Google Drive e retorna o conteúdo como BytesIO.
+    Arquivos grandes (tamanho conhecido acima de LIMITE_DOWNLOAD_PARALELO) são
+    baixados em intervalos paralelos; se o servidor não atender às requisições
+    Range, o download sequencial é usado.
+    """
+    if tamanho is not None and int(tamanho) >= LIMITE_DOWNLOAD_PARALELO:
+        uri = drive_service.files().get_media(fileId=file_id).uri
+        try:
+            # Cada thread monta sua própria requisição para usar uma conexão própria
+            buffer = baixar_intervalos_paralelos(
+                lambda: drive_service.files().get_media(fileId=file_id).http, uri, int(tamanho)
+            )
+            return io.BytesIO(buffer)
+        except (IOError, httplib2.HttpLib2Error) as e:
+            print(f"Download paralelo indisponível, usando download sequencial: {e}")
+
+    request = drive_service.files().get_media(fileId=file_id)
+    file_buffer = io.BytesIO()
+    downloader = MediaIoBaseDownload(file_buffer, request)
+    inicio_transferencia = time.perf_counter()
+    done = False
+    while not done:
+        _, done = downloader.next_chunk()
+    segundos = time.perf_counter() - inicio_transferencia
+    total = file_buffer.tell()
+    _download_estatisticas.update({
+        "bytes": total,
+        "segundos": segundos,
+        "mb_por_segundo": total / (1024 * 1024) / segundos if segundos else 0.0,
+        "paralelo": False
+    })
+    file_buffer.seek(0)
+    return file_buffer
+
+# Função para carregar as impressões digitais salvas
+def carregar_fingerprints():
+    """Carrega as impressões digitais salvas localmente."""
+    if os.path.exists(FINGERPRINT_FILE):
+        try:
+            with open(FINGERPRINT_FILE, 'r') as f:
+                return json.load(f)
+        except (IOError, json.JSONDecodeError) as e:
+            print(f"Erro ao carregar as impressões digitais: {e}")
+    return {}
+
+# Função para salvar as impressões digitais
+def salvar_fingerprints(fingerprints):
+    """Salva as impressões digitais de forma atômica."""
+    temporario = f"{FINGERPRINT_FILE}.tmp"
+    try:
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        with open(temporario, 'w') as f:
+            json.dump(fingerprints, f)
+        os.replace(temporario, FINGERPRINT_FILE)
+    except IOError as e:
+        print(f"Erro ao salvar as impressões digitais: {e}")
+
+# Função para baixar o arquivo apenas quando ele mudou
+def baixar_se_modificado(drive_service, file_id, metadados=None):
+    """
+    Retorna o conteúdo do arquivo como BytesIO, baixando-o apenas quando os
+    metadados (md5Checksum, modifiedTime, size) diferem dos salvos localmente.
+    Caso contrário, devolve a cópia local dos bytes.
+    """
+    if metadados is None:
+        metadados = obter_metadados_arquivo(drive_service, file_id)
+    fingerprint = {campo: metadados.get(campo) for campo in CAMPOS_FINGERPRINT}
+    caminho = os.path.join(SNAPSHOT_DIR, f"arquivo_{re.sub(r'[^0-9A-Za-z_-]', '_', file_id)}.bin")
+
+    fingerprints = carregar_fingerprints()
+    if fingerprints.get(file_id) == fingerprint and os.path.exists(caminho):
+        with open(caminho, 'rb') as f:
+            return io.BytesIO(f.read())
+
+    file_buffer = baixar_arquivo(drive_service, file_id, metadados.get("size"))
+    try:
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        with open(f"{caminho}.tmp", 'wb') as f:
+            f.write(file_buffer.getbuffer())
+        os.replace(f"{caminho}.tmp", caminho)
+        with _fingerprints_lock:
+            fingerprints = carregar_fingerprints()
+            fingerprints[file_id] = fingerprint
+            salvar_fingerprints(fingerprints)
+    except IOError as e:
+        print(f"Erro ao salvar a cópia local do arquivo: {e}")
+    return file_buffer
+
+# Colunas da planilha usadas pelo dashboard e seus tipos declarados.
+# Identificadores são lidos como texto mesmo quando o Excel os armazena como
+# números; None indica que a coluna é lida sem conversão e tratada na padronização.
+COLUNAS_PLANILHA = {
+    "Status de Pagamento": None,
+    "Auto de Infração": "string",
+    "Dia da Consulta": None,
+    "Data da Infração": None,
+    "Valor a ser pago R$": None,
+    "Valor a Ser Pago": None,
+    "Local da Infração": None,
+    "Placa Relacionada": None,
+    "Descrição": None,
+    "Enquadramento da Infração": "string",
+}
+
+# Função para aplicar os tipos declarados às colunas lidas
+def aplicar_tipos_planilha(df):
+    """Converte as colunas lidas para os tipos declarados em COLUNAS_PLANILHA."""
+    tipos = {col: tipo for col, tipo in COLUNAS_PLANILHA.items() if tipo and col in df.columns}
+    return df.astype(tipos)
+
+# Número de linhas por lote na leitura em streaming
+TAMANHO_LOTE_PLANILHA = 50_000
+
+# Função para ler a planilha em lotes de linhas
+def ler_planilha_em_lotes(file_buffer, tamanho_lote=TAMANHO_LOTE_PLANILHA, motor=None):
+    """
+    Gera DataFrames com até 'tamanho_lote' linhas, contendo apenas as colunas de
+    COLUNAS_PLANILHA, percorrendo a planilha em streaming com o leitor 'motor'
+    de LEITORES_PLANILHA (se omitido, o mais rápido disponível). Só as linhas
+    do lote atual são convertidas em objetos Python.
+    """
+    motor = motor or motor_planilha_padrao()
+    yield from LEITORES_LOTES_PLANILHA[motor](file_buffer, tamanho_lote)
+
+# Função para agrupar as linhas da planilha em lotes
+def _lotes_de_linhas(linhas, tamanho_lote, valor_celula=None):
+    """
+    Recebe um iterador de linhas (a primeira é o cabeçalho) e gera DataFrames
+    com até 'tamanho_lote' linhas das colunas de COLUNAS_PLANILHA, aplicando
+    'valor_celula' a cada célula lida, se informado.
+    """
+    cabecalho = next(linhas, ())
+    indices = {nome: i for i, nome in enumerate(cabecalho) if nome in COLUNAS_PLANILHA}
+    colunas = {nome: [] for nome in indices}
+    quantidade = 0
+    for linha in linhas:
+        for nome, i in indices.items():
+            valor = linha[i] if i < len(linha) else None
+            colunas[nome].append(valor_celula(valor) if valor_celula else valor)
+        quantidade += 1
+        if quantidade == tamanho_lote:
+            yield aplicar_tipos_planilha(pd.DataFrame(colunas))
+            colunas = {nome: [] for nome in indices}
+            quantidade = 0
+    if quantidade or not indices:
+        yield aplicar_tipos_planilha(pd.DataFrame(colunas))
+
+# Função para ler a planilha em lotes com o openpyxl
+def ler_lotes_openpyxl(file_buffer, tamanho_lote=TAMANHO_LOTE_PLANILHA):
+    """
+    Percorre a planilha em modo read_only e gera DataFrames com até
+    'tamanho_lote' linhas, contendo apenas as colunas de COLUNAS_PLANILHA.
+    """
+    workbook = openpyxl.load_workbook(file_buffer, read_only=True, data_only=True)
+    try:
+        yield from _lotes_de_linhas(workbook.worksheets[0].iter_rows(values_only=True), tamanho_lote)
+    finally:
+        workbook.close()
+
+# Função para normalizar uma célula lida pelo calamine
+def _valor_celula_calamine(valor):
+    """
+    Aproxima a célula do calamine da lida pelo openpyxl: células vazias viram
+    None e números inteiros armazenados como float viram int.
+    """
+    if isinstance(valor, float) and valor.is_integer():
+        return int(valor)
+    if isinstance(valor, str) and not valor:
+        return None
+    return valor
+
+# Função para ler a planilha em lotes com o calamine
+def ler_lotes_calamine(file_buffer, tamanho_lote=TAMANHO_LOTE_PLANILHA):
+    """
+    Percorre a primeira aba com o calamine e gera DataFrames com até
+    'tamanho_lote' linhas, contendo apenas as colunas de COLUNAS_PLANILHA. As
+    células ficam na representação compacta do calamine (Rust) e são
+    convertidas para Python linha a linha, com iter_rows.
+    """
+    from python_calamine import CalamineWorkbook
+
+    workbook = CalamineWorkbook.from_filelike(file_buffer)
+    try:
+        linhas = workbook.get_sheet_by_index(0).iter_rows()
+        yield from _lotes_de_linhas(linhas, tamanho_lote, _valor_celula_calamine)
+    finally:
+        workbook.close()
+
+# Função para ler a planilha com o openpyxl em modo streaming
+def ler_planilha_openpyxl(file_buffer):
+    """
+    Lê apenas as colunas de COLUNAS_PLANILHA percorrendo as linhas em modo
+    read_only, sem carregar a planilha inteira em memória.
+    """
+    lotes = list(ler_lotes_openpyxl(file_buffer))
+    if not lotes:
+        return pd.DataFrame(columns=list(COLUNAS_PLANILHA))
+    return pd.concat(lotes, ignore_index=True)
+
+# Função para ler a planilha com o motor calamine (Rust), quando instalado
+def ler_planilha_calamine(file_buffer):
+    """Lê apenas as colunas de COLUNAS_PLANILHA usando o motor calamine."""
+    df = pd.read_excel(file_buffer, engine="calamine", usecols=lambda col: col in COLUNAS_PLANILHA)
+    return aplicar_tipos_planilha(df)
+
+# Leitores disponíveis, em ordem de preferência
+LEITORES_PLANILHA = {
+    "calamine": ler_planilha_calamine,
+    "openpyxl": ler_planilha_openpyxl,
+}
+
+# Leitores em lotes (streaming) de cada motor de LEITORES_PLANILHA
+LEITORES_LOTES_PLANILHA = {
+    "calamine": ler_lotes_calamine,
+    "openpyxl": ler_lotes_openpyxl,
+}
+
+# Indica se o aviso de leitor lento já foi registrado neste processo
+_aviso_motor_emitido = False
+
+# Função para escolher o leitor de planilha
+def motor_planilha_padrao():
+    """
+    Retorna o leitor mais rápido disponível no ambiente. Sem o python-calamine
+    (requirements.txt), usa o openpyxl e registra um aviso uma única vez.
+    """
+    global _aviso_motor_emitido
+    try:
+        import python_calamine  # noqa: F401
+        return "calamine"
+    except ImportError:
+        if not _aviso_motor_emitido:
+            _aviso_motor_emitido = True
+            print("python-calamine não instalado: a planilha será lida com o openpyxl, "
+                  "cerca de 8 vezes mais lento. Instale as dependências de requirements.txt.")
+        return "openpyxl"
+
+# Função para ler a planilha com o leitor escolhido
+def ler_planilha(file_buffer, motor=None):
+    """
+    Lê a planilha projetando apenas as colunas usadas pelo dashboard.
+
+    Parameters:
+        file_buffer: Arquivo ou buffer com o conteúdo .xlsx.
+        motor (str): Nome do leitor em LEITORES_PLANILHA. Se omitido, usa o
+            mais rápido disponível.
+
+    Returns:
+        DataFrame: Dados lidos com os tipos declarados.
+    """
+    return LEITORES_PLANILHA[motor or motor_planilha_padrao()](file_buffer)
+
+# Função para converter textos monetários em números
+def _converter_textos_moeda(textos):
+    """
+    Converte um array de textos monetários em float64 operando sobre a matriz de
+    caracteres (um code point por coluna), sem expressões regulares.
+
+    A vírgula é o separador decimal e o ponto, o de milhar; na ausência de vírgula,
+    um ponto seguido de 1 ou 2 dígitos é tratado como decimal ('1234.56').
+    Um '-' em qualquer posição torna o valor negativo. Textos sem dígitos viram NaN.
+    """
+    textos = np.asarray(textos, dtype=str)
+    largura = textos.dtype.itemsize // 4
+    if len(textos) == 0 or largura == 0:
+        return np.full(len(textos), np.nan)
+    caracteres = textos.view(np.uint32).reshape(len(textos), largura)
+    linhas = np.arange(len(textos))
+    posicoes = np.arange(largura)
+
+    digitos = (caracteres >= ord('0')) & (caracteres <= ord('9'))
+    acumulado = np.cumsum(digitos, axis=1)
+    total_digitos = acumulado[:, -1]
+
+    # Casas decimais: dígitos após a última vírgula (ou após o último ponto decimal)
+    ultima_virgula = np.where(caracteres == ord(','), posicoes, -1).max(axis=1)
+    ultimo_ponto = np.where(caracteres == ord('.'), posicoes, -1).max(axis=1)
+    casas_virgula = total_digitos - acumulado[linhas, np.maximum(ultima_virgula, 0)]
+    casas_ponto = total_digitos - acumulado[linhas, np.maximum(ultimo_ponto, 0)]
+    ponto_decimal = (ultima_virgula < 0) & (ultimo_ponto >= 0) & (casas_ponto > 0) & (casas_ponto < 3)
+    casas = np.where(ultima_virgula >= 0, casas_virgula, np.where(ponto_decimal, casas_ponto, 0))
+
+    # Cada dígito vale d * 10^(dígitos à sua direita)
+    expoentes = np.where(digitos, total_digitos[:, None] - acumulado, 0)
+    valores_digitos = np.where(digitos, caracteres - ord('0'), 0)
+    valores = (valores_digitos * np.power(10.0, expoentes)).sum(axis=1) / np.power(10.0, casas)
+
+    valores = np.where((caracteres == ord('-')).any(axis=1), -valores, valores)
+    return np.where(total_digitos > 0, valores, np.nan)
+
+# Função para converter a coluna de valores monetários
+def process_currency_column(serie):
+    """
+    Converte uma coluna de valores no formato brasileiro ('R$ 1.234,56') para float.
+
+    Colunas já em float são devolvidas sem cópia, as demais colunas numéricas
+    são convertidas para float e, em colunas mistas, os valores numéricos são
+    mantidos. Cada texto distinto é convertido uma única vez. Valores que não
+    puderem ser convertidos viram NaN.
+
+    Parameters:
+        serie (Series): Coluna com os valores monetários.
+
+    Returns:
+        Series: Coluna convertida para float64.
+    """
+    if pd.api.types.is_float_dtype(serie):
+        return serie
+    if pd.api.types.is_numeric_dtype(serie):
+        return serie.astype(float)
+
+    codigos, unicos = pd.factorize(serie, use_na_sentinel=True)
+    unicos = np.asarray(unicos, dtype=object)
+    if pd.api.types.infer_dtype(unicos) == "string":
+        convertidos = _converter_textos_moeda(unicos.astype(str))
+    else:
+        convertidos = np.full(len(unicos), np.nan)
+        numericos = np.array([isinstance(v, (int, float, np.number)) for v in unicos], dtype=bool)
+        convertidos[numericos] = unicos[numericos].astype(float)
+        convertidos[~numericos] = _converter_textos_moeda(unicos[~numericos].astype(str))
+
+    # O código -1 (valor ausente) aponta para o NaN acrescentado ao final
+    valores = np.append(convertidos, np.nan)[codigos]
+    return pd.Series(valores, index=serie.index, name=serie.name)
+
+# Formatos de data testados na inferência, em ordem de preferência
+FORMATOS_DATA = [
+    "%d/%m/%Y",
+    "%d/%m/%Y %H:%M:%S",
+    "%d/%m/%Y %H:%M",
+    "%d-%m-%Y",
+    "%Y-%m-%d",
+    "%Y-%m-%d %H:%M:%S",
+    "%d/%m/%y",
+]
+
+# Quantidade de valores distintos usados para inferir o formato
+TAMANHO_AMOSTRA_DATAS = 1_000
+
+# Função para inferir o formato de uma coluna de datas
+def inferir_formato_data(textos):
+    """
+    Retorna o formato de FORMATOS_DATA que converte mais valores da amostra,
+    ou None se nenhum deles converter algum valor.
+    """
+    amostra = pd.Series(textos[:TAMANHO_AMOSTRA_DATAS])
+    melhor_formato, melhor_total = None, 0
+    for formato in FORMATOS_DATA:
+        total = pd.to_datetime(amostra, format=formato, errors='coerce').notna().sum()
+        if total > melhor_total:
+            melhor_formato, melhor_total = formato, total
+        if total == len(amostra):
+            break
+    return melhor_formato
+
+# Função para converter datas descartando o fuso horário
+def _converter_datas_sem_fuso(valores, **opcoes):
+    """
+    Converte 'valores' com pd.to_datetime(errors='coerce') para datas sem fuso
+    horário. Datas com fuso mantêm o horário local informado; se as datas com
+    fuso tiverem deslocamentos diferentes, não há um horário local comum e elas
+    viram NaT, sem afetar as datas sem fuso.
+    """
+    try:
+        datas = pd.to_datetime(valores, errors='coerce', **opcoes)
+        if not isinstance(datas.dtype, pd.DatetimeTZDtype):
+            return datas
+        # Em textos, fusos diferentes geram erro; em objetos datetime, pandas
+        # converteria os de outro fuso em NaT sem aviso
+        if pd.api.types.infer_dtype(valores) == "string":
+            return datas.dt.tz_localize(None)
+    except ValueError:
+        # pandas não combina fusos diferentes (nem datas com e sem fuso) num só array
+        pass
+
+    avulsas = [pd.to_datetime(valor, errors='coerce', **opcoes) for valor in valores]
+    deslocamentos = {data.utcoffset() for data in avulsas if data is not pd.NaT and data.tzinfo is not None}
+    return pd.Series([
+        data if data is pd.NaT or data.tzinfo is None
+        else pd.NaT if len(deslocamentos) > 1 else data.tz_localize(None)
+        for data in avulsas
+    ], index=valores.index, dtype="datetime64[ns]")
+
+# Função para converter a coluna de datas
+def process_date_column(serie, dayfirst=True):
+    """
+    Converte uma coluna de datas para datetime64.
+
+    Colunas já em datetime64 são devolvidas sem reprocessamento (apenas sem o
+    fuso horário, se houver). Cada texto distinto é convertido uma única vez, com
+    o formato inferido a partir de uma amostra; só os valores que não seguem esse
+    formato passam pela conversão genérica (com 'dayfirst'). Datas com fuso
+    horário ficam no horário local informado (ver _converter_datas_sem_fuso).
+    Valores inválidos viram NaT.
+
+    Parameters:
+        serie (Series): Coluna com as datas.
+        dayfirst (bool): Se o dia vem antes do mês nos valores fora do formato.
+
+    Returns:
+        Series: Coluna convertida para datetime64.
+    """
+    if isinstance(serie.dtype, pd.DatetimeTZDtype):
+        return serie.dt.tz_localize(None)
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie
+
+    codigos, unicos = pd.factorize(serie, use_na_sentinel=True)
+    unicos = pd.Series(np.asarray(unicos, dtype=object))
+    textos = unicos.map(lambda v: isinstance(v, str))
+    convertidos = pd.Series(pd.NaT, index=unicos.index, dtype="datetime64[ns]")
+
+    if (~textos).any():
+        convertidos[~textos] = _converter_datas_sem_fuso(unicos[~textos])
+    if textos.any():
+        valores_texto = unicos[textos].str.strip()
+        formato = inferir_formato_data(valores_texto.to_numpy())
+        if formato:
+            convertidos[textos] = pd.to_datetime(valores_texto, format=formato, errors='coerce')
+        # Fora do formato: primeiro ISO 8601 (que não deve sofrer dayfirst), depois o genérico
+        for opcoes in ({'format': 'ISO8601'}, {'format': 'mixed', 'dayfirst': dayfirst}):
+            restantes = textos & convertidos.isna()
+            if not restantes.any():
+                break
+            convertidos[restantes] = _converter_datas_sem_fuso(unicos[restantes].str.strip(), **opcoes)
+
+    # O código -1 (valor ausente) aponta para o NaT acrescentado ao final
+    valores = np.append(convertidos.to_numpy(), np.datetime64('NaT'))[codigos]
+    return pd.Series(valores, index=serie.index, name=serie.name)
+
+# Colunas de texto repetitivo mantidas como categorias (códigos inteiros + dicionário)
+COLUNAS_CATEGORICAS = [
+    'Local da Infração',
+    'Placa Relacionada',
+    'Descrição',
+    'Enquadramento da Infração',
+    'Status de Pagamento',
+]
+
+# Relatório de memória da última codificação realizada
+_relatorio_memoria = pd.DataFrame()
+
+# Função para preencher locais ausentes
+def preencher_local_desconhecido(serie):
+    """Preenche locais ausentes com 'Desconhecido', inclusive em colunas categóricas."""
+    if isinstance(serie.dtype, pd.CategoricalDtype) and 'Desconhecido' not in serie.cat.categories:
+        serie = serie.cat.add_categories('Desconhecido')
+    return serie.fillna('Desconhecido')
+
+# Função para codificar colunas de texto como categorias
+def codificar_colunas_categoricas(df, colunas=COLUNAS_CATEGORICAS):
+    """
+    Converte as colunas de texto repetitivo em categorias, de modo que agrupamentos
+    operem sobre códigos inteiros, e registra o uso de memória antes e depois.
+
+    Returns:
+        DataFrame: O próprio DataFrame com as colunas convertidas.
+    """
+    global _relatorio_memoria
+    linhas = []
+    for col in colunas:
+        if col not in df.columns:
+            continue
+        antes = df[col].memory_usage(deep=True, index=False)
+        if not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype('category')
+        depois = df[col].memory_usage(deep=True, index=False)
+        linhas.append({'Coluna': col, 'Bytes antes': antes, 'Bytes depois': depois,
+                       'Valores distintos': len(df[col].cat.categories)})
+    _relatorio_memoria = pd.DataFrame(linhas)
+    return df
+
+# Função para consultar o relatório de memória
+def relatorio_memoria_categorias():
+    """Retorna, por coluna, o uso de memória antes e depois da última codificação."""
+    return _relatorio_memoria.copy()
+
+# Função para limpar um lote da planilha
+def limpar_lote(df, apenas_nao_pagas=True):
+    """
+    Aplica a um lote a conversão de valores e datas, o preenchimento de locais
+    ausentes e (se 'apenas_nao_pagas') o filtro de multas não pagas, retornando
+    só as linhas que sobrevivem.
+    """
+    df = df.rename(columns={"Valor a Ser Pago": "Valor a ser pago R$"})
+    if apenas_nao_pagas:
+        df = df[df['Status de Pagamento'] == 'NÃO PAGO']
+    df = df.copy()
+
+    df['Valor a ser pago R$'] = process_currency_column(df['Valor a ser pago R$']).fillna(0)
+    for date_col in ['Dia da Consulta', 'Data da Infração']:
+        df[date_col] = process_date_column(df[date_col])
+    df['Local da Infração'] = preencher_local_desconhecido(df['Local da Infração'])
+
+    return df.dropna(subset=['Auto de Infração', 'Dia da Consulta', 'Data da Infração'])
+
+# Função para verificar as colunas obrigatórias da planilha
+def verificar_colunas_planilha(colunas):
+    """Lança DadosInvalidos se faltar alguma coluna obrigatória entre 'colunas' (as do primeiro lote)."""
+    colunas = set(colunas)
+    required_columns = ['Status de Pagamento', 'Auto de Infração', 'Dia da Consulta', 'Data da Infração', 'Local da Infração']
+    missing_cols = [col for col in required_columns if col not in colunas]
+    if not colunas & {'Valor a ser pago R$', 'Valor a Ser Pago'}:
+        missing_cols.append('Valor a ser pago R$')
+    if missing_cols:
+        raise DadosInvalidos(f"Faltam as colunas: {', '.join(missing_cols)}")
+
+# Função para carregar apenas as multas não pagas, lote a lote
+def carregar_multas_nao_pagas(file_buffer, tamanho_lote=TAMANHO_LOTE_PLANILHA):
+    """
+    Lê a planilha em lotes (com o leitor mais rápido disponível; veja
+    ler_planilha_em_lotes) e limpa cada lote assim que é lido, de modo que as
+    multas pagas nunca sejam convertidas nem mantidas no resultado. As colunas de
+    texto repetitivo são codificadas como categorias ao final, e as linhas são
+    ordenadas por 'Dia da Consulta' (o snapshot já fica ordenado e o filtro por
+    período pode usar busca binária).
+
+    Returns:
+        DataFrame: Multas não pagas já padronizadas.
+    """
+    lotes = ler_planilha_em_lotes(file_buffer, tamanho_lote)
+    primeiro = next(lotes, None)
+    verificar_colunas_planilha(set() if primeiro is None else primeiro.columns)
+
+    limpos = [limpar_lote(primeiro)] + [limpar_lote(lote) for lote in lotes]
+    df = pd.concat(limpos, ignore_index=True).sort_values(
+        'Dia da Consulta', kind='stable', na_position='first', ignore_index=True
+    )
+    return codificar_colunas_categoricas(df)
+
+# Função para carregar os dados usando o snapshot local
+def load_data(drive_service, file_id):
+    """
+    Carrega a planilha do Google Drive já padronizada.
+
+    Se existir um snapshot local para a versão atual do arquivo (identificada
+    pelo md5Checksum/modifiedTime), os dados são lidos dele, sem download nem
+    parsing do Excel. Caso contrário, a planilha é obtida (baixada apenas se
+    tiver mudado), lida em lotes mantendo só as multas não pagas e persistida
+    como novo snapshot. A versão do arquivo fica em df.attrs["versao_dados"].
+    """
+    metadados = obter_metadados_arquivo(drive_service, file_id)
+    chave = chave_snapshot(metadados)
+    if chave:
+        df = carregar_snapshot(chave)
+        if df is not None:
+            df.attrs["versao_dados"] = chave
+            return df
+
+    file_buffer = baixar_se_modificado(drive_service, file_id, metadados)
+    df = carregar_multas_nao_pagas(file_buffer)
+    if chave:
+        salvar_snapshot(df, chave)
+        df.attrs["versao_dados"] = chave
+    return df
+
+# Base local de multas, uma linha por Auto de Infração, atualizada incrementalmente
+BASE_FILE = os.path.join(SNAPSHOT_DIR, "base_multas.feather")
+ESTADO_BASE_FILE = os.path.join(SNAPSHOT_DIR, "base_multas.json")
+HASHES_BASE_FILE = os.path.join(SNAPSHOT_DIR, "base_multas_hashes.npy")
+
+# Coluna com o hash da linha bruta da planilha que originou cada registro da base
+COLUNA_HASH = "_hash_linha"
+
+# Função para calcular o hash das linhas brutas da planilha
+def hash_linhas(lote):
+    """Calcula um hash (uint64) por linha sobre as colunas lidas da planilha, em ordem fixa."""
+    colunas = [col for col in COLUNAS_PLANILHA if col in lote.columns]
+    return pd.util.hash_pandas_object(lote[colunas].astype(str), index=False).to_numpy()
+
+# Função para carregar a base incremental
+def carregar_base():
+    """
+    Carrega a base incremental (via memory mapping), o seu estado e os hashes
+    de todas as linhas já vistas na planilha.
+
+    Returns:
+        tuple: (DataFrame ou None, dict com o estado, np.ndarray ordenado de hashes);
+        sem base, (None, {}, array vazio).
+    """
+    vazio = (None, {}, np.empty(0, dtype="uint64"))
+    if not all(os.path.exists(p) for p in (BASE_FILE, ESTADO_BASE_FILE, HASHES_BASE_FILE)):
+        return vazio
+    try:
+        with open(ESTADO_BASE_FILE, 'r') as f:
+            estado = json.load(f)
+        base = ler_feather_mapeado(BASE_FILE)
+        return codificar_colunas_categoricas(base), estado, np.load(HASHES_BASE_FILE)
+    except (OSError, ValueError, pa.ArrowInvalid) as e:
+        print(f"Erro ao carregar a base incremental: {e}")
+        return vazio
+
+# Função para salvar a base incremental
+def salvar_base(base, estado, hashes):
+    """Salva a base (Feather sem compressão), os hashes vistos e por último o estado, de forma atômica."""
+    try:
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        gravar_feather(base, f"{BASE_FILE}.tmp")
+        os.replace(f"{BASE_FILE}.tmp", BASE_FILE)
+        with open(f"{HASHES_BASE_FILE}.tmp", 'wb') as f:
+            np.save(f, hashes)
+        os.replace(f"{HASHES_BASE_FILE}.tmp", HASHES_BASE_FILE)
+        with open(f"{ESTADO_BASE_FILE}.tmp", 'w') as f:
+            json.dump(estado, f)
+        os.replace(f"{ESTADO_BASE_FILE}.tmp", ESTADO_BASE_FILE)
+    except (OSError, pa.ArrowException) as e:
+        print(f"Erro ao salvar a base incremental: {e}")
+
+# Função para mesclar registros novos na base
+def mesclar_na_base(base, novos):
+    """
+    Insere ou atualiza 'novos' na base, indexada por Auto de Infração. Para cada
+    Auto fica o registro com o 'Dia da Consulta' mais recente; registros mais
+    antigos que o já guardado são descartados.
+
+    Returns:
+        tuple: (nova base ordenada por 'Dia da Consulta', dict com as quantidades
+        de registros inseridos, atualizados e descartados)
+    """
+    novos = novos.sort_values('Dia da Consulta', kind='stable').drop_duplicates('Auto de Infração', keep='last')
+    resumo = {"inseridos": len(novos), "atualizados": 0, "descartados": 0}
+    if base is not None and not base.empty:
+        datas_base = pd.Series(base['Dia da Consulta'].to_numpy(), index=base['Auto de Infração'].to_numpy())
+        anteriores = datas_base.reindex(novos['Auto de Infração'].to_numpy()).to_numpy()
+        mais_antigos = anteriores > novos['Dia da Consulta'].to_numpy()
+        existentes = ~pd.isna(anteriores)
+        novos = novos[~mais_antigos]
+        resumo = {
+            "inseridos": int((~existentes).sum()),
+            "atualizados": int((existentes & ~mais_antigos).sum()),
+            "descartados": int(mais_antigos.sum()),
+        }
+        base = pd.concat([base[~base['Auto de Infração'].isin(novos['Auto de Infração'])], novos], ignore_index=True)
+    else:
+        base = novos
+    base = base.sort_values('Dia da Consulta', kind='stable', na_position='first', ignore_index=True)
+    return codificar_colunas_categoricas(base), resumo
+
+# Função para extrair da planilha apenas as linhas novas ou alteradas
+def ler_linhas_novas(file_buffer, hashes_conhecidos, tamanho_lote=TAMANHO_LOTE_PLANILHA):
+    """
+    Percorre a planilha em lotes e limpa apenas as linhas cujo hash não está em
+    'hashes_conhecidos' (array ordenado; linhas acrescentadas ou alteradas desde
+    a última carga), mantendo todos os status de pagamento. Lança DadosInvalidos
+    se faltar alguma coluna obrigatória.
+
+    Returns:
+        tuple: (DataFrame limpo com as linhas novas e a coluna COLUNA_HASH ou None,
+        hashes das linhas novas, total de linhas lidas)
+    """
+    novas = []
+    hashes_novos = []
+    total = 0
+    for lote in ler_planilha_em_lotes(file_buffer, tamanho_lote):
+        if total == 0:
+            verificar_colunas_planilha(lote.columns)
+        total += len(lote)
+        hashes = hash_linhas(lote)
+        desconhecidas = ~np.isin(hashes, hashes_conhecidos)
+        if desconhecidas.any():
+            hashes_novos.append(hashes[desconhecidas])
+            lote = lote[desconhecidas].assign(**{COLUNA_HASH: hashes[desconhecidas]})
+            novas.append(limpar_lote(lote, apenas_nao_pagas=False))
+    hashes_novos = np.concatenate(hashes_novos) if hashes_novos else np.empty(0, dtype="uint64")
+    if not novas:
+        return None, hashes_novos, total
+    return pd.concat(novas, ignore_index=True), hashes_novos, total
+
+# Função para atualizar a base com uma nova versão da planilha
+def atualizar_base(base, file_buffer, hashes_conhecidos=None, tamanho_lote=TAMANHO_LOTE_PLANILHA):
+    """
+    Atualiza a base com as linhas novas ou alteradas da planilha. A planilha é
+    lida inteira (o .xlsx não permite leitura parcial), mas só as linhas com hash
+    desconhecido são convertidas, limpas e mescladas. Os hashes vistos incluem os
+    das linhas já superadas por consultas mais recentes, que assim não voltam a
+    ser processadas.
+
+    Returns:
+        tuple: (base atualizada, dict com o resumo da atualização, np.ndarray
+        ordenado com os hashes de todas as linhas vistas)
+    """
+    if hashes_conhecidos is None:
+        hashes_conhecidos = np.empty(0, dtype="uint64")
+    novas, hashes_novos, total = ler_linhas_novas(file_buffer, hashes_conhecidos, tamanho_lote)
+    hashes_conhecidos = np.union1d(hashes_conhecidos, hashes_novos)
+    resumo = {"linhas_lidas": total, "linhas_novas": len(hashes_novos), "inseridos": 0, "atualizados": 0, "descartados": 0}
+    if novas is not None:
+        base, mesclagem = mesclar_na_base(base, novas)
+        resumo.update(mesclagem)
+    return base, resumo, hashes_conhecidos
+
+# Função para obter as multas não pagas da base
+def multas_nao_pagas_da_base(base):
+    """Retorna as multas não pagas da base (sem a coluna de hash), na ordem de 'Dia da Consulta'."""
+    nao_pagas = base[base['Status de Pagamento'] == 'NÃO PAGO']
+    return nao_pagas.drop(columns=[COLUNA_HASH], errors='ignore').reset_index(drop=True)
+
+# Função para carregar os dados atualizando a base incrementalmente
+def load_data_incremental(drive_service, file_id):
+    """
+    Carrega as multas não pagas a partir da base local indexada por Auto de
+    Infração. Quando a planilha muda de versão, apenas as linhas novas ou
+    alteradas são limpas e mescladas na base; enquanto não muda, a base é lida
+    do disco sem download nem parsing. Lança DadosInvalidos se a planilha não
+    tiver as colunas obrigatórias ou nenhuma linha válida.
+    """
+    metadados = obter_metadados_arquivo(drive_service, file_id)
+    chave = chave_snapshot(metadados)
+    base, estado, hashes = carregar_base()
+    if base is None or not chave or estado.get("versao") != chave:
+        file_buffer = baixar_se_modificado(drive_service, file_id, metadados)
+        base, resumo, hashes = atualizar_base(base, file_buffer, hashes)
+        if base is None:
+            raise DadosInvalidos("A planilha não possui linhas válidas.")
+        salvar_base(base, {"versao": chave, "resumo": resumo}, hashes)
+    df = multas_nao_pagas_da_base(base)
+    if chave:
+        df.attrs["versao_dados"] = f"base_{chave}"
+    return df
+
+# Histórico de multas montado a partir de todas as planilhas da pasta do Drive
+HISTORICO_FILE = os.path.join(SNAPSHOT_DIR, "historico_multas.feather")
+ESTADO_HISTORICO_FILE = os.path.join(SNAPSHOT_DIR, "historico_multas.json")
+
+# Tipo das planilhas de resultados na pasta
+MIME_PLANILHA = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# Downloads simultâneos (threads) e processos de leitura das planilhas do histórico
+MAX_DOWNLOADS_HISTORICO = 4
+MAX_PROCESSOS_HISTORICO = min(4, os.cpu_count() or 1)
+
+# Função para obter o ID da pasta de planilhas no Google Drive
+def obter_id_pasta_historico():
+    """Obtém o ID da pasta com as planilhas de resultados (file_data.GOOGLE_DRIVE_FOLDER_ID)."""
+    try:
+        return st.secrets["file_data"]["GOOGLE_DRIVE_FOLDER_ID"]
+    except Exception as e:
+        raise ErroConfiguracao(f"Erro ao carregar o ID da pasta de planilhas: {e}") from e
+
+# Função para listar as planilhas da pasta
+def listar_planilhas_pasta(drive_service, folder_id):
+    """
+    Lista as planilhas .xlsx da pasta, percorrendo todas as páginas do resultado.
+
+    Returns:
+        list: Metadados (id, name, md5Checksum, modifiedTime, size) de cada
+        planilha, da mais antiga para a mais recente.
+    """
+    arquivos = []
+    pagina = None
+    while True:
+        resposta = drive_service.files().list(
+            q=f"'{folder_id}' in parents and mimeType = '{MIME_PLANILHA}' and trashed = false",
+            fields="nextPageToken, files(id, name, md5Checksum, modifiedTime, size)",
+            pageSize=1000,
+            pageToken=pagina,
+        ).execute()
+        arquivos.extend(resposta.get("files", []))
+        pagina = resposta.get("nextPageToken")
+        if not pagina:
+            return sorted(arquivos, key=lambda a: (a.get("modifiedTime") or "", a["id"]))
+
+# Função para ler uma planilha do histórico (executada num processo separado)
+def limpar_planilha_historico(conteudo):
+    """
+    Lê e limpa uma planilha inteira, mantendo todos os status de pagamento e,
+    para cada Auto de Infração, apenas a consulta mais recente.
+
+    Parameters:
+        conteudo (bytes): Conteúdo do arquivo .xlsx.
+
+    Returns:
+        DataFrame: Linhas limpas da planilha.
+
+    Raises:
+        DadosInvalidos: Se a planilha não tiver as colunas obrigatórias ou linhas válidas.
+    """
+    lotes = ler_planilha_em_lotes(io.BytesIO(conteudo))
+    primeiro = next(lotes, None)
+    if primeiro is None:
+        raise DadosInvalidos("A planilha não possui linhas.")
+    verificar_colunas_planilha(primeiro.columns)
+    limpos = [limpar_lote(primeiro, apenas_nao_pagas=False)]
+    limpos += [limpar_lote(lote, apenas_nao_pagas=False) for lote in lotes]
+    df = pd.concat(limpos, ignore_index=True)
+    if df.empty:
+        raise DadosInvalidos("A planilha não possui linhas válidas.")
+    return df.sort_values('Dia da Consulta', kind='stable').drop_duplicates('Auto de Infração', keep='last')
+
+# Função para baixar e ler várias planilhas em paralelo
+def ler_planilhas_historico(drive_service, arquivos, max_downloads=MAX_DOWNLOADS_HISTORICO,
+                            max_processos=MAX_PROCESSOS_HISTORICO):
+    """
+    Baixa as planilhas com um pool de threads (E/S) e entrega cada uma, assim que
+    termina de chegar, a um pool de processos que faz a leitura e a limpeza (CPU).
+    Uma planilha que falha (no download ou na leitura) é registrada e ignorada,
+    sem interromper as demais.
+
+    Returns:
+        tuple: (DataFrame com as linhas limpas das planilhas válidas, na ordem de
+        'arquivos', ou None se nenhuma for válida; dict id -> (etapa, exceção)
+        das planilhas ignoradas, com etapa 'download' ou 'leitura')
+    """
+    frames = {}
+    falhas = {}
+    if not arquivos:
+        return None, falhas
+    # 'spawn' evita copiar para os filhos as threads e o estado do servidor do Streamlit
+    contexto = multiprocessing.get_context("spawn")
+    with ThreadPoolExecutor(max_workers=max_downloads) as downloads, \
+            ProcessPoolExecutor(max_workers=max_processos, mp_context=contexto) as processos:
+        baixando = {
+            downloads.submit(baixar_se_modificado, drive_service, arquivo["id"], arquivo): arquivo["id"]
+            for arquivo in arquivos
+        }
+        limpando = {}
+        for futuro in as_completed(baixando):
+            try:
+                conteudo = futuro.result().getvalue()
+            except Exception as e:
+                falhas[baixando[futuro]] = ("download", e)
+                continue
+            limpando[processos.submit(limpar_planilha_historico, conteudo)] = baixando[futuro]
+        for futuro in as_completed(limpando):
+            try:
+                frames[limpando[futuro]] = futuro.result()
+            except Exception as e:
+                falhas[limpando[futuro]] = ("leitura", e)
+
+    nomes = {arquivo["id"]: arquivo.get("name", arquivo["id"]) for arquivo in arquivos}
+    for file_id, (etapa, erro) in falhas.items():
+        print(f"Planilha '{nomes[file_id]}' ignorada ({etapa}): {type(erro).__name__}: {erro}")
+    validos = [frames[arquivo["id"]] for arquivo in arquivos if arquivo["id"] in frames]
+    if not validos:
+        return None, falhas
+    return pd.concat(validos, ignore_index=True), falhas
+
+# Função para carregar o histórico salvo
+def carregar_historico_salvo():
+    """
+    Carrega o histórico (via memory mapping) e o seu estado.
+
+    Returns:
+        tuple: (DataFrame ou None, dict com o estado; vazio se não houver histórico)
+    """
+    if not (os.path.exists(HISTORICO_FILE) and os.path.exists(ESTADO_HISTORICO_FILE)):
+        return None, {}
+    try:
+        with open(ESTADO_HISTORICO_FILE, 'r') as f:
+            estado = json.load(f)
+        historico = ler_feather_mapeado(HISTORICO_FILE)
+        return codificar_colunas_categoricas(historico), estado
+    except (OSError, ValueError, pa.ArrowInvalid) as e:
+        print(f"Erro ao carregar o histórico: {e}")
+        return None, {}
+
+# Função para salvar o histórico
+def salvar_historico(historico, estado):
+    """Salva o histórico (Feather sem compressão) e depois o estado, de forma atômica."""
+    try:
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        gravar_feather(historico, f"{HISTORICO_FILE}.tmp")
+        os.replace(f"{HISTORICO_FILE}.tmp", HISTORICO_FILE)
+        with open(f"{ESTADO_HISTORICO_FILE}.tmp", 'w') as f:
+            json.dump(estado, f)
+        os.replace(f"{ESTADO_HISTORICO_FILE}.tmp", ESTADO_HISTORICO_FILE)
+    except (OSError, pa.ArrowException) as e:
+        print(f"Erro ao salvar o histórico: {e}")
+
+# Função para carregar o histórico de todas as planilhas da pasta
+def load_data_historico(drive_service, folder_id):
+    """
+    Carrega as multas não pagas do histórico formado por todas as planilhas da
+    pasta. Só as planilhas novas ou alteradas desde a última carga são baixadas
+    e lidas; suas linhas são mescladas no histórico salvo, mantendo para cada
+    Auto de Infração a consulta mais recente.
+
+    Planilhas inválidas (sem as colunas obrigatórias, sem linhas ou ilegíveis)
+    são ignoradas e registradas no estado, e só voltam a ser lidas se mudarem;
+    as que falham no download são tentadas de novo na próxima carga. A carga
+    só falha se não restar nenhuma planilha válida.
+    """
+    historico, estado = carregar_historico_salvo()
+    versoes = estado.get("arquivos", {})
+    ignoradas = estado.get("ignoradas", {})
+    arquivos = listar_planilhas_pasta(drive_service, folder_id)
+    pendentes = [a for a in arquivos if chave_snapshot(a) is None or versoes.get(a["id"]) != chave_snapshot(a)]
+    falhas = {}
+    if pendentes:
+        novos, falhas = ler_planilhas_historico(drive_service, pendentes)
+        resumo = {}
+        if novos is not None and not novos.empty:
+            historico, resumo = mesclar_na_base(historico, novos)
+        lidas = [a for a in pendentes if falhas.get(a["id"], ("",))[0] != "download"]
+        versoes = {**versoes, **{a["id"]: chave_snapshot(a) for a in lidas}}
+        ignoradas = {
+            **{file_id: motivo for file_id, motivo in ignoradas.items() if file_id not in {a["id"] for a in pendentes}},
+            **{file_id: f"{etapa}: {type(erro).__name__}: {erro}" for file_id, (etapa, erro) in falhas.items()},
+        }
+        estado = {"arquivos": versoes, "ignoradas": ignoradas,
+                  "resumo": {**resumo, "planilhas_lidas": len(pendentes) - len(falhas),
+                             "planilhas_ignoradas": len(falhas)}}
+        if historico is not None:
+            salvar_historico(historico, estado)
+    if historico is None:
+        detalhes = "; ".join(f"{file_id}: {motivo}" for file_id, motivo in ignoradas.items())
+        raise DadosInvalidos(f"A pasta não possui planilhas com linhas válidas. {detalhes}".strip())
+    df = multas_nao_pagas_da_base(historico)
+    df.attrs["versao_dados"] = versao_historico({a["id"]: chave_snapshot(a) for a in arquivos})
+    return df
+
+# Função para identificar a versão do histórico
+def versao_historico(versoes):
+    """Gera a versão do histórico a partir das versões (id -> chave) das planilhas presentes na pasta."""
+    versao = hashlib.blake2b(json.dumps(versoes, sort_keys=True).encode(), digest_size=16).hexdigest()
+    return f"historico_{versao}"
+
+# Função para escolher o modo de ingestão
+def modo_ingestao():
+    """
+    Retorna o modo de ingestão configurado em secrets.toml (file_data.modo_ingestao):
+    'completo' (padrão), 'incremental' ou 'historico'.
+    """
+    try:
+        return st.secrets["file_data"].get("modo_ingestao", "completo")
+    except Exception:
+        return "completo"
+
+# Função para consultar a versão dos dados no Drive sem baixá-los
+def versao_fonte_dados():
+    """
+    Retorna a versão que carregar_dados_google_drive registraria em
+    df.attrs["versao_dados"], consultando apenas os metadados no Drive (a última
+    planilha ou, no modo 'historico', a listagem da pasta). Retorna None se o
+    arquivo não informar md5Checksum nem modifiedTime.
+    """
+    drive_service = autenticar_google_drive()
+    modo = modo_ingestao()
+    if modo == "historico":
+        arquivos = listar_planilhas_pasta(drive_service, obter_id_pasta_historico())
+        return versao_historico({a["id"]: chave_snapshot(a) for a in arquivos})
+    chave = chave_snapshot(obter_metadados_arquivo(drive_service, obter_id_ultima_planilha()))
+    if chave and modo == "incremental":
+        return f"base_{chave}"
+    return chave
 
 # Função para carregar os dados do Google Drive
 def carregar_dados_google_drive():
-    """Carrega os dados da última planilha no Google Drive."""
+    """Carrega os dados da última planilha (ou, no modo 'historico', de todas as planilhas da pasta) no Google Drive."""
     try:
         drive_service = autenticar_google_drive()
+        modo = modo_ingestao()
+        if modo == "historico":
+            return load_data_historico(drive_service, obter_id_pasta_historico())
         file_id = obter_id_ultima_planilha()
-        request = drive_service.files().get_media(fileId=file_id)
-        file_buffer = io.BytesIO()
-        downloader = MediaIoBaseDownload(file_buffer, request)
-        done = False
-        while not done:
-            _, done = downloader.next_chunk()
-        file_buffer.seek(0)
-        return pd.read_excel(file_buffer)
+        if modo == "incremental":
+            return load_data_incremental(drive_service, file_id)
+        return load_data(drive_service, file_id)
+    except ErroCarregamentoDados:
+        raise
     except Exception as e:
-        st.error(f"Erro ao carregar os dados do Google Drive: {e}")
-        st.stop()
+        raise ErroCarregamentoDados(f"Erro ao carregar os dados do Google Drive: {e}") from e
 
 # Função para limpar e processar os dados
 def clean_data(df):
     """Limpa os dados e trata valores ausentes ou inválidos."""
     try:
         if 'Valor a ser pago R$' in df.columns:
-            # Remove caracteres não numéricos e converte para float
-            df['Valor a ser pago R$'] = df['Valor a ser pago R$'].replace(
-                {r'[^0-9,]': '', ',': '.'}, regex=True
-            ).astype(float)
+            # Converte os valores monetários para float
+            df['Valor a ser pago R$'] = process_currency_column(df['Valor a ser pago R$'])
         else:
-            st.error("A coluna 'Valor a ser pago R$' não foi encontrada nos dados carregados.")
-            st.stop()
+            raise DadosInvalidos("A coluna 'Valor a ser pago R$' não foi encontrada nos dados carregados.")
 
         if 'Local da Infração' in df.columns:
-            df['Local da Infração'] = df['Local da Infração'].fillna('Desconhecido')
+            df['Local da Infração'] = preencher_local_desconhecido(df['Local da Infração'])
         else:
-            st.error("A coluna 'Local da Infração' não foi encontrada nos dados carregados.")
-            st.stop()
+            raise DadosInvalidos("A coluna 'Local da Infração' não foi encontrada nos dados carregados.")
 
         # Ajuste das datas
-        df['Dia da Consulta'] = pd.to_datetime(df['Dia da Consulta'], dayfirst=True, errors='coerce')
-        df['Data da Infração'] = pd.to_datetime(df['Data da Infração'], dayfirst=True, errors='coerce')
+        df['Dia da Consulta'] = process_date_column(df['Dia da Consulta'])
+        df['Data da Infração'] = process_date_column(df['Data da Infração'])
 
         # Remover entradas com dados ausentes nas colunas principais
         df.dropna(subset=['Status de Pagamento', 'Auto de Infração', 'Dia da Consulta', 'Data da Infração'], inplace=True)
         return df
+    except ErroCarregamentoDados:
+        raise
     except Exception as e:
-        st.error(f"Erro ao limpar os dados: {e}")
-        st.stop()
+        raise DadosInvalidos(f"Erro ao limpar os dados: {e}") from e
 
 # Função para verificar e padronizar o DataFrame
 def padronizar_dataframe(df):
@@ -84,8 +1272,7 @@ def padronizar_dataframe(df):
         required_columns = ['Status de Pagamento', 'Auto de Infração', 'Dia da Consulta', 'Data da Infração', 'Valor a ser pago R$']
         missing_cols = [col for col in required_columns if col not in df.columns]
         if missing_cols:
-            st.error(f"Faltam as seguintes colunas: {', '.join(missing_cols)}")
-            raise ValueError(f"Faltam as colunas: {', '.join(missing_cols)}")
+            raise DadosInvalidos(f"Faltam as colunas: {', '.join(missing_cols)}")
 
         # Renomear as colunas para o padrão esperado
         column_mapping = {
@@ -100,22 +1287,22 @@ def padronizar_dataframe(df):
 
         # Processar valores monetários (Valor a ser pago R$)
         if 'Valor a ser pago R$' in df.columns:
-            df['Valor a ser pago R$'] = df['Valor a ser pago R$'].replace({r'[^\d,]': '', ',': '.'}, regex=True)
-            df['Valor a ser pago R$'] = pd.to_numeric(df['Valor a ser pago R$'], errors='coerce').fillna(0)
+            df['Valor a ser pago R$'] = process_currency_column(df['Valor a ser pago R$']).fillna(0)
 
         # Converter colunas de datas
         for date_col in ['Dia da Consulta', 'Data da Infração']:
             if date_col in df.columns:
-                df[date_col] = pd.to_datetime(df[date_col], errors='coerce', dayfirst=True)
+                df[date_col] = process_date_column(df[date_col])
                 if df[date_col].isna().all():
-                    raise ValueError(f"Todas as entradas na coluna '{date_col}' são inválidas.")
+                    raise DadosInvalidos(f"Todas as entradas na coluna '{date_col}' são inválidas.")
 
         # Preencher valores nulos na coluna 'Local da Infração' com 'Desconhecido'
         if 'Local da Infração' in df.columns:
-            df['Local da Infração'] = df['Local da Infração'].fillna('Desconhecido')
+            df['Local da Infração'] = preencher_local_desconhecido(df['Local da Infração'])
 
         return df
 
+    except ErroCarregamentoDados:
+        raise
     except Exception as e:
-        st.error(f"Erro ao padronizar DataFrame: {e}")
-        st.stop()
+        raise DadosInvalidos(f"Erro ao padronizar DataFrame: {e}") from e
@@ -1,19 +1,83 @@
+import weakref
+import numpy as np
 import pandas as pd
 import streamlit as st
-from data_loader import load_data, clean_data, process_currency_column
+from cache_manager import MemoryLRUCache
+from data_loader import (DadosInvalidos, ErroCarregamentoDados, load_data, clean_data,
+                         process_currency_column, process_date_column)
+
+# Esquema do frame de multas compartilhado pelos gráficos: coluna -> tipo
+ESQUEMA_MULTAS = {
+    'Dia da Consulta': 'datetime',
+    'Data da Infração': 'datetime',
+    'Valor a ser pago R$': 'float',
+    'Placa Relacionada': 'category',
+    'Local da Infração': 'category',
+    'Descrição': 'category',
+    'Enquadramento da Infração': 'category',
+    'Status de Pagamento': 'category',
+}
+
+# Coluna de data pela qual o frame de multas é mantido ordenado
+COLUNA_ORDENACAO = 'Dia da Consulta'
+
+# Índices ordenados das demais colunas de data, por (id do índice de linhas, coluna)
+_indices_datas = MemoryLRUCache(4)
+
+# Verificadores de cada tipo do esquema
+VERIFICADORES_TIPO = {
+    'datetime': pd.api.types.is_datetime64_any_dtype,
+    'float': pd.api.types.is_float_dtype,
+    'category': lambda serie: isinstance(serie.dtype, pd.CategoricalDtype),
+}
+
+# Função para validar o frame de multas
+def validar_frame_multas(df):
+    """
+    Verifica se as colunas presentes do esquema estão com os tipos esperados.
+    Lança ValueError indicando as colunas fora do esquema.
+    """
+    invalidas = [
+        col for col, tipo in ESQUEMA_MULTAS.items()
+        if col in df.columns and not VERIFICADORES_TIPO[tipo](df[col])
+    ]
+    if invalidas:
+        raise ValueError(f"Colunas fora do esquema de multas: {', '.join(invalidas)}")
+    return df
+
+# Função para criar o frame de multas tipado
+def criar_frame_multas(df):
+    """
+    Converte, uma única vez, o DataFrame limpo para o esquema ESQUEMA_MULTAS
+    (datas em datetime64, valores em float e textos repetidos como categorias).
+    Os gráficos recebem esse frame e não precisam copiar nem reconverter colunas.
+    """
+    for col, tipo in ESQUEMA_MULTAS.items():
+        if col not in df.columns or VERIFICADORES_TIPO[tipo](df[col]):
+            continue
+        if tipo == 'datetime':
+            df[col] = process_date_column(df[col])
+        elif tipo == 'float':
+            df[col] = process_currency_column(df[col])
+        else:
+            df[col] = df[col].astype('category')
+    return validar_frame_multas(df)
 
 # Função para carregar e limpar dados
 def carregar_e_limpar_dados(carregar_dados_func):
     """
     Carrega os dados do Google Drive e aplica limpeza e processamento.
+
+    Não exibe mensagens: as falhas são lançadas como ErroCarregamentoDados (ou
+    uma subclasse), com a exceção original encadeada, para que a interface
+    decida como apresentá-las.
     """
     try:
         # Carregar dados do Google Drive usando a função fornecida
         df = carregar_dados_func()
 
         if df is None or not isinstance(df, pd.DataFrame):
-            st.error("Não foi possível carregar os dados ou os dados não são válidos")
-            return None
+            raise DadosInvalidos("Não foi possível carregar os dados ou os dados não são válidos")
 
         # Verificar e corrigir colunas essenciais
         required_columns = [
@@ -26,8 +90,7 @@ def carregar_e_limpar_dados(carregar_dados_func):
         ]
         missing_cols = [col for col in required_columns if col not in df.columns]
         if missing_cols:
-            st.error(f"Faltam as seguintes colunas: {', '.join(missing_cols)}")
-            return None
+            raise DadosInvalidos(f"Faltam as seguintes colunas: {', '.join(missing_cols)}")
 
         # Validar e processar colunas
         for col in ['Valor a ser pago R$', 'Dia da Consulta', 'Data da Infração']:
@@ -35,10 +98,9 @@ def carregar_e_limpar_dados(carregar_dados_func):
                 if col == 'Valor a ser pago R$':
                     df[col] = process_currency_column(df[col])
                 elif col in ['Dia da Consulta', 'Data da Infração']:
-                    df[col] = pd.to_datetime(df[col], errors='coerce')
+                    df[col] = process_date_column(df[col])
                     if df[col].isna().all():
-                        st.error(f"Falha ao converter a coluna '{col}' para formato de data")
-                        return None
+                        raise DadosInvalidos(f"Falha ao converter a coluna '{col}' para formato de data")
 
         # Limpar dados duplicados
         df_cleaned = clean_data(df)
@@ -48,17 +110,89 @@ def carregar_e_limpar_dados(carregar_dados_func):
 
         # Verificar se o DataFrame não está vazio após a limpeza
         if df_cleaned.empty:
-            st.error("Após a limpeza, o DataFrame está vazio. Nenhum dado válido encontrado.")
-            return None
+            raise DadosInvalidos("Após a limpeza, o DataFrame está vazio. Nenhum dado válido encontrado.")
 
-        return df_cleaned
+        # Tipar uma única vez o frame usado por todos os gráficos, ordenado por data
+        return ordenar_por_data(criar_frame_multas(df_cleaned))
 
+    except ErroCarregamentoDados:
+        raise
     except Exception as e:
-        st.error(f"Erro ao carregar e limpar os dados: {str(e)}")
+        raise ErroCarregamentoDados(f"Erro ao carregar e limpar os dados: {str(e)}") from e
+
+# Função para ordenar o frame de multas por uma coluna de data
+def ordenar_por_data(df, coluna=COLUNA_ORDENACAO):
+    """
+    Ordena o DataFrame pela coluna de data (datas ausentes primeiro, preservando
+    a ordem original entre empates), para que o filtro por período use busca
+    binária. Frames já ordenados (como os snapshots) são devolvidos sem cópia.
+    """
+    if _valores_ordenados(df[coluna]) is not None:
+        return df
+    return df.sort_values(coluna, kind='stable', na_position='first')
+
+# Função para obter os valores de uma coluna de data já ordenada
+def _valores_ordenados(datas):
+    """
+    Retorna os valores da coluna de data como inteiros (NaT é o menor valor) se
+    estiverem em ordem crescente; caso contrário, None. A verificação é uma
+    passada vetorizada, feita a cada chamada: a ordem não é presumida a partir
+    de marcas que se propagam para frames derivados.
+    """
+    if not pd.api.types.is_datetime64_any_dtype(datas) or getattr(datas.dt, 'tz', None) is not None:
+        return None
+    valores = datas.to_numpy().view('i8')
+    return valores if (valores[1:] >= valores[:-1]).all() else None
+
+# Função para obter o índice ordenado de uma coluna de data
+def obter_indice_datas(df, coluna):
+    """
+    Retorna os valores da coluna de data em ordem crescente (como inteiros, com
+    as datas ausentes no início) e a permutação que leva a essa ordem, ou None
+    no lugar da permutação se o frame já está ordenado pela coluna.
+
+    A permutação é calculada uma vez por frame: fica em cache associada ao
+    objeto de índice de linhas e ao buffer da coluna, e só é reaproveitada se
+    ambos forem os mesmos. Frames derivados (fatias, reordenações, cópias) têm
+    outro índice e recebem sua própria permutação.
+
+    Returns:
+        tuple | None: (valores ordenados, permutação ou None), ou None se a coluna
+        não é datetime sem fuso.
+    """
+    datas = df[coluna]
+    if not pd.api.types.is_datetime64_any_dtype(datas) or getattr(datas.dt, 'tz', None) is not None:
         return None
+    valores = _valores_ordenados(datas)
+    if valores is not None:
+        return valores, None
+
+    valores = datas.to_numpy().view('i8')
+    chave = (id(df.index), coluna)
+    indice = _indices_datas.get(chave)
+    # O cache guarda referências ao buffer da coluna (que assim não é reutilizado
+    # por outra alocação) e, fraca, ao índice; o id só vale se ambos coincidirem
+    if indice is None or indice[0]() is not df.index or not _mesmo_buffer(indice[1], valores):
+        permutacao = np.argsort(valores, kind='stable')
+        indice = (weakref.ref(df.index), valores, valores[permutacao], permutacao)
+        _indices_datas.set_many({chave: indice})
+    return indice[2], indice[3]
+
+# Função para verificar se dois arrays são a mesma área de memória
+def _mesmo_buffer(a, b):
+    """Indica se os arrays começam no mesmo endereço e têm o mesmo tamanho."""
+    return len(a) == len(b) and a.__array_interface__['data'][0] == b.__array_interface__['data'][0]
 
 # Função para filtrar dados por período
-def filtrar_dados_por_periodo(df, data_inicial, data_final, coluna='Dia da Consulta'):
+def filtrar_dados_por_periodo(df, data_inicial, data_final, coluna=COLUNA_ORDENACAO):
+    """
+    Filtra as linhas com 'coluna' entre data_inicial e data_final (inclusive).
+
+    Se o frame está ordenado pela coluna (veja ordenar_por_data), o período é
+    localizado por busca binária e o resultado é uma fatia do frame, sem cópia.
+    Em outra coluna de data, usa a permutação ordenada da coluna (calculada uma
+    vez por frame); em colunas não datetime, compara linha a linha.
+    """
     try:
         if df is None or df.empty:
             raise ValueError("O DataFrame está vazio ou é inválido.")
@@ -66,18 +200,33 @@ def filtrar_dados_por_periodo(df, data_inicial, data_final, coluna='Dia da Consu
         if coluna not in df.columns:
             raise ValueError(f"Coluna '{coluna}' não encontrada no DataFrame.")
         
-        # Garantir formato de data
-        df[coluna] = pd.to_datetime(df[coluna], errors='coerce')
-        if df[coluna].isna().all():
-            raise ValueError(f"Coluna '{coluna}' não possui valores válidos de data.")
-        
         # Converter datas de filtro
         data_inicial = pd.Timestamp(data_inicial)
         data_final = pd.Timestamp(data_final)
-        
-        # Aplicar filtro
-        mask = (df[coluna] >= data_inicial) & (df[coluna] <= data_final)
-        filtered_df = df[mask]
+
+        indice = obter_indice_datas(df, coluna)
+        if indice is not None:
+            valores, permutacao = indice
+            if valores[-1] == np.iinfo('int64').min:  # NaT
+                raise ValueError(f"Coluna '{coluna}' não possui valores válidos de data.")
+
+            # Busca binária do período nos valores ordenados (na unidade da coluna)
+            unidade = df[coluna].dt.unit
+            inicio = np.searchsorted(valores, data_inicial.as_unit(unidade).asm8.view('i8'), side='left')
+            fim = np.searchsorted(valores, data_final.as_unit(unidade).asm8.view('i8'), side='right')
+            if permutacao is None:
+                filtered_df = df.iloc[inicio:fim]
+            else:
+                filtered_df = df.iloc[np.sort(permutacao[inicio:fim])]
+        else:
+            # Garantir formato de data (sem alterar o DataFrame recebido)
+            datas = process_date_column(df[coluna])
+            if datas.isna().all():
+                raise ValueError(f"Coluna '{coluna}' não possui valores válidos de data.")
+
+            # Aplicar filtro
+            mask = (datas >= data_inicial) & (datas <= data_final)
+            filtered_df = df[mask]
         
         if filtered_df.empty:
             st.warning(f"Nenhum dado encontrado para o período de {data_inicial.strftime('%d/%m/%Y')} a {data_final.strftime('%d/%m/%Y')}")
@@ -113,6 +262,16 @@ def calcular_metricas(df):
         st.error(f"Erro ao calcular métricas: {str(e)}")
         return 0, 0.0, "Erro no cálculo"
 
+# Função para montar o ranking das localidades
+def calcular_ranking_localidades(df):
+    """
+    Soma o valor e conta as multas por local, do maior para o menor valor total.
+    """
+    return df.groupby('Local da Infração', as_index=False, observed=True).agg(
+        Valor_Total=('Valor a ser pago R$', 'sum'),
+        Total_Multas=('Local da Infração', 'count')
+    ).sort_values(by='Valor_Total', ascending=False)
+
 # Função para filtrar multas não pagas
 def filtrar_multas_nao_pagas(df):
     """
@@ -0,0 +1,160 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Caminho do banco SQLite de coordenadas
+GEOCODE_DB_FILE = "geocodes.sqlite3"
+
+# Validade (em segundos) das entradas sem resultado; None para nunca expirar
+NEGATIVE_TTL = 30 * 24 * 3600
+
+# Limite de variáveis por comando SQL nas consultas em lote
+_LOTE_SQL = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS geocodes (
+    address TEXT PRIMARY KEY,
+    lat REAL,
+    lng REAL,
+    provider TEXT,
+    updated_at REAL NOT NULL,
+    expires_at REAL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_geocodes_expires_at ON geocodes (expires_at);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+) WITHOUT ROWID;
+"""
+
+
+class GeocodeStore:
+    """
+    Armazena coordenadas geocodificadas em SQLite (modo WAL).
+
+    Cada entrada guarda latitude/longitude (ou NULL quando o provedor não teve
+    resultado), o provedor, o instante da gravação e, opcionalmente, o instante
+    de expiração. As gravações em lote ocorrem numa única transação, de modo que
+    sessões concorrentes nunca veem nem sobrescrevem um arquivo pela metade.
+
+    Parameters:
+        path (str): Caminho do banco.
+        negative_ttl (float): Validade das entradas sem resultado, em segundos.
+    """
+
+    def __init__(self, path=GEOCODE_DB_FILE, negative_ttl=NEGATIVE_TTL):
+        self.path = path
+        self.negative_ttl = negative_ttl
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connection(self):
+        """Retorna a conexão da thread atual (conexões SQLite não são compartilhadas entre threads)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get_many(self, addresses):
+        """
+        Busca várias chaves de uma vez, ignorando entradas expiradas.
+
+        Returns:
+            dict: endereço -> (latitude, longitude), ou None para entradas sem
+            resultado. Endereços ausentes ficam de fora.
+        """
+        addresses = list(dict.fromkeys(addresses))
+        agora = time.time()
+        encontrados = {}
+        conn = self._connection()
+        for inicio in range(0, len(addresses), _LOTE_SQL):
+            lote = addresses[inicio:inicio + _LOTE_SQL]
+            linhas = conn.execute(
+                f"SELECT address, lat, lng FROM geocodes WHERE address IN ({','.join('?' * len(lote))}) "
+                "AND (expires_at IS NULL OR expires_at > ?)",
+                (*lote, agora),
+            )
+            for address, lat, lng in linhas:
+                encontrados[address] = None if lat is None else (lat, lng)
+        return encontrados
+
+    def get(self, address, default=None):
+        """Busca uma única chave; retorna 'default' se ausente ou expirada."""
+        return self.get_many([address]).get(address, default)
+
+    def upsert_many(self, items, provider="opencage"):
+        """
+        Insere ou atualiza várias entradas numa única transação.
+
+        Parameters:
+            items (dict): endereço -> (latitude, longitude), ou None sem resultado.
+            provider (str): Provedor que produziu as coordenadas.
+        """
+        agora = time.time()
+        expira_negativo = agora + self.negative_ttl if self.negative_ttl is not None else None
+        linhas = [
+            (address, *(coords if coords else (None, None)), provider, agora,
+             None if coords else expira_negativo)
+            for address, coords in items.items()
+        ]
+        with self._connection() as conn:
+            conn.executemany(
+                "INSERT INTO geocodes (address, lat, lng, provider, updated_at, expires_at) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(address) DO UPDATE SET lat = excluded.lat, lng = excluded.lng, "
+                "provider = excluded.provider, updated_at = excluded.updated_at, "
+                "expires_at = excluded.expires_at",
+                linhas,
+            )
+
+    def purge_expired(self):
+        """Remove as entradas expiradas e retorna quantas foram removidas."""
+        with self._connection() as conn:
+            return conn.execute(
+                "DELETE FROM geocodes WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),)
+            ).rowcount
+
+    def __len__(self):
+        return self._connection().execute("SELECT COUNT(*) FROM geocodes").fetchone()[0]
+
+    def import_json(self, json_path, provider="opencage", normalize=None):
+        """
+        Importa, uma única vez, um cache JSON no formato {endereço: [lat, lng]}.
+        A importação fica registrada na tabela 'meta' e não é repetida.
+
+        Parameters:
+            json_path (str): Caminho do arquivo JSON.
+            provider (str): Provedor atribuído às entradas importadas.
+            normalize (callable): Função aplicada às chaves antes da importação.
+
+        Returns:
+            int: Número de entradas importadas (0 se já importado ou inexistente).
+        """
+        chave_meta = f"json_importado:{os.path.abspath(json_path)}"
+        conn = self._connection()
+        if conn.execute("SELECT 1 FROM meta WHERE key = ?", (chave_meta,)).fetchone():
+            return 0
+        if not os.path.exists(json_path):
+            return 0
+        try:
+            with open(json_path, 'r') as file:
+                cache = json.load(file)
+        except (IOError, json.JSONDecodeError) as e:
+            print(f"Erro ao importar o cache JSON: {e}")
+            return 0
+
+        items = {}
+        for address, coords in cache.items():
+            chave = normalize(address) if normalize else address
+            if items.get(chave) is None:
+                items[chave] = tuple(coords) if coords else None
+        self.upsert_many(items, provider)
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (chave_meta, str(time.time())))
+        return len(items)
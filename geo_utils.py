@@ -1,90 +1,364 @@
-import os
 import json
+import re
+import threading
+import unicodedata
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
 import streamlit as st
+from cache_manager import (
+    CACHE_FILE, JsonFileCache, MemoryLRUCache, SqliteCache, TieredCache, coordinates_from_secrets
+)
+from geo_store import GeocodeStore, GEOCODE_DB_FILE
 
-# Caminho do arquivo de cache de coordenadas
-CACHE_FILE = "coordinates_cache.json"
+# Endpoint da API de geocodificação do OpenCage
+OPENCAGE_URL = "https://api.opencagedata.com/geocode/v1/json"
 
+# Parâmetros da geocodificação concorrente (a cota gratuita do OpenCage é de 1 req/s)
+GEOCODING_MAX_WORKERS = 4
+GEOCODING_RATE_LIMIT = 1.0
+GEOCODING_MAX_RETRIES = 5
+GEOCODING_BACKOFF = 1.0
 
-def load_cache():
+# Siglas de rodovias federais (BR) e estaduais (UF) reconhecidas na normalização
+SIGLAS_RODOVIAS = (
+    "BR", "AC", "AL", "AM", "AP", "BA", "CE", "DF", "ES", "GO", "MA", "MG", "MS", "MT", "PA",
+    "PB", "PE", "PI", "PR", "RJ", "RN", "RO", "RR", "RS", "SC", "SE", "SP", "TO",
+)
+_RE_RODOVIA = re.compile(r"\b(" + "|".join(SIGLAS_RODOVIAS) + r")\s*-?\s*(\d{2,3})\b")
+_RE_KM = re.compile(r"\bKM\s*-?\s*(\d+)|\b(\d+)\s*KM\b")
+_RE_CIDADE = re.compile(r"-\s*([A-Z][A-Z ]*)$")
+
+# Sessão HTTP compartilhada, com pool de conexões
+_session = None
+_session_lock = threading.Lock()
+
+# Cache de coordenadas compartilhado pelo processo (memória + SQLite)
+_store = None
+_store_lock = threading.Lock()
+
+
+def load_cache(path=None):
     """
-    Carrega o cache do arquivo JSON.
+    Abre o cache de coordenadas em arquivo JSON, com as chaves normalizadas.
+
+    Parameters:
+        path (str): Arquivo de cache; usa CACHE_FILE se omitido.
 
     Returns:
-        dict: O cache carregado, ou um dicionário vazio caso não exista.
+        JsonFileCache: O cache, vazio caso o arquivo não exista.
     """
-    if os.path.exists(CACHE_FILE):
-        try:
-            with open(CACHE_FILE, 'r') as file:
-                return json.load(file)
-        except (IOError, json.JSONDecodeError) as e:
-            print(f"Erro ao carregar o cache: {e}")
-    return {}
+    return JsonFileCache(path or CACHE_FILE, normalize=normalize_address)
+
 
+def load_store():
+    """
+    Retorna o cache de coordenadas do processo, criando-o na primeira chamada:
+    uma camada LRU em memória, compartilhada por todas as sessões do Streamlit,
+    na frente do armazenamento SQLite. Na criação, o cache JSON existente e as
+    coordenadas do secrets.toml são importados com as chaves normalizadas.
 
-def save_cache(cache):
+    Returns:
+        TieredCache: O cache compartilhado.
     """
-    Salva o cache no arquivo JSON.
+    global _store
+    with _store_lock:
+        if _store is None:
+            store = GeocodeStore(GEOCODE_DB_FILE)
+            store.import_json(CACHE_FILE, normalize=normalize_address)
+            # Locais sem resultado expiram na memória no mesmo prazo do SQLite
+            _store = TieredCache(MemoryLRUCache(none_ttl=store.negative_ttl), SqliteCache(store))
+            seed = coordinates_from_secrets()
+            if seed:
+                _store.set_many({chave: tuple(coords) if coords else None for chave, coords in migrate_cache(seed).items()})
+        return _store
+
+
+def normalize_address(local):
+    """
+    Normaliza um endereço para uso como chave do cache de coordenadas.
+
+    Remove acentos, converte para maiúsculas e colapsa espaços e pontuação.
+    Endereços de rodovia com quilômetro e cidade identificáveis são reduzidos à
+    forma canônica 'BR-101 KM-414 -ITAGUAI', descartando sentido (NORTE/SUL),
+    metros e UF, de modo que variantes do mesmo ponto compartilhem a chave.
 
     Parameters:
-        cache (dict): Dados a serem armazenados no cache.
+        local (str): O endereço original.
+
+    Returns:
+        str: O endereço normalizado.
     """
-    try:
-        with open(CACHE_FILE, 'w') as file:
-            json.dump(cache, file, indent=4)
-    except IOError as e:
-        print(f"Erro ao salvar o cache: {e}")
+    texto = unicodedata.normalize("NFKD", str(local))
+    texto = "".join(c for c in texto if not unicodedata.combining(c)).upper()
+    texto = re.sub(r"\s+", " ", texto).strip()
+
+    rodovias = _RE_RODOVIA.findall(texto)
+    # O quilômetro é buscado sem as rodovias, para não confundir 'BR 101 KM' com '101 KM'
+    km = _RE_KM.search(_RE_RODOVIA.sub(" ", texto))
+    cidade = _RE_CIDADE.search(texto)
+    if rodovias and km and cidade:
+        # Rodovias federais têm preferência quando o endereço cita BR e estadual
+        sigla, numero = next((r for r in rodovias if r[0] == "BR"), rodovias[0])
+        return f"{sigla}-{int(numero):03d} KM-{int(km.group(1) or km.group(2))} -{cidade.group(1).strip()}"
 
+    texto = re.sub(r"[^\w\s/-]", " ", texto)
+    texto = re.sub(r"\s*-\s*", "-", texto)
+    return re.sub(r"\s+", " ", texto).strip()
 
-def get_coordinates(local, api_key):
+
+def migrate_cache(cache):
     """
-    Busca as coordenadas para um local usando a API OpenCage.
+    Reescreve as chaves do cache na forma normalizada. Quando várias chaves
+    colapsam na mesma, prevalece a primeira com coordenadas.
+
+    Parameters:
+        cache (dict): Cache com chaves possivelmente não normalizadas.
+
+    Returns:
+        dict: Novo cache com chaves normalizadas.
+    """
+    migrado = {}
+    for local, coords in cache.items():
+        chave = normalize_address(local)
+        if migrado.get(chave) is None:
+            migrado[chave] = coords
+    return migrado
+
+
+def normalization_report(locais):
+    """
+    Calcula quantas consultas à API a normalização evita para um conjunto de
+    endereços (cada endereço distinto custa uma consulta).
+
+    Returns:
+        dict: Endereços distintos antes e depois e as consultas economizadas.
+    """
+    originais = set(locais)
+    normalizados = {normalize_address(local) for local in originais}
+    return {
+        "enderecos_originais": len(originais),
+        "enderecos_normalizados": len(normalizados),
+        "consultas_economizadas": len(originais) - len(normalizados),
+    }
+
+
+def migrate_cache_file(path=None):
+    """
+    Normaliza as chaves do arquivo de cache e o regrava.
+
+    Parameters:
+        path (str): Arquivo de cache; usa CACHE_FILE se omitido.
+
+    Returns:
+        dict: Relatório de normalization_report sobre as chaves originais.
+    """
+    path = path or CACHE_FILE
+    with open(path, 'r') as file:
+        cache = json.load(file)
+    load_cache(path).save()
+    return normalization_report(cache)
+
+
+class TokenBucket:
+    """
+    Limitador de taxa do tipo token bucket, seguro entre threads.
+
+    Parameters:
+        rate (float): Fichas repostas por segundo (requisições por segundo).
+        capacity (float): Número máximo de fichas acumuladas (rajada permitida).
+    """
+
+    def __init__(self, rate, capacity=1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Bloqueia até que uma ficha esteja disponível e a consome."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def get_session(pool_size=GEOCODING_MAX_WORKERS):
+    """
+    Retorna a sessão HTTP compartilhada, criando-a na primeira chamada.
+
+    Returns:
+        requests.Session: Sessão com pool de conexões reutilizáveis.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+        return _session
+
+
+def fetch_coordinates(local, api_key, limiter, session=None, max_retries=GEOCODING_MAX_RETRIES,
+                      backoff=GEOCODING_BACKOFF):
+    """
+    Busca as coordenadas de um local respeitando o limitador de taxa e repetindo
+    a consulta com espera exponencial em respostas 429 e 5xx.
 
     Parameters:
         local (str): O local para buscar as coordenadas.
         api_key (str): A chave de API do OpenCage.
+        limiter (TokenBucket): Limitador de taxa compartilhado.
+        session (requests.Session): Sessão HTTP; usa a compartilhada se omitida.
+        max_retries (int): Número máximo de novas tentativas.
+        backoff (float): Espera base, em segundos, entre as tentativas.
 
     Returns:
-        tuple: Uma tupla (latitude, longitude) ou (None, None) caso falhe.
+        tuple | None: (latitude, longitude); None se a API não tiver resultado.
+
+    Raises:
+        requests.RequestException: Se a consulta falhar após todas as tentativas.
     """
-    url = f"https://api.opencagedata.com/geocode/v1/json?q={local}&key={api_key}"
-    try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        if 'results' in data and data['results']:
-            geometry = data['results'][0]['geometry']
-            return geometry['lat'], geometry['lng']
+    session = session or get_session()
+    for attempt in range(max_retries + 1):
+        limiter.acquire()
+        try:
+            response = session.get(OPENCAGE_URL, params={"q": local, "key": api_key}, timeout=10)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt == max_retries:
+                raise
         else:
-            print(f"Nenhum resultado encontrado para o local: {local}")
-    except requests.RequestException as e:
-        print(f"Erro ao buscar coordenadas: {e}")
-    return None, None
+            if response.status_code != 429 and response.status_code < 500:
+                response.raise_for_status()
+                results = response.json().get('results')
+                if not results:
+                    return None
+                geometry = results[0]['geometry']
+                return geometry['lat'], geometry['lng']
+            if attempt == max_retries:
+                response.raise_for_status()
+            retry_after = response.headers.get("Retry-After", "")
+            if retry_after.isdigit():
+                time.sleep(int(retry_after))
+                continue
+        time.sleep(backoff * 2 ** attempt)
+
+
+def geocode_concurrently(locais, api_key, max_workers=GEOCODING_MAX_WORKERS,
+                         rate_limit=GEOCODING_RATE_LIMIT, max_retries=GEOCODING_MAX_RETRIES,
+                         backoff=GEOCODING_BACKOFF):
+    """
+    Geocodifica vários locais em paralelo, com sessão HTTP compartilhada e
+    taxa total limitada a 'rate_limit' requisições por segundo.
+
+    Returns:
+        dict: Mapeamento local -> (latitude, longitude), ou None quando a API não
+        tem resultado. Locais cuja consulta falhou ficam de fora.
+    """
+    limiter = TokenBucket(rate_limit, capacity=max(1.0, rate_limit))
+    session = get_session(max_workers)
+
+    def consultar(local):
+        try:
+            return local, fetch_coordinates(local, api_key, limiter, session, max_retries, backoff)
+        except requests.RequestException as e:
+            print(f"Erro ao buscar coordenadas de {local}: {e}")
+            return local, False
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        resultados = dict(executor.map(consultar, locais))
+    return {local: coords for local, coords in resultados.items() if coords is not False}
 
 
-def get_cached_coordinates(local, api_key, cache):
+def get_cached_coordinates(local, api_key, cache, **kwargs):
     """
-    Obtém coordenadas do cache ou faz a busca na API e atualiza o cache.
+    Obtém as coordenadas de um único local, consultando o cache e, se preciso,
+    a API pelo mesmo caminho da geocodificação em lote (ver get_coordinates_batch).
 
     Parameters:
         local (str): O local a ser buscado.
         api_key (str): A chave de API.
-        cache (dict): O dicionário de cache de coordenadas.
+        cache (CacheBackend): O cache de coordenadas.
+        **kwargs: Parâmetros repassados a geocode_concurrently.
 
     Returns:
-        tuple: Uma tupla (latitude, longitude).
-    """
-    # Busca no cache
-    if local in cache:
-        return cache[local]
-
-    # Caso não esteja no cache, buscar na API
-    lat, lng = get_coordinates(local, api_key)
-    if lat is not None and lng is not None:
-        cache[local] = (lat, lng)
-        save_cache(cache)  # Atualiza o cache
-    return lat, lng
+        tuple: Uma tupla (latitude, longitude); (None, None) se não encontrado.
+    """
+    return get_coordinates_batch([local], api_key, cache, **kwargs)[local]
+
+
+def get_coordinates_batch(locais, api_key, cache, **kwargs):
+    """
+    Obtém as coordenadas de um conjunto de locais. O cache é consultado pela
+    chave normalizada (ver normalize_address), de modo que variantes do mesmo
+    endereço geram uma única consulta. Os ausentes do cache são consultados em
+    paralelo (ver geocode_concurrently) e o cache é gravado uma única vez ao
+    final. Locais sem resultado na API ficam registrados no cache como None,
+    para não serem consultados novamente a cada execução.
+
+    Parameters:
+        locais (iterable): Locais a serem buscados (repetições são ignoradas).
+        api_key (str): A chave de API.
+        cache (CacheBackend): O cache de coordenadas.
+        **kwargs: Parâmetros repassados a geocode_concurrently.
+
+    Returns:
+        dict: Mapeamento local -> (latitude, longitude); (None, None) se não encontrado.
+    """
+    chaves = {local: normalize_address(local) for local in dict.fromkeys(locais)}
+    conhecidos = cache.get_many(set(chaves.values()))
+
+    # Um endereço original representa cada chave ausente na consulta à API
+    ausentes = {}
+    for local, chave in chaves.items():
+        if chave not in conhecidos:
+            ausentes.setdefault(chave, local)
+    if ausentes:
+        encontrados = geocode_concurrently(list(ausentes.values()), api_key, **kwargs)
+        novos = {chaves[local]: coords for local, coords in encontrados.items()}
+        if novos:
+            cache.set_many(novos)
+            conhecidos.update(novos)
+
+    return {local: tuple(conhecidos.get(chave) or (None, None)) for local, chave in chaves.items()}
+
+
+def add_coordinates(df, api_key, cache, column='Local da Infração', **kwargs):
+    """
+    Adiciona as colunas 'Latitude' e 'Longitude' ao DataFrame, geocodificando
+    cada local distinto uma única vez e distribuindo as coordenadas para as
+    linhas pelos códigos do local.
+
+    Parameters:
+        df (DataFrame): Dados com a coluna de local.
+        api_key (str): A chave de API.
+        cache (CacheBackend): O cache de coordenadas.
+        column (str): Nome da coluna com o local.
+        **kwargs: Parâmetros repassados a geocode_concurrently.
+
+    Returns:
+        DataFrame: O próprio DataFrame, com as colunas de coordenadas.
+    """
+    codigos, unicos = pd.factorize(df[column], use_na_sentinel=True)
+    coordenadas = get_coordinates_batch(unicos, api_key, cache, **kwargs)
+
+    # O código -1 (local ausente) aponta para o NaN acrescentado ao final
+    latitudes = np.array([coordenadas[local][0] for local in unicos] + [None], dtype=float)
+    longitudes = np.array([coordenadas[local][1] for local in unicos] + [None], dtype=float)
+    df['Latitude'] = latitudes[codigos]
+    df['Longitude'] = longitudes[codigos]
+    return df
 
 
 def get_api_key():
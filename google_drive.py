@@ -1,34 +1,20 @@
 import pandas as pd
-from googleapiclient.discovery import build
-from google.oauth2.service_account import Credentials
-from googleapiclient.http import MediaIoBaseDownload
-from io import BytesIO
 import streamlit as st
-import json
+from data_loader import ErroConfiguracao, baixar_se_modificado, obter_credenciais, obter_servico_drive
 
 def get_service_account_credentials():
     """
     Obtém as credenciais de conta de serviço do Google Drive a partir do painel do Streamlit.
+    As credenciais são criadas uma única vez por processo e compartilhadas.
     Retorna um objeto Credentials autenticado.
     """
     try:
-        # Obter credenciais do painel do Streamlit diretamente como uma string JSON
-        credentials_info_str = st.secrets["CREDENTIALS"]  # As credenciais são lidas como string no painel
-        credentials_info = json.loads(credentials_info_str)  # Convertendo a string JSON para um dicionário Python
-
-        # Define os escopos necessários
-        scopes = ["https://www.googleapis.com/auth/drive.readonly"]
-
-        # Cria o objeto Credentials
-        credentials = Credentials.from_service_account_info(credentials_info, scopes=scopes)
+        credentials = obter_credenciais()
         st.info("Credenciais de serviço obtidas com sucesso.")
         return credentials
 
-    except KeyError as e:
-        st.error(f"Chave ausente nas credenciais: {str(e)}")
-        return None
-    except json.JSONDecodeError as e:
-        st.error(f"Erro ao interpretar o JSON das credenciais: {str(e)}")
+    except ErroConfiguracao as e:
+        st.error(str(e))
         return None
     except Exception as e:
         st.error(f"Erro ao carregar as credenciais: {str(e)}")
@@ -36,10 +22,10 @@ def get_service_account_credentials():
 
 def get_drive_service(credentials):
     """
-    Cria e retorna um objeto de serviço do Google Drive autenticado.
+    Retorna o objeto de serviço do Google Drive autenticado, compartilhado pelo processo.
     """
     try:
-        service = build("drive", "v3", credentials=credentials)
+        service = obter_servico_drive()
         st.info("Serviço do Google Drive criado com sucesso.")
         return service
     except Exception as e:
@@ -62,17 +48,13 @@ def get_file_id():
 def download_file(service, file_id):
     """
     Faz o download do arquivo do Google Drive com o ID especificado.
+    O download só ocorre quando os metadados do arquivo mudaram desde a última
+    execução; caso contrário, é usada a cópia local.
     Retorna os dados do arquivo como um objeto BytesIO.
     """
     try:
-        request = service.files().get_media(fileId=file_id)
-        buffer = BytesIO()
-        downloader = MediaIoBaseDownload(buffer, request)
-        done = False
-        while not done:
-            _, done = downloader.next_chunk()
-        buffer.seek(0)
-        st.info("Arquivo baixado com sucesso do Google Drive.")
+        buffer = baixar_se_modificado(service, file_id)
+        st.info("Arquivo obtido com sucesso do Google Drive.")
         return buffer
     except Exception as e:
         st.error(f"Erro ao baixar o arquivo do Google Drive: {str(e)}")
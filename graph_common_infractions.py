@@ -1,6 +1,21 @@
 import pandas as pd
 import plotly.express as px
 
+def get_infraction_frequencies(data):
+    """
+    Count the fines for each (infraction code, description) pair.
+
+    Parameters:
+        data (DataFrame): The filtered data containing fines information.
+
+    Returns:
+        DataFrame: 'Enquadramento da Infração', 'Descrição' and 'Frequência'.
+    """
+    # Agrupar por 'Enquadramento da Infração' para calcular frequências
+    infraction_data = data.groupby(['Enquadramento da Infração', 'Descrição'], observed=True)['Auto de Infração'].count().reset_index()
+    infraction_data.rename(columns={'Auto de Infração': 'Frequência'}, inplace=True)
+    return infraction_data
+
 def create_common_infractions_chart(data):
     """
     Create a bar chart to display the most common infractions and their descriptions.
@@ -11,16 +26,24 @@ def create_common_infractions_chart(data):
     Returns:
         fig (plotly.graph_objects.Figure): A bar chart of the most common infractions.
     """
-    # Agrupar por 'Enquadramento da Infração' para calcular frequências
-    infraction_data = data.groupby(['Enquadramento da Infração', 'Descrição'])['Auto de Infração'].count().reset_index()
-    infraction_data.rename(columns={'Auto de Infração': 'Frequência'}, inplace=True)
+    return create_common_infractions_figure(get_infraction_frequencies(data))
 
+def create_common_infractions_figure(infraction_data):
+    """
+    Create the most common infractions bar chart from the infraction frequencies.
+
+    Parameters:
+        infraction_data (DataFrame): Output of get_infraction_frequencies (or DailyCube.infraction_frequencies).
+
+    Returns:
+        fig (plotly.graph_objects.Figure): A bar chart of the most common infractions.
+    """
     # Ordenar pelos mais frequentes
     infraction_data = infraction_data.sort_values(by='Frequência', ascending=False).head(10)
 
     # Criar o texto formatado lado a lado
     infraction_data['Texto'] = (
-        infraction_data['Enquadramento da Infração'] + " | " +
+        infraction_data['Enquadramento da Infração'].astype(str) + " | " +
         infraction_data['Frequência'].astype(str) + " ocorrências"
     )
 
@@ -1,6 +1,7 @@
 import pandas as pd
 import plotly.express as px
 from datetime import datetime
+from data_loader import process_currency_column, process_date_column
 
 def create_fines_accumulated_chart(data, period='M'):
     """
@@ -13,26 +14,18 @@ def create_fines_accumulated_chart(data, period='M'):
     Retorna:
         fig (plotly.graph_objects.Figure): Um gráfico de linhas mostrando quantidade e valor acumulado de multas.
     """
-    # Garantir que 'Data da Infração' seja datetime
-    data['Data da Infração'] = pd.to_datetime(data['Data da Infração'], errors='coerce')
-
-    # Remover linhas com datas inválidas
-    data = data.dropna(subset=['Data da Infração'])
-    
-    # Filtrar apenas o ano atual (2024)
-    data = data[data['Data da Infração'].dt.year == 2024]
-
-    # Garantir que 'Valor a ser pago R$' esteja em formato numérico
-    data['Valor a ser pago R$'] = (
-        data['Valor a ser pago R$']
-        .astype(str)
-        .str.replace(r'[^\d,.-]', '', regex=True)
-        .str.replace(',', '.')
-        .astype(float)
-    )
-
-    # Criar um campo de período com base nos meses do ano
-    data['Período'] = data['Data da Infração'].dt.to_period('M').dt.to_timestamp()
+    # Garantir que 'Data da Infração' seja datetime (sem alterar o DataFrame recebido)
+    datas = process_date_column(data['Data da Infração'])
+
+    # Filtrar apenas o ano atual (2024); datas inválidas ficam de fora
+    no_ano = datas.dt.year == 2024
+
+    # Montar só as colunas usadas, com o campo de período (mês ou semana) da infração
+    data = pd.DataFrame({
+        'Período': datas.dt.to_period(period).dt.to_timestamp(),
+        'Auto de Infração': data['Auto de Infração'],
+        'Valor a ser pago R$': process_currency_column(data['Valor a ser pago R$']),
+    })[no_ano]
 
     # Agregar dados: contar multas e somar valores por período
     fines_by_period = data.groupby('Período').agg(
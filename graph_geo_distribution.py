@@ -1,12 +1,301 @@
+import hashlib
+import html
+import json
+
 import folium
+import numpy as np
 import pandas as pd
-from geo_utils import load_cache, save_cache, get_cached_coordinates
+from branca.colormap import LinearColormap
+from folium.features import CustomIcon
+from folium.plugins import FastMarkerCluster
+from cache_manager import MemoryLRUCache
+from geo_utils import load_store, add_coordinates
 from streamlit_folium import st_folium
 
-def create_geo_map(filtered_data, api_key):
+# Ícone dos marcadores de multa
+ICON_URL = "https://cdn-icons-png.flaticon.com/512/1828/1828843.png"
+ICON_SIZE = (30, 30)
+
+# Modos de exibição do mapa
+MAP_MODE_CLUSTERED = "Agrupado por local"
+MAP_MODE_INDIVIDUAL = "Uma marca por multa"
+MAP_MODE_DENSITY = "Densidade (hexágonos)"
+MAP_MODES = [MAP_MODE_CLUSTERED, MAP_MODE_INDIVIDUAL, MAP_MODE_DENSITY]
+
+# Raio dos hexágonos do modo densidade, em pixels de tela (o tamanho em graus
+# acompanha o zoom, de modo que a grade fica mais fina ao aproximar)
+HEX_RADIUS_PX = 18
+
+# Mapas montados mantidos por sessão (um por combinação de dados, modo e vista)
+MAP_CACHE_ENTRIES = 4
+
+# Colunas que determinam o conteúdo do mapa
+MAP_COLUMNS = ['Local da Infração', 'Valor a ser pago R$', 'Data da Infração', 'Latitude', 'Longitude']
+
+# Cria os marcadores no navegador a partir de [lat, lng, popup], com um único ícone compartilhado
+_CLUSTER_CALLBACK = """(function () {
+    var icone = L.icon({iconUrl: %s, iconSize: %s});
+    return function (row) {
+        var marker = L.marker(new L.LatLng(row[0], row[1]), {icon: icone});
+        marker.bindPopup(row[2], {maxWidth: 300});
+        return marker;
+    };
+})()"""
+
+
+def aggregate_fines_by_location(map_data):
+    """
+    Agrega as multas por coordenada: quantidade, valor total e período das infrações.
+
+    Parameters:
+        map_data (pd.DataFrame): Multas com 'Latitude' e 'Longitude'.
+
+    Returns:
+        pd.DataFrame: Uma linha por coordenada distinta.
+    """
+    return map_data.groupby(['Latitude', 'Longitude'], sort=False, observed=True).agg(
+        Local=('Local da Infração', 'first'),
+        Total_Multas=('Valor a ser pago R$', 'size'),
+        Valor_Total=('Valor a ser pago R$', 'sum'),
+        Primeira_Infracao=('Data da Infração', 'min'),
+        Ultima_Infracao=('Data da Infração', 'max'),
+    ).reset_index()
+
+
+def _format_date(data):
+    return data.strftime('%d/%m/%Y') if pd.notnull(data) else "Não disponível"
+
+
+def add_clustered_markers(map_object, map_data, icon_url=ICON_URL):
+    """
+    Adiciona ao mapa um marcador por local (com o resumo das multas no popup),
+    agrupados no navegador pelo FastMarkerCluster.
+    """
+    agregado = aggregate_fines_by_location(map_data)
+    dados = [
+        [
+            lat, lng,
+            f"<b>Local:</b> {html.escape(str(local))}<br>"
+            f"<b>Multas:</b> {total}<br>"
+            f"<b>Valor Total:</b> R$ {valor:.2f}<br>"
+            f"<b>Período:</b> {_format_date(primeira)} a {_format_date(ultima)}",
+        ]
+        for lat, lng, local, total, valor, primeira, ultima in zip(
+            agregado['Latitude'], agregado['Longitude'], agregado['Local'], agregado['Total_Multas'],
+            agregado['Valor_Total'], agregado['Primeira_Infracao'], agregado['Ultima_Infracao'],
+        )
+    ]
+    callback = _CLUSTER_CALLBACK % (json.dumps(icon_url), json.dumps(list(ICON_SIZE)))
+    FastMarkerCluster(dados, callback=callback).add_to(map_object)
+
+
+def _mercator_y(lat):
+    """Latitude (graus) -> coordenada y da projeção de Mercator, em graus."""
+    return np.degrees(np.log(np.tan(np.pi / 4 + np.radians(lat) / 2)))
+
+
+def _mercator_lat(y):
+    """Coordenada y da projeção de Mercator (graus) -> latitude, em graus."""
+    return np.degrees(2 * np.arctan(np.exp(np.radians(y))) - np.pi / 2)
+
+
+def _hex_size(zoom, radius_px=HEX_RADIUS_PX):
+    """Raio das células hexagonais, em graus de Mercator, para o zoom informado."""
+    return radius_px * 360 / (256 * 2 ** zoom)
+
+
+def _hex_cells(latitudes, longitudes, size):
+    """
+    Célula hexagonal (coordenadas axiais q, r) de cada ponto, numa grade de
+    raio 'size' em graus de Mercator; devolve um array inteiro (n, 2).
+    """
+    x = np.asarray(longitudes, dtype="float64") / size
+    y = _mercator_y(np.asarray(latitudes, dtype="float64")) / size
+
+    # Coordenadas axiais (hexágonos com o vértice para cima) arredondadas em coordenadas cúbicas
+    q = np.sqrt(3) / 3 * x - y / 3
+    r = 2 / 3 * y
+    s = -q - r
+    rq, rr, rs = np.round(q), np.round(r), np.round(s)
+    dq, dr, ds = np.abs(rq - q), np.abs(rr - r), np.abs(rs - s)
+    corrige_q = (dq > dr) & (dq > ds)
+    corrige_r = ~corrige_q & (dr > ds)
+    rq = np.where(corrige_q, -rr - rs, rq)
+    rr = np.where(corrige_r, -rq - rs, rr)
+    return np.stack([rq.astype("int64"), rr.astype("int64")], axis=-1)
+
+
+def hexbin_fines(latitudes, longitudes, values, zoom, radius_px=HEX_RADIUS_PX):
+    """
+    Agrupa as multas numa grade hexagonal (na projeção de Mercator, para que os
+    hexágonos fiquem regulares na tela), somando a quantidade e o valor por célula.
+
+    Parameters:
+        latitudes, longitudes (array-like): Coordenadas de cada multa.
+        values (array-like): Valor de cada multa.
+        zoom (int): Zoom do mapa; define o tamanho das células.
+        radius_px (float): Raio das células em pixels de tela.
+
+    Returns:
+        dict: Arrays por célula: 'x', 'y' (centro, em graus de Mercator),
+        'count', 'total' e o raio 'size' (em graus de Mercator).
+    """
+    size = _hex_size(zoom, radius_px)
+    celulas = _hex_cells(latitudes, longitudes, size)
+    unicas, codigos = np.unique(celulas, axis=0, return_inverse=True)
+    codigos = codigos.ravel()
+    cq, cr = unicas[:, 0], unicas[:, 1]
+    return {
+        "x": size * np.sqrt(3) * (cq + cr / 2),
+        "y": size * 1.5 * cr,
+        "count": np.bincount(codigos, minlength=len(unicas)),
+        "total": np.bincount(codigos, weights=np.asarray(values, dtype="float64"), minlength=len(unicas)),
+        "size": size,
+    }
+
+
+def fines_in_hex_cell(map_data, lat, lng, zoom, radius_px=HEX_RADIUS_PX):
+    """
+    Multas da célula hexagonal que contém o ponto clicado, na mesma grade
+    desenhada por add_density_layer para o zoom informado.
+
+    Parameters:
+        map_data (pd.DataFrame): Multas com coordenadas.
+        lat, lng (float): Ponto clicado no mapa.
+        zoom (int): Zoom com que a camada de densidade foi montada.
+        radius_px (float): Raio das células em pixels de tela.
+
+    Returns:
+        pd.DataFrame: As linhas de map_data que caem na célula.
+    """
+    size = _hex_size(zoom, radius_px)
+    celula = _hex_cells(lat, lng, size)
+    celulas = _hex_cells(map_data['Latitude'], map_data['Longitude'], size)
+    return map_data[(celulas == celula).all(axis=1)]
+
+
+def add_density_layer(map_object, map_data, zoom):
+    """
+    Adiciona ao mapa uma camada GeoJSON com um hexágono por célula ocupada,
+    colorido pela quantidade de multas; o tamanho da camada depende do número
+    de células, não do número de multas.
+    """
+    celulas = hexbin_fines(map_data['Latitude'], map_data['Longitude'],
+                           map_data['Valor a ser pago R$'].fillna(0), zoom)
+    angulos = np.radians(30 + 60 * np.arange(7))
+    vertices_x = celulas["x"][:, None] + celulas["size"] * np.cos(angulos)
+    vertices_lat = _mercator_lat(celulas["y"][:, None] + celulas["size"] * np.sin(angulos))
+    features = [
+        {
+            "type": "Feature",
+            "geometry": {"type": "Polygon", "coordinates": [np.column_stack([xs, lats]).round(5).tolist()]},
+            "properties": {"multas": int(total_multas), "valor_total": f"R$ {valor:,.2f}"},
+        }
+        for xs, lats, total_multas, valor in zip(vertices_x, vertices_lat, celulas["count"], celulas["total"])
+    ]
+    escala = LinearColormap(["#ffffb2", "#fd8d3c", "#bd0026"], vmin=1, vmax=max(int(celulas["count"].max()), 2))
+    folium.GeoJson(
+        {"type": "FeatureCollection", "features": features},
+        style_function=lambda feature: {
+            "fillColor": escala(feature["properties"]["multas"]),
+            "color": escala(feature["properties"]["multas"]),
+            "weight": 1,
+            "fillOpacity": 0.6,
+        },
+        tooltip=folium.GeoJsonTooltip(fields=["multas", "valor_total"], aliases=["Multas:", "Valor Total:"]),
+    ).add_to(map_object)
+
+
+def add_individual_markers(map_object, map_data, icon_url=ICON_URL):
+    """Adiciona ao mapa um marcador por multa, com o detalhe da multa no popup."""
+    for _, row in map_data.iterrows():
+        if pd.notnull(row['Latitude']) and pd.notnull(row['Longitude']):
+            popup_content = f"""
+            <b>Local:</b> {row['Local da Infração']}<br>
+            <b>Valor:</b> R$ {row['Valor a ser pago R$']:.2f}<br>
+            <b>Data da Infração:</b> {_format_date(row['Data da Infração'])}
+            """
+            folium.Marker(
+                location=[row['Latitude'], row['Longitude']],
+                popup=folium.Popup(popup_content, max_width=300),
+                icon=CustomIcon(icon_url, icon_size=ICON_SIZE),
+            ).add_to(map_object)
+
+
+def build_fines_map(map_data, mode=MAP_MODE_CLUSTERED, tiles="CartoDB dark_matter", zoom_start=5, location=None):
+    """
+    Monta o mapa folium das multas.
+
+    Parameters:
+        map_data (pd.DataFrame): Multas com coordenadas (linhas sem coordenadas são ignoradas).
+        mode (str): MAP_MODE_CLUSTERED (um marcador por local, agrupados),
+            MAP_MODE_INDIVIDUAL (um marcador por multa) ou MAP_MODE_DENSITY
+            (grade hexagonal na resolução de 'zoom_start').
+        tiles (str): Camada base do mapa.
+        zoom_start (int): Zoom inicial.
+        location (list): Centro inicial [lat, lng]; por padrão, a média das coordenadas.
+
+    Returns:
+        folium.Map: O mapa.
+    """
+    map_data = map_data.dropna(subset=['Latitude', 'Longitude'])
+    if location is None:
+        location = [map_data['Latitude'].mean(), map_data['Longitude'].mean()] if not map_data.empty else [-23.5505, -46.6333]
+    map_object = folium.Map(location=location, zoom_start=zoom_start, tiles=tiles)
+
+    if mode == MAP_MODE_INDIVIDUAL:
+        add_individual_markers(map_object, map_data)
+    elif map_data.empty:
+        pass
+    elif mode == MAP_MODE_DENSITY:
+        add_density_layer(map_object, map_data, zoom_start)
+    else:
+        add_clustered_markers(map_object, map_data)
+    return map_object
+
+
+def map_data_fingerprint(map_data):
+    """
+    Calcula uma impressão digital do conteúdo do mapa: as linhas (pelo índice)
+    e as colunas de MAP_COLUMNS.
+    """
+    colunas = [coluna for coluna in MAP_COLUMNS if coluna in map_data.columns]
+    hashes = pd.util.hash_pandas_object(map_data[colunas], index=True)
+    return hashlib.blake2b(hashes.to_numpy().tobytes(), digest_size=16).hexdigest()
+
+
+def new_map_cache(max_entries=MAP_CACHE_ENTRIES):
+    """Cria o cache de mapas montados (um por sessão; veja get_fines_map)."""
+    return MemoryLRUCache(max_entries)
+
+
+def get_fines_map(map_data, cache, mode=MAP_MODE_CLUSTERED, zoom_start=5, location=None):
+    """
+    Retorna o mapa das multas, reaproveitando o mapa já montado quando os dados
+    filtrados, o modo e a vista não mudaram (por exemplo, quando o rerun veio de
+    outro widget). O cache deve ser da sessão: o st_folium altera o mapa ao
+    renderizá-lo, então o mesmo objeto não deve ser usado por sessões concorrentes.
+
+    Parameters:
+        map_data (pd.DataFrame): Multas com coordenadas.
+        cache (MemoryLRUCache): Cache criado por new_map_cache.
+        mode, zoom_start, location: Repassados a build_fines_map.
+
+    Returns:
+        folium.Map: O mapa.
+    """
+    chave = (map_data_fingerprint(map_data), mode, zoom_start, tuple(location) if location else None)
+    map_object = cache.get(chave)
+    if map_object is None:
+        map_object = build_fines_map(map_data, mode, zoom_start=zoom_start, location=location)
+        cache.set_many({chave: map_object})
+    return map_object
+
+
+def create_geo_map(filtered_data, api_key, mode=MAP_MODE_CLUSTERED):
     """Create a geographical map for fines distribution."""
     # Load cache
-    coordinates_cache = load_cache()
+    coordinates_cache = load_store()
 
     # Prepare data for the map
     required_columns = ['Local da Infração', 'Valor a ser pago R$']
@@ -16,31 +305,11 @@ def create_geo_map(filtered_data, api_key):
 
     # Ensure no missing values in 'Local da Infração'
     map_data = filtered_data.dropna(subset=['Local da Infração']).copy()
-    map_data[['Latitude', 'Longitude']] = map_data['Local da Infração'].apply(
-        lambda x: pd.Series(get_cached_coordinates(x, api_key, coordinates_cache))
-    )
-
-    # Save updated cache
-    save_cache(coordinates_cache)
+    # Geocode each distinct location once; the cache is saved once if needed
+    map_data = add_coordinates(map_data, api_key, coordinates_cache)
 
     # Create map
-    if not map_data.empty:
-        map_center = [map_data['Latitude'].mean(), map_data['Longitude'].mean()]
-    else:
-        map_center = [0, 0]  # Default center if no data available
-
-    map_object = folium.Map(location=map_center, zoom_start=5)
-
-    for _, row in map_data.iterrows():
-        if pd.notnull(row['Latitude']) and pd.notnull(row['Longitude']):
-            folium.Marker(
-                location=[row['Latitude'], row['Longitude']],
-                popup=(
-                    f"<b>Local:</b> {row['Local da Infração']}<br>"
-                    f"<b>Multa:</b> R$ {row['Valor a ser pago R$']:,.2f}"
-                ),
-                icon=folium.Icon(icon="exclamation-circle", prefix="fa", color="red")  # FontAwesome icon
-            ).add_to(map_object)
+    map_object = build_fines_map(map_data, mode, tiles="OpenStreetMap")
 
     # Display map in Streamlit
     st_folium(map_object, width=700, height=500)
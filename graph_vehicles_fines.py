@@ -1,5 +1,6 @@
 import pandas as pd
 import plotly.express as px
+from data_loader import process_currency_column, process_date_column
 
 def get_vehicle_fines_data(df):
     """
@@ -21,27 +22,20 @@ def get_vehicle_fines_data(df):
         if col not in df.columns:
             raise KeyError(f"A coluna '{col}' não está presente no DataFrame.")
 
-    # Copiar o DataFrame
-    df = df.copy()
-
-    # Converter 'Data da Infração' para datetime e filtrar apenas o ano atual
-    df[date_column] = pd.to_datetime(df[date_column], errors='coerce')
-    df = df[df[date_column].dt.year == 2024]
-
-    # Garantir que 'Valor a ser pago R$' esteja no formato numérico
-    df[value_column] = (
-        df[value_column]
-        .astype(str)
-        .str.replace(r'[^\d,.-]', '', regex=True)  # Remove caracteres não numéricos
-        .str.replace(',', '.')
-        .astype(float)
-    )
+    # Selecionar apenas as colunas usadas, sem copiar nem alterar o DataFrame recebido.
+    # Em um frame de multas já tipado, as conversões abaixo não fazem nada.
+    datas = process_date_column(df[date_column])
+    df = pd.DataFrame({
+        'Placa Relacionada': df['Placa Relacionada'],
+        value_column: process_currency_column(df[value_column]),
+        'Auto de Infração': df['Auto de Infração'],
+    })[(datas.dt.year == 2024)]
 
     # Remover duplicatas baseadas no 'Auto de Infração' (registro único de multa)
     df = df.drop_duplicates(subset=['Auto de Infração'])
 
     # Agrupar os dados por 'Placa Relacionada'
-    fines_by_vehicle = df.groupby('Placa Relacionada').agg(
+    fines_by_vehicle = df.groupby('Placa Relacionada', observed=True).agg(
         total_fines=(value_column, 'sum'),
         num_fines=('Auto de Infração', 'nunique')  # Contar apenas multas únicas
     ).reset_index()
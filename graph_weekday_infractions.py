@@ -1,39 +1,61 @@
 import pandas as pd
 import plotly.express as px
+from data_loader import process_date_column
 
-def create_weekday_infractions_chart(data):
+# Dias da semana, na ordem do gráfico
+DIAS_SEMANA = ['Segunda-feira', 'Terça-feira', 'Quarta-feira', 'Quinta-feira', 'Sexta-feira', 'Sábado', 'Domingo']
+
+def get_weekday_counts(data):
     """
-    Create a bar chart to display the number of fines distributed by day of the week.
+    Count the fines by day of the week of 'Data da Infração'.
 
     Parameters:
         data (DataFrame): The filtered data containing fines information.
 
     Returns:
-        fig (plotly.graph_objects.Figure): A bar chart showing the distribution of fines by day of the week.
+        DataFrame: 'Dia da Semana' and 'Quantidade de Multas', Monday to Sunday.
     """
     # Verificar se a coluna 'Data da Infração' existe
     if 'Data da Infração' not in data.columns:
         raise KeyError("A coluna 'Data da Infração' não está presente no DataFrame.")
 
-    # Garantir que 'Data da Infração' é um objeto datetime
-    data['Data da Infração'] = pd.to_datetime(data['Data da Infração'], errors='coerce')
+    # Garantir que 'Data da Infração' é datetime (sem alterar o DataFrame recebido)
+    datas = process_date_column(data['Data da Infração'])
 
     # Remover datas inválidas
-    data = data.dropna(subset=['Data da Infração'])
+    datas = datas.dropna()
 
     # Mapear os dias da semana
-    dias_semana = {
-        0: 'Segunda-feira', 1: 'Terça-feira', 2: 'Quarta-feira',
-        3: 'Quinta-feira', 4: 'Sexta-feira', 5: 'Sábado', 6: 'Domingo'
-    }
-    data['Dia da Semana'] = data['Data da Infração'].dt.weekday.map(dias_semana)
+    dias_semana = dict(enumerate(DIAS_SEMANA))
+    dia_da_semana = datas.dt.weekday.map(dias_semana).rename('Dia da Semana')
 
     # Contar a quantidade de multas por dia da semana
-    weekday_counts = data['Dia da Semana'].value_counts().reindex(
-        ['Segunda-feira', 'Terça-feira', 'Quarta-feira', 'Quinta-feira', 'Sexta-feira', 'Sábado', 'Domingo']
-    ).reset_index()
+    weekday_counts = dia_da_semana.value_counts().reindex(DIAS_SEMANA).reset_index()
     weekday_counts.columns = ['Dia da Semana', 'Quantidade de Multas']
+    return weekday_counts
+
+def create_weekday_infractions_chart(data):
+    """
+    Create a bar chart to display the number of fines distributed by day of the week.
+
+    Parameters:
+        data (DataFrame): The filtered data containing fines information.
 
+    Returns:
+        fig (plotly.graph_objects.Figure): A bar chart showing the distribution of fines by day of the week.
+    """
+    return create_weekday_infractions_figure(get_weekday_counts(data))
+
+def create_weekday_infractions_figure(weekday_counts):
+    """
+    Create the day-of-the-week bar chart from the weekday counts.
+
+    Parameters:
+        weekday_counts (DataFrame): Output of get_weekday_counts (or DailyCube.weekday_counts).
+
+    Returns:
+        fig (plotly.graph_objects.Figure): A bar chart showing the distribution of fines by day of the week.
+    """
     # Criar o gráfico de barras sem título
     fig = px.bar(
         weekday_counts,
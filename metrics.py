@@ -1,5 +1,6 @@
 import pandas as pd
 from datetime import datetime
+from data_loader import process_currency_column, process_date_column
 
 def preprocess_data(data):
     """
@@ -22,15 +23,10 @@ def preprocess_data(data):
     data.rename(columns=column_mapping, inplace=True)
 
     # Ensure 'Data da Infração' is a datetime object
-    data['Data da Infração'] = pd.to_datetime(data['Data da Infração'], format='%d/%m/%Y', errors='coerce')
+    data['Data da Infração'] = process_date_column(data['Data da Infração'])
 
     # Standardize monetary values
-    data['Valor a ser pago R$'] = (
-        data['Valor a ser pago R$']
-        .astype(str)
-        .replace({r'[^\d,.-]': '', r'\.(?=\d{3,})': '', ',': '.'}, regex=True)
-    )
-    data['Valor a ser pago R$'] = pd.to_numeric(data['Valor a ser pago R$'], errors='coerce').fillna(0)
+    data['Valor a ser pago R$'] = process_currency_column(data['Valor a ser pago R$']).fillna(0)
 
     # Drop rows with essential missing data
     required_columns = ['Data da Infração', 'Valor a ser pago R$', 'Auto de Infração', 'Status de Pagamento']
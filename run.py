@@ -1,20 +1,44 @@
 import streamlit as st
 import pandas as pd
-import folium
 from datetime import datetime
-from folium.features import CustomIcon
 from streamlit_folium import st_folium
-from data_loader import carregar_dados_google_drive  # Atualize a importação
+from data_loader import (  # Atualize a importação
+    DadosInvalidos,
+    ErroConfiguracao,
+    carregar_dados_google_drive,
+    estatisticas_download,
+    estatisticas_servico_drive,
+    relatorio_memoria_categorias,
+    versao_fonte_dados
+)
 from data_processing import (
     carregar_e_limpar_dados,
-    calcular_metricas,
     filtrar_dados_por_periodo
 )
 from graph_vehicles_fines import create_vehicle_fines_chart
-from graph_common_infractions import create_common_infractions_chart
+from graph_common_infractions import create_common_infractions_figure
 from graph_fines_accumulated import create_fines_accumulated_chart
-from graph_weekday_infractions import create_weekday_infractions_chart
-from geo_utils import load_cache, save_cache, get_cached_coordinates
+from graph_weekday_infractions import create_weekday_infractions_figure
+from geo_utils import load_store, add_coordinates
+from graph_geo_distribution import MAP_MODE_DENSITY, MAP_MODES, fines_in_hex_cell, get_fines_map, new_map_cache
+from spatial_index import get_spatial_index
+from chart_cache import chart_cache_report, dataset_version, get_chart
+from daily_cube import get_daily_cube
+from background_refresh import get_background_refresher
+
+# Função para preparar uma nova versão dos dados em segundo plano
+def preparar_dados(df):
+    """
+    Geocodifica os locais e monta o cubo diário antes de a versão ser publicada
+    às sessões. Se a geocodificação falhar, a versão é publicada sem coordenadas
+    e o mapa as obtém na execução do script, como antes.
+    """
+    try:
+        df = add_coordinates(df, st.secrets["API_KEY"]["key"], load_store())
+    except Exception as e:
+        print(f"Erro ao geocodificar em segundo plano: {e}")
+    get_daily_cube(df)
+    return df
 
 # Configuração inicial do Streamlit
 st.set_page_config(page_title="Torre de Controle iTracker - Dashboard de Multas", layout="wide")
@@ -143,11 +167,25 @@ try:
         unsafe_allow_html=True,
     )
 
-    # Carregar e processar dados diretamente do Google Drive
-    data_cleaned = carregar_e_limpar_dados(carregar_dados_google_drive)
-    if data_cleaned is None:
-        st.error("Não foi possível carregar os dados. Verifique a conexão com o Google Drive.")
+    # Dados carregados e processados em segundo plano: as sessões leem a versão já
+    # publicada, e só a primeira execução do processo espera pela carga inicial
+    atualizador = get_background_refresher(
+        lambda: carregar_e_limpar_dados(carregar_dados_google_drive), versao_fonte_dados, preparar_dados
+    )
+    dataset = atualizador.wait_ready()
+    if dataset is None:
+        erro = atualizador.last_exception
+        if isinstance(erro, ErroConfiguracao):
+            st.error(f"Configuração inválida no secrets.toml: {erro}")
+        elif isinstance(erro, DadosInvalidos):
+            st.error(f"A planilha não pôde ser processada: {erro}")
+        else:
+            st.error("Não foi possível carregar os dados. Verifique a conexão com o Google Drive.")
+            if erro is not None:
+                st.caption(f"{type(erro).__name__}: {erro}")
+        st.info(f"Nova tentativa automática em até {atualizador.next_wait():.0f} s; recarregue a página em seguida.")
         st.stop()
+    data_cleaned = dataset.data
 
     # Exibir as primeiras linhas para depuração
     st.write("Primeiras linhas do DataFrame:", data_cleaned.head())
@@ -156,6 +194,8 @@ try:
     st.markdown("<h2 class='titulo-secao'>Filtrar Dados por Período</h2>", unsafe_allow_html=True)
     data_inicial = st.date_input("Data Inicial", value=datetime(2024, 1, 1))
     data_final = st.date_input("Data Final", value=datetime.now())
+    # Agregados diários do conjunto completo (construídos uma vez por versão dos dados)
+    cubo = get_daily_cube(data_cleaned)
     data_cleaned = filtrar_dados_por_periodo(data_cleaned, data_inicial, data_final)
 
     if data_cleaned.empty:
@@ -163,7 +203,7 @@ try:
         st.stop()
 
     # Calcular métricas principais
-    total_multas, valor_total_a_pagar, ultima_consulta = calcular_metricas(data_cleaned)
+    total_multas, valor_total_a_pagar, ultima_consulta = cubo.metrics(data_inicial, data_final)
 
     # Calcular multas do mês atual
     current_month = datetime.now().month
@@ -205,7 +245,7 @@ try:
     # Carregar cache de coordenadas
     try:
         API_KEY = st.secrets["API_KEY"]["key"]
-        coordinates_cache = load_cache()
+        coordinates_cache = load_store()
     except KeyError:
         st.error("Chave de API não configurada corretamente no arquivo secrets.toml.")
         st.stop()
@@ -216,51 +256,47 @@ try:
     # Obter coordenadas
     if 'Latitude' not in map_data.columns or 'Longitude' not in map_data.columns:
         try:
-            map_data[['Latitude', 'Longitude']] = map_data['Local da Infração'].apply(
-                lambda x: pd.Series(get_cached_coordinates(x, API_KEY, coordinates_cache))
-                if pd.notnull(x) else pd.Series([None, None])
-            )
-            save_cache(coordinates_cache)
+            map_data = add_coordinates(map_data, API_KEY, coordinates_cache)
         except Exception as e:
             st.error(f"Erro ao obter as coordenadas geográficas: {str(e)}")
             st.stop()
 
     map_data = map_data.dropna(subset=['Latitude', 'Longitude'])
 
-    # Criar mapa
-    map_center = [map_data['Latitude'].mean(), map_data['Longitude'].mean()] if not map_data.empty else [-23.5505, -46.6333]
-    map_object = folium.Map(location=map_center, zoom_start=5, tiles="CartoDB dark_matter")
-
-    # Ícone personalizado
-    icon_url = "https://cdn-icons-png.flaticon.com/512/1828/1828843.png"
-
-    # Adicionar marcadores
-    for _, row in map_data.iterrows():
-        if pd.notnull(row['Latitude']) and pd.notnull(row['Longitude']):
-            data_infracao = row['Data da Infração'].strftime('%d/%m/%Y') if pd.notnull(row['Data da Infração']) else "Não disponível"
-            popup_content = f"""
-            <b>Local:</b> {row['Local da Infração']}<br>
-            <b>Valor:</b> R$ {row['Valor a ser pago R$']:.2f}<br>
-            <b>Data da Infração:</b> {data_infracao}
-            """
-            folium.Marker(
-                location=[row['Latitude'], row['Longitude']],
-                popup=folium.Popup(popup_content, max_width=300),
-                icon=CustomIcon(icon_url, icon_size=(30, 30)),
-            ).add_to(map_object)
+    # Criar mapa (por padrão, um marcador por local, agrupados no navegador)
+    # O mapa montado é reaproveitado enquanto os dados filtrados, o modo e a vista não mudarem
+    map_mode = st.radio("Exibição do mapa:", MAP_MODES, horizontal=True)
+    if "cache_mapas" not in st.session_state:
+        st.session_state["cache_mapas"] = new_map_cache()
+    if map_mode == MAP_MODE_DENSITY:
+        # A grade acompanha o zoom atual; o mapa é recriado na mesma vista
+        vista = st.session_state.get("vista_mapa", {})
+        zoom_densidade = vista.get("zoom", 5)
+        map_object = get_fines_map(map_data, st.session_state["cache_mapas"], map_mode,
+                                   zoom_start=zoom_densidade, location=vista.get("center"))
+    else:
+        map_object = get_fines_map(map_data, st.session_state["cache_mapas"], map_mode)
 
     # Exibir mapa
     map_click_data = st_folium(map_object, width="100%", height=600)
+    if map_click_data and map_click_data.get("zoom"):
+        center = map_click_data.get("center") or {}
+        st.session_state["vista_mapa"] = {
+            "zoom": map_click_data["zoom"],
+            "center": [center["lat"], center["lng"]] if center else None,
+        }
 
     # Detalhes das multas para localização selecionada
     if map_click_data and map_click_data.get("last_object_clicked"):
         lat = map_click_data["last_object_clicked"].get("lat")
         lng = map_click_data["last_object_clicked"].get("lng")
         
-        selected_fines = map_data[ 
-            (map_data['Latitude'] == lat) & 
-            (map_data['Longitude'] == lng)
-        ]
+        if map_mode == MAP_MODE_DENSITY:
+            # No modo de densidade o clique cai num hexágono, não num marcador: mostra as multas da célula
+            selected_fines = fines_in_hex_cell(map_data, lat, lng, zoom_densidade)
+        else:
+            # Localiza o marcador mais próximo do clique (tolerante ao arredondamento do Leaflet)
+            selected_fines = map_data.iloc[get_spatial_index(map_data).query(lat, lng)]
 
         if not selected_fines.empty:
             st.markdown("<h2 class='titulo-secao' style='color: #0066B4;'>Detalhes das Multas para a Localização Selecionada</h2>", unsafe_allow_html=True)
@@ -274,10 +310,7 @@ try:
 
     # Ranking das Localidades
     st.markdown("<h2 class='titulo-secao' style='color: #0066B4;'>Ranking das Localidades com Mais Multas</h2>", unsafe_allow_html=True)
-    ranking_localidades = data_cleaned.groupby('Local da Infração', as_index=False).agg(
-        Valor_Total=('Valor a ser pago R$', 'sum'),
-        Total_Multas=('Local da Infração', 'count')
-    ).sort_values(by='Valor_Total', ascending=False)
+    ranking_localidades = cubo.location_ranking(data_inicial, data_final)
 
     st.dataframe(
         ranking_localidades.reset_index(drop=True),
@@ -285,22 +318,52 @@ try:
         hide_index=True
     )
 
-    # Gráficos
+    # Gráficos (reaproveitados do cache enquanto a versão dos dados e o período não mudarem)
+    chart_key = (dataset_version(data_cleaned), data_inicial, data_final)
+
     st.markdown("<h2 class='titulo-secao' style='color: #0066B4;'>Top 10 Veículos com Mais Multas e Valores Totais</h2>", unsafe_allow_html=True)
-    st.plotly_chart(create_vehicle_fines_chart(data_cleaned), use_container_width=True)
+    st.plotly_chart(get_chart("veiculos", create_vehicle_fines_chart, data_cleaned, key=chart_key), use_container_width=True)
 
     st.markdown("<h2 class='titulo-secao' style='color: #0066B4;'>Infrações Mais Frequentes</h2>", unsafe_allow_html=True)
-    st.plotly_chart(create_common_infractions_chart(data_cleaned), use_container_width=True)
+    st.plotly_chart(get_chart(
+        "infracoes", lambda _: create_common_infractions_figure(cubo.infraction_frequencies(data_inicial, data_final)),
+        data_cleaned, key=chart_key
+    ), use_container_width=True)
 
     st.markdown("<h2 class='titulo-secao' style='color: #0066B4;'>Valores das Multas Acumulados por Período</h2>", unsafe_allow_html=True)
     period_option = st.radio("Selecione o período:", ["Mensal", "Semanal"], horizontal=True)
     st.plotly_chart(
-        create_fines_accumulated_chart(data_cleaned, 'M' if period_option == "Mensal" else 'W'),
+        get_chart("acumulado", create_fines_accumulated_chart, data_cleaned,
+                  'M' if period_option == "Mensal" else 'W', key=chart_key),
         use_container_width=True
     )
 
     st.markdown("<h2 class='titulo-secao' style='color: #0066B4;'>Infrações Mais Frequentes por Dia da Semana</h2>", unsafe_allow_html=True)
-    st.plotly_chart(create_weekday_infractions_chart(data_cleaned), use_container_width=True)
+    st.plotly_chart(get_chart(
+        "dia_semana", lambda _: create_weekday_infractions_figure(cubo.weekday_counts(data_inicial, data_final)),
+        data_cleaned, key=chart_key
+    ), use_container_width=True)
+
+    # Painel de depuração (abrir o dashboard com ?debug=1)
+    if st.query_params.get("debug"):
+        with st.expander("Depuração: cache dos gráficos"):
+            estatisticas_graficos, totais_cache = chart_cache_report()
+            st.dataframe(estatisticas_graficos, use_container_width=True, hide_index=True)
+            st.write(totais_cache)
+        with st.expander("Depuração: atualização dos dados"):
+            st.write({"versao": dataset.version,
+                      "publicada_em": datetime.fromtimestamp(dataset.loaded_at).isoformat(timespec="seconds"),
+                      **atualizador.stats})
+        with st.expander("Depuração: Google Drive"):
+            st.write({"cliente": estatisticas_servico_drive(), "ultimo_download": estatisticas_download()})
+        with st.expander("Depuração: memória das colunas categóricas"):
+            relatorio_memoria = relatorio_memoria_categorias()
+            if relatorio_memoria.empty:
+                st.info("Nenhuma codificação registrada neste processo (dados lidos do snapshot).")
+            else:
+                st.dataframe(relatorio_memoria, use_container_width=True, hide_index=True)
+        with st.expander("Depuração: cache de coordenadas"):
+            st.write(load_store().stats())
 
     # Footer
     st.markdown(
@@ -0,0 +1,123 @@
+import hashlib
+import threading
+
+import numpy as np
+
+from cache_manager import MemoryLRUCache
+
+# Distância máxima (em graus) entre o clique e o marcador; ~1 m no equador.
+# Absorve o arredondamento das coordenadas devolvidas pelo Leaflet.
+CLICK_TOLERANCE = 1e-5
+
+# Número de índices mantidos em memória (um por conjunto de dados distinto)
+INDEX_CACHE_ENTRIES = 8
+
+_index_cache = MemoryLRUCache(INDEX_CACHE_ENTRIES)
+_index_lock = threading.Lock()
+
+
+class SpatialIndex:
+    """
+    Índice das coordenadas distintas de um conjunto de multas, para localizar o
+    marcador clicado no mapa sem percorrer todas as linhas.
+
+    As coordenadas distintas ficam ordenadas por latitude (e longitude); cada uma
+    aponta para o trecho de 'rows' com as posições das linhas naquele ponto. Uma
+    consulta faz busca binária na faixa de latitude [lat - tol, lat + tol] e
+    escolhe, nela, o ponto mais próximo a até 'tol' graus do clique.
+
+    Parameters:
+        latitudes (array-like): Latitude de cada linha.
+        longitudes (array-like): Longitude de cada linha.
+    """
+
+    def __init__(self, latitudes, longitudes):
+        latitudes = np.asarray(latitudes, dtype="float64")
+        longitudes = np.asarray(longitudes, dtype="float64")
+        validas = np.flatnonzero(~(np.isnan(latitudes) | np.isnan(longitudes)))
+
+        # Ordena as linhas por (latitude, longitude); linhas no mesmo ponto ficam contíguas
+        ordem = validas[np.lexsort((longitudes[validas], latitudes[validas]))]
+        lat_ordenada = latitudes[ordem]
+        lng_ordenada = longitudes[ordem]
+        novo_ponto = np.ones(len(ordem), dtype=bool)
+        novo_ponto[1:] = (lat_ordenada[1:] != lat_ordenada[:-1]) | (lng_ordenada[1:] != lng_ordenada[:-1])
+        inicios = np.flatnonzero(novo_ponto)
+
+        self.latitudes = lat_ordenada[inicios]
+        self.longitudes = lng_ordenada[inicios]
+        self.rows = ordem
+        self.offsets = np.append(inicios, len(ordem))
+
+    @classmethod
+    def from_frame(cls, df, lat_column="Latitude", lng_column="Longitude"):
+        """Cria o índice a partir das colunas de coordenadas de um DataFrame."""
+        return cls(df[lat_column].to_numpy(dtype="float64", na_value=np.nan),
+                   df[lng_column].to_numpy(dtype="float64", na_value=np.nan))
+
+    def __len__(self):
+        return len(self.latitudes)
+
+    def nearest(self, lat, lng, tolerance=CLICK_TOLERANCE):
+        """
+        Encontra o ponto indexado mais próximo de (lat, lng) dentro da tolerância.
+
+        Returns:
+            int | None: Posição do ponto em 'latitudes'/'longitudes', ou None.
+        """
+        if lat is None or lng is None:
+            return None
+        inicio = np.searchsorted(self.latitudes, lat - tolerance, side="left")
+        fim = np.searchsorted(self.latitudes, lat + tolerance, side="right")
+        if inicio == fim:
+            return None
+        dlat = self.latitudes[inicio:fim] - lat
+        dlng = self.longitudes[inicio:fim] - lng
+        distancias = dlat * dlat + dlng * dlng
+        mais_proximo = int(np.argmin(distancias))
+        if distancias[mais_proximo] > tolerance * tolerance:
+            return None
+        return inicio + mais_proximo
+
+    def query(self, lat, lng, tolerance=CLICK_TOLERANCE):
+        """
+        Retorna as posições (para uso com .iloc) das linhas no ponto mais próximo
+        de (lat, lng), ou um array vazio se nenhum ponto estiver na tolerância.
+        """
+        ponto = self.nearest(lat, lng, tolerance)
+        if ponto is None:
+            return np.empty(0, dtype=self.rows.dtype)
+        return self.rows[self.offsets[ponto]:self.offsets[ponto + 1]]
+
+
+def coordinates_fingerprint(df, lat_column="Latitude", lng_column="Longitude"):
+    """
+    Calcula uma impressão digital das coordenadas de um DataFrame, usada para
+    reaproveitar o índice enquanto o conjunto de dados não mudar.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for coluna in (lat_column, lng_column):
+        digest.update(np.ascontiguousarray(df[coluna].to_numpy(dtype="float64", na_value=np.nan)).tobytes())
+    return digest.hexdigest()
+
+
+def get_spatial_index(df, lat_column="Latitude", lng_column="Longitude"):
+    """
+    Retorna o índice espacial do DataFrame, construindo-o uma única vez por
+    conjunto de coordenadas (os índices ficam num cache LRU do processo).
+
+    Parameters:
+        df (pd.DataFrame): Dados com as colunas de coordenadas.
+
+    Returns:
+        SpatialIndex: O índice.
+    """
+    chave = coordinates_fingerprint(df, lat_column, lng_column)
+    indice = _index_cache.get(chave)
+    if indice is None:
+        with _index_lock:
+            indice = _index_cache.get(chave)
+            if indice is None:
+                indice = SpatialIndex.from_frame(df, lat_column, lng_column)
+                _index_cache.set_many({chave: indice})
+    return indice
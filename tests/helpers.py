@@ -0,0 +1,277 @@
+import contextlib
+import hashlib
+import http.server
+import io
+import json
+import os
+import threading
+import time
+import urllib.parse
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+
+def formatar_real(centavos):
+    """Formata um valor em centavos no padrão 'R$ 1.234,56'."""
+    reais = f"{centavos // 100:,}".replace(",", ".")
+    return f"R$ {reais},{centavos % 100:02d}"
+
+
+# Colunas extras presentes na planilha real, mas não usadas pelo dashboard
+COLUNAS_EXTRAS = [
+    "Renavam", "Chassi", "Órgão Autuador", "Município", "UF", "Valor original R$",
+    "Data de Vencimento", "Código de Barras", "Observações", "Situação do Recurso",
+]
+
+
+def gerar_planilha_sintetica(n_linhas=500_000, proporcao_pagas=0.5, seed=0):
+    """
+    Gera uma planilha .xlsx sintética no formato da planilha de multas.
+
+    Parameters:
+        n_linhas (int): Número de linhas da planilha.
+        proporcao_pagas (float): Proporção de multas com status 'PAGO'.
+        seed (int): Semente do gerador aleatório.
+
+    Returns:
+        BytesIO: Buffer com o conteúdo da planilha.
+    """
+    rng = np.random.default_rng(seed)
+    locais = [f"RODOVIA BR {100 + i % 300} {i}KM -CIDADE {i % 50}" for i in range(2_000)]
+    placas = [f"ABC{i:04d}" for i in range(5_000)]
+    descricoes = [f"Descrição da infração {i}" for i in range(200)]
+
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append([
+        "Status de Pagamento", "Auto de Infração", "Dia da Consulta", "Data da Infração",
+        "Valor a ser pago R$", "Local da Infração", "Placa Relacionada", "Descrição",
+        "Enquadramento da Infração",
+    ] + COLUNAS_EXTRAS)
+    pagas = rng.random(n_linhas) < proporcao_pagas
+    dias = rng.integers(1, 29, n_linhas)
+    meses = rng.integers(1, 13, n_linhas)
+    valores = rng.integers(8_000, 300_000, n_linhas)
+    for i in range(n_linhas):
+        sheet.append([
+            "PAGO" if pagas[i] else "NÃO PAGO",
+            f"A{i:08d}",
+            f"{dias[i]:02d}/{meses[i]:02d}/2024",
+            f"{dias[i]:02d}/{meses[i]:02d}/2024",
+            formatar_real(valores[i]),
+            locais[i % len(locais)],
+            placas[i % len(placas)],
+            descricoes[i % len(descricoes)],
+            f"{500 + i % 200}-0",
+        ] + [f"extra {i % 97}"] * len(COLUNAS_EXTRAS))
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    buffer.seek(0)
+    return buffer
+
+
+def gerar_frame_multas_sintetico(n_linhas=1_000_000, n_dias=365, seed=0):
+    """
+    Gera diretamente (sem planilha) um frame de multas tipado, com as consultas
+    distribuídas por 'n_dias' dias e Autos repetidos entre consultas.
+    """
+    from data_processing import criar_frame_multas
+
+    rng = np.random.default_rng(seed)
+    consultas = pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, n_dias, n_linhas), unit="D")
+    infracoes = consultas - pd.to_timedelta(rng.integers(0, 60, n_linhas), unit="D")
+    enquadramentos = rng.integers(0, 200, n_linhas)
+    return criar_frame_multas(pd.DataFrame({
+        "Auto de Infração": pd.Series(rng.integers(0, n_linhas // 2, n_linhas)).map("A{:08d}".format),
+        "Dia da Consulta": consultas,
+        "Data da Infração": infracoes,
+        "Valor a ser pago R$": rng.integers(8_000, 300_000, n_linhas) / 100,
+        "Local da Infração": pd.Categorical.from_codes(
+            rng.integers(0, 2_000, n_linhas), [f"RUA {i} -CIDADE {i % 50}" for i in range(2_000)]),
+        "Placa Relacionada": pd.Categorical.from_codes(
+            rng.integers(0, 5_000, n_linhas), [f"ABC{i:04d}" for i in range(5_000)]),
+        "Descrição": pd.Categorical.from_codes(enquadramentos, [f"Descrição {i}" for i in range(200)]),
+        "Enquadramento da Infração": pd.Categorical.from_codes(enquadramentos, [f"{500 + i}-0" for i in range(200)]),
+        "Status de Pagamento": pd.Categorical(["NÃO PAGO"] * n_linhas),
+    }))
+
+
+class _Execucao:
+    """Requisição da imitação do Drive: execute() devolve a resposta pronta."""
+
+    def __init__(self, resposta):
+        self.resposta = resposta
+
+    def execute(self):
+        return self.resposta
+
+
+class _HttpLocal:
+    """Cliente HTTP da imitação do Drive: atende requisições Range lendo o arquivo local."""
+
+    def request(self, uri, method="GET", headers=None, **kwargs):
+        import httplib2
+
+        with open(uri, "rb") as f:
+            conteudo = f.read()
+        inicio, fim = 0, len(conteudo) - 1
+        intervalo = (headers or {}).get("range")
+        if intervalo:
+            inicio, fim = (int(v) for v in intervalo.split("=", 1)[1].split("-"))
+            fim = min(fim, len(conteudo) - 1)
+        parte = conteudo[inicio:fim + 1]
+        return httplib2.Response({
+            "status": "206" if intervalo else "200",
+            "content-range": f"bytes {inicio}-{fim}/{len(conteudo)}",
+            "content-length": str(len(parte)),
+        }), parte
+
+
+class DriveLocal:
+    """
+    Imitação do serviço do Google Drive servida a partir de um diretório local:
+    cada arquivo do diretório é identificado pelo próprio nome e cada .xlsx é
+    uma planilha da pasta. Atende files().list (paginado em 'tamanho_pagina'),
+    files().get e files().get_media, de modo que o download real
+    (MediaIoBaseDownload ou intervalos paralelos) é exercitado.
+    """
+
+    def __init__(self, diretorio, tamanho_pagina=2):
+        self.diretorio = diretorio
+        self.tamanho_pagina = tamanho_pagina
+
+    def files(self):
+        return self
+
+    def _metadados(self, nome):
+        caminho = os.path.join(self.diretorio, nome)
+        with open(caminho, "rb") as f:
+            md5 = hashlib.md5(f.read()).hexdigest()
+        modificado = pd.Timestamp(os.path.getmtime(caminho), unit="s", tz="UTC")
+        return {"id": nome, "name": nome, "md5Checksum": md5, "size": str(os.path.getsize(caminho)),
+                "modifiedTime": modificado.strftime("%Y-%m-%dT%H:%M:%S.%fZ")}
+
+    def list(self, q=None, fields=None, pageSize=100, pageToken=None):
+        nomes = sorted(n for n in os.listdir(self.diretorio) if n.endswith(".xlsx"))
+        inicio = int(pageToken or 0)
+        fim = inicio + min(pageSize, self.tamanho_pagina)
+        resposta = {"files": [self._metadados(nome) for nome in nomes[inicio:fim]]}
+        if fim < len(nomes):
+            resposta["nextPageToken"] = str(fim)
+        return _Execucao(resposta)
+
+    def get(self, fileId, fields=None):
+        return _Execucao(self._metadados(fileId))
+
+    def get_media(self, fileId):
+        requisicao = _Execucao(None)
+        requisicao.uri = os.path.join(self.diretorio, fileId)
+        requisicao.http = _HttpLocal()
+        requisicao.headers = {}
+        return requisicao
+
+
+
+
+class _OpenCageLocal(http.server.BaseHTTPRequestHandler):
+    """
+    Imitação local da API do OpenCage: coordenadas determinísticas por local;
+    locais iniciados por 'SEM RESULTADO' não têm resultado. Opcionalmente
+    simula a cota do provedor ('cota' requisições por segundo, com rajada de
+    'cota' + 'folga'; acima disso responde 429) e falhas temporárias
+    ('falhas_por_local' respostas 503 antes da primeira válida de cada local).
+    Use opencage_local() para obter uma cópia com estado próprio.
+    """
+
+    latencia = 0.0
+    chamadas = 0
+    cota = None
+    folga = 0
+    falhas_por_local = 0
+    respostas_429 = 0
+    respostas_503 = 0
+    lock = threading.Lock()
+    fichas = None
+    ultima = None
+    falhas = {}
+
+    def _dentro_da_cota(self):
+        cls = type(self)
+        if cls.cota is None:
+            return True
+        with cls.lock:
+            agora = time.monotonic()
+            if cls.fichas is None:
+                cls.fichas, cls.ultima = cls.cota + cls.folga, agora
+            cls.fichas = min(cls.cota + cls.folga, cls.fichas + (agora - cls.ultima) * cls.cota)
+            cls.ultima = agora
+            if cls.fichas < 1:
+                cls.respostas_429 += 1
+                return False
+            cls.fichas -= 1
+            return True
+
+    def _responder(self, status, corpo=b"", cabecalhos=None):
+        self.send_response(status)
+        for nome, valor in (cabecalhos or {}).items():
+            self.send_header(nome, valor)
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            cls.chamadas += 1
+        time.sleep(cls.latencia)
+        local = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)["q"][0]
+        if not self._dentro_da_cota():
+            return self._responder(429)
+        with cls.lock:
+            falhas = cls.falhas.get(local, 0)
+            if falhas < cls.falhas_por_local:
+                cls.falhas[local] = falhas + 1
+                cls.respostas_503 += 1
+        if falhas < cls.falhas_por_local:
+            return self._responder(503)
+
+        resultados = []
+        if not local.startswith("SEM RESULTADO"):
+            resultados.append({"geometry": coordenadas_sinteticas(local)})
+        self._responder(200, json.dumps({"results": resultados}).encode(),
+                        {"Content-Type": "application/json"})
+
+    def log_message(self, *args):
+        pass
+
+
+def coordenadas_sinteticas(local):
+    """Coordenadas determinísticas (dentro do Brasil) devolvidas pela imitação do OpenCage."""
+    semente = int(hashlib.md5(local.encode()).hexdigest()[:8], 16)
+    return {"lat": -33 + (semente % 2800) / 100, "lng": -73 + (semente // 2800 % 3900) / 100}
+
+
+def opencage_local(**opcoes):
+    """Retorna uma cópia de _OpenCageLocal com estado próprio e os atributos em 'opcoes' (latencia, cota, ...)."""
+    return type("OpenCageLocal", (_OpenCageLocal,), {
+        "lock": threading.Lock(), "falhas": {}, **opcoes,
+    })
+
+
+@contextlib.contextmanager
+def servidor_opencage_local(handler=None):
+    """Sobe a imitação do OpenCage numa porta livre e aponta geo_utils para ela."""
+    import geo_utils
+
+    servidor = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler or opencage_local())
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    url_original = geo_utils.OPENCAGE_URL
+    geo_utils.OPENCAGE_URL = f"http://127.0.0.1:{servidor.server_port}/geocode/v1/json"
+    try:
+        yield servidor
+    finally:
+        geo_utils.OPENCAGE_URL = url_original
+        servidor.shutdown()
+        servidor.server_close()
@@ -0,0 +1,130 @@
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+import data_loader
+from background_refresh import BackgroundRefresher
+from data_loader import (DadosInvalidos, ErroCarregamentoDados, ErroConfiguracao, carregar_dados_google_drive,
+                         obter_credenciais)
+from data_processing import carregar_e_limpar_dados
+
+
+class Origem:
+    """Origem de dados controlada pelo teste: versão atual, falhas programadas e contagem de cargas."""
+
+    def __init__(self, falhas=0, espera=0.0):
+        self.versao = "v1"
+        self.falhas = falhas
+        self.espera = espera
+        self.cargas = 0
+
+    def probe(self):
+        return self.versao
+
+    def load(self):
+        self.cargas += 1
+        time.sleep(self.espera)
+        if self.falhas:
+            self.falhas -= 1
+            raise ConnectionError("Drive indisponível")
+        df = pd.DataFrame({"a": [1]})
+        df.attrs["versao_dados"] = self.versao
+        return df
+
+
+def test_publica_nova_versao_apenas_quando_muda():
+    origem = Origem()
+    atualizador = BackgroundRefresher(origem.load, origem.probe)
+    assert atualizador.refresh()
+    assert not atualizador.refresh()
+    origem.versao = "v2"
+    assert atualizador.refresh()
+    assert atualizador.current().version == "v2"
+    assert origem.cargas == 2
+
+
+def test_single_flight():
+    origem = Origem(espera=0.2)
+    atualizador = BackgroundRefresher(origem.load, origem.probe)
+    threads = [threading.Thread(target=atualizador.refresh) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert origem.cargas == 1
+    assert atualizador.stats["skipped"] == 7
+
+
+def test_falha_guarda_excecao_original_e_mantem_versao_anterior():
+    origem = Origem()
+    atualizador = BackgroundRefresher(origem.load, origem.probe)
+    atualizador.refresh()
+    origem.versao, origem.falhas = "v2", 1
+    assert not atualizador.refresh()
+    assert isinstance(atualizador.last_exception, ConnectionError)
+    assert atualizador.stats["last_error"] == "ConnectionError: Drive indisponível"
+    assert atualizador.current().version == "v1"
+
+
+def test_primeira_carga_repetida_com_espera_exponencial():
+    origem = Origem(falhas=3)
+    atualizador = BackgroundRefresher(origem.load, origem.probe, interval=60, retry_initial=0.05).start()
+    try:
+        inicio = time.perf_counter()
+        while atualizador.current() is None and time.perf_counter() - inicio < 5:
+            time.sleep(0.01)
+    finally:
+        atualizador.stop(timeout=1)
+    # 0.05 + 0.1 + 0.2 s de espera entre as quatro tentativas, bem antes do intervalo de 60 s
+    assert atualizador.current() is not None
+    assert origem.cargas == 4
+    assert atualizador.last_exception is None
+    assert atualizador.next_wait() == 60
+
+
+def test_espera_exponencial_limitada_ao_intervalo():
+    atualizador = BackgroundRefresher(Origem(falhas=10).load, lambda: None, interval=30, retry_initial=5)
+    esperas = []
+    for _ in range(5):
+        atualizador.refresh()
+        esperas.append(atualizador.next_wait())
+    assert esperas == [5, 10, 20, 30, 30]
+
+
+def test_carregar_e_limpar_dados_lanca_erros_tipados():
+    with pytest.raises(DadosInvalidos):
+        carregar_e_limpar_dados(lambda: None)
+    with pytest.raises(DadosInvalidos, match="Faltam"):
+        carregar_e_limpar_dados(lambda: pd.DataFrame({"Auto de Infração": ["A1"]}))
+
+    def falha():
+        raise ConnectionError("sem rede")
+
+    with pytest.raises(ErroCarregamentoDados) as erro:
+        carregar_e_limpar_dados(falha)
+    assert isinstance(erro.value.__cause__, ConnectionError)
+
+
+def test_carregador_do_drive_lanca_em_vez_de_parar_o_script():
+    # Sem secrets.toml: a falha chega a quem chama, com a causa encadeada
+    with pytest.raises(ErroCarregamentoDados) as erro:
+        carregar_dados_google_drive()
+    assert erro.value.__cause__ is not None
+
+
+@pytest.mark.parametrize("secrets", [
+    {},
+    {"CREDENTIALS": "{nao e json"},
+    {"CREDENTIALS": {"type": "service_account"}},
+    {"CREDENTIALS": {"type": "service_account", "client_email": "a@b.c", "token_uri": "x", "private_key": "invalida"}},
+])
+def test_credenciais_invalidas_lancam_erro_de_configuracao(secrets, monkeypatch):
+    monkeypatch.setattr(data_loader, "_drive_credentials", None)
+    monkeypatch.setattr(data_loader.st, "secrets", secrets)
+
+    with pytest.raises(ErroConfiguracao) as erro:
+        obter_credenciais()
+    assert erro.value.__cause__ is not None
+    assert data_loader._drive_credentials is None
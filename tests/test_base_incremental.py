@@ -0,0 +1,53 @@
+import json
+import os
+
+import openpyxl
+import pytest
+
+import data_loader
+from helpers import DriveLocal, gerar_planilha_sintetica
+
+
+@pytest.fixture
+def drive(tmp_path, monkeypatch):
+    # Os arquivos locais do carregador (.cache_dados) ficam no diretório de trabalho
+    trabalho = tmp_path / "trabalho"
+    trabalho.mkdir()
+    monkeypatch.chdir(trabalho)
+    pasta = tmp_path / "drive"
+    pasta.mkdir()
+    return DriveLocal(str(pasta))
+
+
+def gravar_planilha(drive, buffer):
+    with open(os.path.join(drive.diretorio, "planilha.xlsx"), "wb") as f:
+        f.write(buffer.getvalue())
+
+
+def test_planilha_so_com_cabecalho_lanca_dados_invalidos(drive):
+    gravar_planilha(drive, gerar_planilha_sintetica(0))
+
+    with pytest.raises(data_loader.DadosInvalidos):
+        data_loader.load_data_incremental(drive, "planilha.xlsx")
+
+
+def test_planilha_sem_colunas_obrigatorias_lanca_dados_invalidos(drive):
+    workbook = openpyxl.Workbook()
+    workbook.active.append(["Auto de Infração", "Dia da Consulta"])
+    workbook.active.append(["A1", "01/02/2024"])
+    workbook.save(os.path.join(drive.diretorio, "planilha.xlsx"))
+
+    with pytest.raises(data_loader.DadosInvalidos, match="Status de Pagamento"):
+        data_loader.load_data_incremental(drive, "planilha.xlsx")
+
+
+def test_estado_salvo_guarda_a_versao_e_o_resumo(drive):
+    gravar_planilha(drive, gerar_planilha_sintetica(300))
+
+    df = data_loader.load_data_incremental(drive, "planilha.xlsx")
+
+    with open(data_loader.ESTADO_BASE_FILE) as f:
+        estado = json.load(f)
+    assert set(estado) == {"versao", "resumo"}
+    assert estado["resumo"]["linhas_lidas"] == 300
+    assert df.attrs["versao_dados"] == f"base_{estado['versao']}"
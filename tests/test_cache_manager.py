@@ -0,0 +1,141 @@
+import json
+import os
+
+import pytest
+
+import cache_manager
+import geo_utils
+from cache_manager import CacheBackend, JsonFileCache, MemoryLRUCache, SqliteCache, TieredCache
+from geo_store import GeocodeStore
+
+
+class Relogio:
+    """Substitui time.monotonic em cache_manager por um relógio controlado."""
+
+    def __init__(self):
+        self.agora = 1_000.0
+
+    def __call__(self):
+        return self.agora
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    relogio = Relogio()
+    monkeypatch.setattr(cache_manager.time, "monotonic", relogio)
+    return relogio
+
+
+def test_backend_incompleto_nao_pode_ser_instanciado():
+    class SemLeitura(CacheBackend):
+        def set_many(self, items):
+            pass
+
+        def __len__(self):
+            return 0
+
+    with pytest.raises(TypeError):
+        SemLeitura()
+
+
+def test_memoria_expira_apenas_entradas_sem_resultado(relogio):
+    cache = MemoryLRUCache(none_ttl=60)
+    cache.set_many({"COM": (1.0, 2.0), "SEM": None})
+
+    relogio.agora += 59
+    assert cache.get_many(["COM", "SEM"]) == {"COM": (1.0, 2.0), "SEM": None}
+
+    relogio.agora += 2
+    assert cache.get_many(["COM", "SEM"]) == {"COM": (1.0, 2.0)}
+    assert len(cache) == 1
+
+
+def test_memoria_sem_ttl_mantem_entradas_sem_resultado(relogio):
+    cache = MemoryLRUCache()
+    cache.set_many({"SEM": None})
+
+    relogio.agora += 10 ** 9
+    assert cache.get_many(["SEM"]) == {"SEM": None}
+
+
+def test_coordenadas_encontradas_cancelam_a_expiracao(relogio):
+    cache = MemoryLRUCache(max_entries=2, none_ttl=60)
+    cache.set_many({"A": None})
+    cache.set_many({"A": (1.0, 2.0)})
+
+    relogio.agora += 120
+    assert cache.get_many(["A"]) == {"A": (1.0, 2.0)}
+
+    # Remoções por tamanho também descartam o prazo das entradas removidas
+    cache.set_many({"B": None, "C": None})
+    assert cache._expires.keys() == {"B", "C"}
+
+
+def test_camada_em_memoria_segue_a_validade_do_sqlite(tmp_path, relogio):
+    store = GeocodeStore(str(tmp_path / "geocodes.sqlite3"), negative_ttl=60)
+    cache = TieredCache(MemoryLRUCache(none_ttl=store.negative_ttl), SqliteCache(store))
+    cache.set_many({"SEM": None})
+
+    relogio.agora += 61
+    assert "SEM" not in cache.memory.get_many(["SEM"])
+
+
+def test_cache_json_persiste_entre_instancias(tmp_path):
+    caminho = str(tmp_path / "coordinates_cache.json")
+    cache = JsonFileCache(caminho)
+    cache.set_many({"RUA 1-CIDADE 1": (1.0, 2.0), "SEM RESULTADO": None})
+
+    reaberto = JsonFileCache(caminho)
+
+    assert reaberto.get_many(["RUA 1-CIDADE 1", "SEM RESULTADO", "OUTRA"]) == {
+        "RUA 1-CIDADE 1": [1.0, 2.0], "SEM RESULTADO": None}
+    assert len(reaberto) == 2
+    assert reaberto.stats()["hits"] == 2 and reaberto.stats()["misses"] == 1
+
+
+def test_gravacao_json_atomica(tmp_path, monkeypatch):
+    caminho = str(tmp_path / "coordinates_cache.json")
+    cache = JsonFileCache(caminho)
+    cache.set_many({"RUA 1-CIDADE 1": [1.0, 2.0]})
+
+    def falhar(*args, **kwargs):
+        raise IOError("disco cheio")
+
+    monkeypatch.setattr(cache_manager.json, "dump", falhar)
+    cache.set_many({"RUA 2-CIDADE 2": [3.0, 4.0]})
+
+    # A gravação que falhou não deixa o arquivo pela metade
+    with open(caminho) as f:
+        assert json.load(f) == {"RUA 1-CIDADE 1": [1.0, 2.0]}
+    assert not os.path.exists(f"{caminho}.tmp")
+
+
+def test_limpar_remove_o_arquivo(tmp_path):
+    caminho = str(tmp_path / "coordinates_cache.json")
+    cache = JsonFileCache(caminho)
+    cache.set_many({"RUA 1-CIDADE 1": [1.0, 2.0]})
+
+    cache.clear()
+
+    assert len(cache) == 0
+    assert not os.path.exists(caminho)
+
+
+def test_load_cache_normaliza_as_chaves(tmp_path, monkeypatch):
+    caminho = tmp_path / "coordinates_cache.json"
+    caminho.write_text(json.dumps({"Rua 1 - Cidade 1": None, "RUA 1 -CIDADE 1": [1.0, 2.0]}))
+    monkeypatch.setattr(geo_utils, "CACHE_FILE", str(caminho))
+
+    cache = geo_utils.load_cache()
+
+    assert isinstance(cache, CacheBackend)
+    assert cache.get_many(["RUA 1-CIDADE 1"]) == {"RUA 1-CIDADE 1": [1.0, 2.0]}
+    assert len(cache) == 1
+
+
+def test_leitura_json_corrompido_retorna_vazio(tmp_path, monkeypatch):
+    caminho = tmp_path / "coordinates_cache.json"
+    caminho.write_text("{corrompido")
+    monkeypatch.setattr(geo_utils, "CACHE_FILE", str(caminho))
+
+    assert len(geo_utils.load_cache()) == 0
@@ -0,0 +1,50 @@
+import numpy as np
+import plotly.graph_objects as go
+import pytest
+
+import chart_cache
+from graph_fines_accumulated import create_fines_accumulated_chart
+from helpers import gerar_frame_multas_sintetico
+
+
+@pytest.fixture(scope="module")
+def frame():
+    return gerar_frame_multas_sintetico(3_000, n_dias=300, seed=7)
+
+
+def test_tamanho_estimado_sem_serializar_a_figura(frame, monkeypatch):
+    fig = create_fines_accumulated_chart(frame, 'W')
+    tamanho_json = len(fig.to_json())
+
+    def serializar(*args, **kwargs):
+        pytest.fail("a figura não deve ser serializada para medir o tamanho")
+
+    monkeypatch.setattr(go.Figure, "to_json", serializar)
+
+    # A estimativa fica na ordem de grandeza do JSON enviado ao navegador
+    assert tamanho_json / 2 < chart_cache.figure_size(fig) < tamanho_json * 2
+
+
+def test_acumulado_agrupa_pelo_periodo_escolhido(frame):
+    mensal = create_fines_accumulated_chart(frame, 'M')
+    semanal = create_fines_accumulated_chart(frame, 'W')
+
+    assert len(semanal.data[0].x) > len(mensal.data[0].x)
+    # O valor total do ano é o mesmo, só a granularidade muda
+    np.testing.assert_allclose(np.sum(semanal.data[1].y), np.sum(mensal.data[1].y))
+
+
+def test_periodo_faz_parte_da_chave_do_grafico(frame):
+    construidos = []
+
+    def construir(df, period):
+        construidos.append(period)
+        return create_fines_accumulated_chart(df, period)
+
+    chave = ("versao-teste", None, None)
+    mensal = chart_cache.get_chart("acumulado-teste", construir, frame, 'M', key=chave)
+    semanal = chart_cache.get_chart("acumulado-teste", construir, frame, 'W', key=chave)
+
+    assert chart_cache.get_chart("acumulado-teste", construir, frame, 'M', key=chave) is mensal
+    assert construidos == ['M', 'W']
+    assert len(semanal.data[0].x) > len(mensal.data[0].x)
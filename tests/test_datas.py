@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_loader import process_date_column
+
+T = pd.Timestamp
+NAT = pd.NaT
+
+
+@pytest.mark.parametrize("valores, esperado", [
+    # dd/mm/aaaa e variantes
+    (["01/02/2024", "31/12/2023", None], [T("2024-02-01"), T("2023-12-31"), NAT]),
+    (["01/02/2024 10:30:00", "15/03/2024 08:00:00"], [T("2024-02-01 10:30"), T("2024-03-15 08:00")]),
+    (["01/02/2024", "lixo", ""], [T("2024-02-01"), NAT, NAT]),
+    # ISO 8601 fora do formato dominante não sofre dayfirst
+    (["01/02/2024", "01/03/2024", "2024-04-05"], [T("2024-02-01"), T("2024-03-01"), T("2024-04-05")]),
+    # Fuso horário único: o horário local informado é mantido e o fuso descartado
+    (["2024-03-01T10:00:00-03:00", "01/02/2024"], [T("2024-03-01 10:00"), T("2024-02-01")]),
+    (["2024-03-01T10:00:00Z", "01/02/2024", "2024-03-05"], [T("2024-03-01 10:00"), T("2024-02-01"), T("2024-03-05")]),
+    (["2024-03-01T10:00:00-03:00", "2024-03-02T09:00:00-03:00", "lixo"],
+     [T("2024-03-01 10:00"), T("2024-03-02 09:00"), NAT]),
+    # Fusos diferentes: as datas com fuso viram NaT, as demais são mantidas
+    (["2024-03-01T10:00:00-03:00", "2024-03-02T10:00:00+00:00", "01/02/2024"], [NAT, NAT, T("2024-02-01")]),
+    (["2024-03-01T10:00:00-03:00", "2024-03-02T10:00:00+00:00"], [NAT, NAT]),
+    # Objetos datetime, com e sem fuso, misturados a textos
+    ([T("2024-01-01", tz="UTC"), "01/02/2024"], [T("2024-01-01"), T("2024-02-01")]),
+    ([T("2024-01-01 05:00", tz="UTC"), T("2024-01-01", tz="America/Sao_Paulo"), T("2024-01-03")],
+     [NAT, NAT, T("2024-01-03")]),
+    ([T("2024-01-01 05:00", tz="UTC"), T("2024-01-02 05:00", tz="UTC"), np.nan],
+     [T("2024-01-01 05:00"), T("2024-01-02 05:00"), NAT]),
+])
+def test_process_date_column(valores, esperado):
+    serie = pd.Series(valores, dtype=object, name="Data da Infração", index=range(5, 5 + len(valores)))
+
+    resultado = process_date_column(serie)
+
+    assert resultado.dtype == "datetime64[ns]"
+    assert resultado.name == serie.name
+    assert resultado.index.equals(serie.index)
+    assert resultado.tolist() == esperado
+
+
+def test_coluna_datetime_e_devolvida_sem_reprocessamento():
+    serie = pd.Series(pd.to_datetime(["2024-01-01", None]))
+
+    assert process_date_column(serie) is serie
+
+
+def test_coluna_datetime_com_fuso_perde_apenas_o_fuso():
+    serie = pd.Series(pd.to_datetime(["2024-01-01 10:00", None]).tz_localize("America/Sao_Paulo"))
+
+    resultado = process_date_column(serie)
+
+    assert not isinstance(resultado.dtype, pd.DatetimeTZDtype)
+    assert resultado.tolist() == [T("2024-01-01 10:00"), NAT]
+
+
+def test_datas_com_fuso_podem_ser_filtradas_por_periodo():
+    serie = process_date_column(pd.Series(["2024-03-01T10:00:00-03:00", "05/03/2024"]))
+
+    assert (serie >= T("2024-03-01")).all()
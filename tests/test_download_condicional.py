@@ -0,0 +1,143 @@
+import os
+
+import pandas as pd
+import pytest
+
+import data_loader
+from data_processing import carregar_e_limpar_dados
+from helpers import DriveLocal, gerar_planilha_sintetica
+
+
+class DriveContador(DriveLocal):
+    """DriveLocal que conta as chamadas a files().get e files().get_media."""
+
+    def __init__(self, diretorio):
+        super().__init__(diretorio)
+        self.metadados = 0
+        self.downloads = 0
+
+    def get(self, fileId, fields=None):
+        self.metadados += 1
+        return super().get(fileId, fields)
+
+    def get_media(self, fileId):
+        self.downloads += 1
+        return super().get_media(fileId)
+
+
+@pytest.fixture
+def leituras(monkeypatch):
+    """Conta as leituras da planilha (o parsing do .xlsx) feitas pelo carregador."""
+    contagem = []
+    ler = data_loader.ler_planilha_em_lotes
+
+    def ler_contando(*args, **kwargs):
+        contagem.append(1)
+        return ler(*args, **kwargs)
+
+    monkeypatch.setattr(data_loader, "ler_planilha_em_lotes", ler_contando)
+    return contagem
+
+
+def gravar(pasta, nome, conteudo):
+    with open(os.path.join(pasta, nome), "wb") as f:
+        f.write(conteudo)
+
+
+@pytest.fixture
+def drive(tmp_path, monkeypatch):
+    # Os arquivos locais do carregador (.cache_dados) ficam no diretório de trabalho
+    trabalho = tmp_path / "trabalho"
+    trabalho.mkdir()
+    monkeypatch.chdir(trabalho)
+    pasta = tmp_path / "drive"
+    pasta.mkdir()
+    return DriveContador(str(pasta))
+
+
+def test_arquivo_inalterado_nao_e_baixado_de_novo(drive):
+    gravar(drive.diretorio, "planilha.xlsx", b"versao 1")
+
+    primeiro = data_loader.baixar_se_modificado(drive, "planilha.xlsx")
+    segundo = data_loader.baixar_se_modificado(drive, "planilha.xlsx")
+
+    assert drive.downloads == 1
+    assert drive.metadados == 2
+    assert primeiro.getvalue() == segundo.getvalue() == b"versao 1"
+
+
+def test_arquivo_modificado_e_baixado_de_novo(drive):
+    gravar(drive.diretorio, "planilha.xlsx", b"versao 1")
+    data_loader.baixar_se_modificado(drive, "planilha.xlsx")
+
+    gravar(drive.diretorio, "planilha.xlsx", b"versao 2 maior")
+    buffer = data_loader.baixar_se_modificado(drive, "planilha.xlsx")
+
+    assert drive.downloads == 2
+    assert buffer.getvalue() == b"versao 2 maior"
+
+
+def test_copia_local_ausente_forca_download(drive):
+    gravar(drive.diretorio, "planilha.xlsx", b"versao 1")
+    data_loader.baixar_se_modificado(drive, "planilha.xlsx")
+
+    for nome in os.listdir(data_loader.SNAPSHOT_DIR):
+        if nome.startswith("arquivo_"):
+            os.remove(os.path.join(data_loader.SNAPSHOT_DIR, nome))
+    buffer = data_loader.baixar_se_modificado(drive, "planilha.xlsx")
+
+    assert drive.downloads == 2
+    assert buffer.getvalue() == b"versao 1"
+
+
+def test_metadados_informados_evitam_nova_consulta(drive):
+    gravar(drive.diretorio, "planilha.xlsx", b"versao 1")
+    metadados = drive.get("planilha.xlsx").execute()
+    drive.metadados = 0
+
+    data_loader.baixar_se_modificado(drive, "planilha.xlsx", metadados)
+    data_loader.baixar_se_modificado(drive, "planilha.xlsx", metadados)
+
+    assert drive.metadados == 0
+    assert drive.downloads == 1
+
+
+
+def test_snapshot_evita_download_e_leitura(drive, leituras):
+    gravar(drive.diretorio, "planilha.xlsx", gerar_planilha_sintetica(500).getvalue())
+    primeiro = data_loader.load_data(drive, "planilha.xlsx")
+
+    segundo = data_loader.load_data(drive, "planilha.xlsx")
+
+    assert drive.downloads == 1
+    assert len(leituras) == 1
+    assert segundo.attrs["versao_dados"] == primeiro.attrs["versao_dados"]
+    # O Feather não distingue as categorias "string" das "str"; os valores são os mesmos
+    pd.testing.assert_frame_equal(segundo, primeiro, check_dtype=False, check_categorical=False)
+
+
+def test_sem_snapshot_reaproveita_bytes_locais(drive, leituras):
+    gravar(drive.diretorio, "planilha.xlsx", gerar_planilha_sintetica(500).getvalue())
+    primeiro = data_loader.load_data(drive, "planilha.xlsx")
+    for nome in os.listdir(data_loader.SNAPSHOT_DIR):
+        if nome.startswith("planilha_"):
+            os.remove(os.path.join(data_loader.SNAPSHOT_DIR, nome))
+
+    segundo = data_loader.load_data(drive, "planilha.xlsx")
+
+    assert drive.downloads == 1
+    assert len(leituras) == 2
+    pd.testing.assert_frame_equal(segundo, primeiro)
+
+
+def test_snapshot_mapeado_pode_ser_limpo_e_alterado(drive):
+    gravar(drive.diretorio, "planilha.xlsx", gerar_planilha_sintetica(500).getvalue())
+    data_loader.load_data(drive, "planilha.xlsx")
+    snapshot = data_loader.load_data(drive, "planilha.xlsx")
+
+    # As colunas lidas sem cópia são somente leitura; a limpeza não pode escrever nelas
+    limpo = carregar_e_limpar_dados(lambda: snapshot)
+    limpo['Valor a ser pago R$'] *= 2
+
+    assert not limpo.empty
+    assert (snapshot['Valor a ser pago R$'] >= 0).all()
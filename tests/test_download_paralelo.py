@@ -0,0 +1,142 @@
+import http.server
+import os
+import threading
+import time
+
+import httplib2
+import pytest
+
+import data_loader
+
+
+class _ArquivoComRange(http.server.BaseHTTPRequestHandler):
+    """Serve 'conteudo' atendendo (ou, se 'aceita_range' for False, ignorando) o cabeçalho Range."""
+
+    conteudo = b""
+    aceita_range = True
+    latencia = 0.0
+    lock = threading.Lock()
+    ativas = 0
+    pico = 0
+    intervalos = []
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            cls.ativas += 1
+            cls.pico = max(cls.pico, cls.ativas)
+        try:
+            time.sleep(cls.latencia)
+            intervalo = self.headers.get("Range")
+            if intervalo and cls.aceita_range:
+                inicio, fim = (int(v) for v in intervalo.split("=", 1)[1].split("-"))
+                fim = min(fim, len(cls.conteudo) - 1)
+                with cls.lock:
+                    cls.intervalos.append((inicio, fim))
+                parte = cls.conteudo[inicio:fim + 1]
+                self.send_response(206)
+                self.send_header("Content-Range", f"bytes {inicio}-{fim}/{len(cls.conteudo)}")
+            else:
+                parte = cls.conteudo
+                self.send_response(200)
+            self.send_header("Content-Length", str(len(parte)))
+            self.end_headers()
+            self.wfile.write(parte)
+        finally:
+            with cls.lock:
+                cls.ativas -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def servidor():
+    """Sobe o servidor local e retorna (handler, url do arquivo)."""
+    handler = type("Handler", (_ArquivoComRange,), {
+        "conteudo": os.urandom(1_000_003), "lock": threading.Lock(), "intervalos": [],
+    })
+    httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield handler, f"http://127.0.0.1:{httpd.server_address[1]}/planilha.xlsx"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+class _Requisicao:
+    def __init__(self, uri):
+        self.uri = uri
+        # Como googleapiclient, cada requisição traz seu próprio cliente HTTP
+        self.http = httplib2.Http()
+        self.headers = {}
+
+
+class DriveHttp:
+    """Imitação do Drive cujo get_media aponta para o servidor local."""
+
+    def __init__(self, url):
+        self.url = url
+        self.downloads = 0
+
+    def files(self):
+        return self
+
+    def get_media(self, fileId):
+        self.downloads += 1
+        return _Requisicao(self.url)
+
+
+def test_intervalos_paralelos_reconstroem_o_arquivo(servidor):
+    handler, url = servidor
+    handler.latencia = 0.05
+
+    buffer = data_loader.baixar_intervalos_paralelos(
+        httplib2.Http, url, len(handler.conteudo), tamanho_parte=100_000, max_conexoes=4)
+
+    assert bytes(buffer) == handler.conteudo
+    assert sorted(handler.intervalos) == [(i, min(i + 99_999, len(handler.conteudo) - 1))
+                                          for i in range(0, len(handler.conteudo), 100_000)]
+    assert 1 < handler.pico <= 4
+    estatisticas = data_loader.estatisticas_download()
+    assert estatisticas["paralelo"] and estatisticas["bytes"] == len(handler.conteudo)
+    assert estatisticas["mb_por_segundo"] > 0
+
+
+def test_servidor_sem_range_gera_erro(servidor):
+    handler, url = servidor
+    handler.aceita_range = False
+
+    with pytest.raises(IOError):
+        data_loader.baixar_intervalos_paralelos(httplib2.Http, url, len(handler.conteudo), tamanho_parte=100_000)
+
+
+def test_baixar_arquivo_grande_usa_intervalos(servidor, monkeypatch):
+    handler, url = servidor
+    monkeypatch.setattr(data_loader, "LIMITE_DOWNLOAD_PARALELO", 500_000)
+
+    buffer = data_loader.baixar_arquivo(DriveHttp(url), "planilha", str(len(handler.conteudo)))
+
+    assert buffer.getvalue() == handler.conteudo
+    assert handler.intervalos == [(0, len(handler.conteudo) - 1)]
+    assert data_loader.estatisticas_download()["paralelo"]
+
+
+def test_baixar_arquivo_recorre_ao_download_sequencial(servidor, monkeypatch):
+    handler, url = servidor
+    handler.aceita_range = False
+    monkeypatch.setattr(data_loader, "LIMITE_DOWNLOAD_PARALELO", 500_000)
+
+    buffer = data_loader.baixar_arquivo(DriveHttp(url), "planilha", str(len(handler.conteudo)))
+
+    assert buffer.getvalue() == handler.conteudo
+    assert not data_loader.estatisticas_download()["paralelo"]
+
+
+def test_arquivo_pequeno_e_baixado_sequencialmente(servidor):
+    handler, url = servidor
+
+    buffer = data_loader.baixar_arquivo(DriveHttp(url), "planilha", str(len(handler.conteudo)))
+
+    assert buffer.getvalue() == handler.conteudo
+    assert not data_loader.estatisticas_download()["paralelo"]
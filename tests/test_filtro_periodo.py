@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_processing import filtrar_dados_por_periodo, obter_indice_datas, ordenar_por_data
+
+
+def filtro_por_mascara(df, data_inicial, data_final, coluna):
+    datas = df[coluna]
+    return df[(datas >= pd.Timestamp(data_inicial)) & (datas <= pd.Timestamp(data_final))]
+
+
+@pytest.fixture
+def multas():
+    rng = np.random.default_rng(0)
+    n = 2_000
+    inicio = pd.Timestamp("2024-01-01")
+    df = pd.DataFrame({
+        'Dia da Consulta': inicio + pd.to_timedelta(rng.integers(0, 365, n), unit="D"),
+        'Data da Infração': inicio + pd.to_timedelta(rng.integers(0, 365, n), unit="D"),
+        'Valor a ser pago R$': rng.integers(100, 5_000, n) / 10,
+    })
+    df.loc[::97, 'Data da Infração'] = pd.NaT
+    df.attrs["versao_dados"] = "teste"
+    return ordenar_por_data(df)
+
+
+@pytest.mark.parametrize("coluna", ['Dia da Consulta', 'Data da Infração'])
+def test_filtro_igual_a_mascara(multas, coluna):
+    resultado = filtrar_dados_por_periodo(multas, "2024-03-01", "2024-06-30", coluna)
+    pd.testing.assert_frame_equal(resultado, filtro_por_mascara(multas, "2024-03-01", "2024-06-30", coluna))
+
+
+@pytest.mark.parametrize("coluna", ['Dia da Consulta', 'Data da Infração'])
+def test_filtro_de_fatia_filtrada(multas, coluna):
+    # Fatias herdam attrs (inclusive a versão dos dados) e podem ter o mesmo tamanho
+    fatia_a = filtrar_dados_por_periodo(multas, "2024-01-01", "2024-06-30", 'Dia da Consulta')
+    fatia_b = multas.iloc[-len(fatia_a):]
+    assert len(fatia_a) == len(fatia_b)
+    for fatia in (fatia_a, fatia_b, fatia_a):
+        resultado = filtrar_dados_por_periodo(fatia, "2024-04-01", "2024-05-15", coluna)
+        pd.testing.assert_frame_equal(resultado, filtro_por_mascara(fatia, "2024-04-01", "2024-05-15", coluna))
+
+
+@pytest.mark.parametrize("coluna", ['Dia da Consulta', 'Data da Infração'])
+def test_filtro_de_frame_reordenado(multas, coluna):
+    reordenado = multas.sort_values('Valor a ser pago R$')
+    resultado = filtrar_dados_por_periodo(reordenado, "2024-02-10", "2024-08-20", coluna)
+    pd.testing.assert_frame_equal(resultado, filtro_por_mascara(reordenado, "2024-02-10", "2024-08-20", coluna))
+
+
+def test_permutacao_refeita_quando_a_coluna_muda(multas):
+    obter_indice_datas(multas, 'Data da Infração')
+    multas['Data da Infração'] = multas['Data da Infração'] + pd.Timedelta(days=400)
+    resultado = filtrar_dados_por_periodo(multas, "2025-03-01", "2025-06-30", 'Data da Infração')
+    pd.testing.assert_frame_equal(resultado, filtro_por_mascara(multas, "2025-03-01", "2025-06-30", 'Data da Infração'))
+
+
+def test_frame_ordenado_nao_e_copiado(multas):
+    assert ordenar_por_data(multas) is multas
+    assert obter_indice_datas(multas, 'Dia da Consulta')[1] is None
@@ -0,0 +1,110 @@
+import time
+
+import pytest
+
+import geo_utils
+from cache_manager import JsonFileCache, MemoryLRUCache
+from helpers import coordenadas_sinteticas, opencage_local, servidor_opencage_local
+
+LOCAIS = [f"RUA {i} -CIDADE {i % 5}" for i in range(30)]
+
+
+def esperado(local):
+    coordenadas = coordenadas_sinteticas(local)
+    return coordenadas["lat"], coordenadas["lng"]
+
+
+@pytest.fixture(autouse=True)
+def sessao_propria(monkeypatch):
+    # Cada teste usa uma sessão HTTP nova, apontada para o seu próprio servidor
+    monkeypatch.setattr(geo_utils, "_session", None)
+
+
+def test_limitador_respeita_a_cota():
+    # A folga cobre o atraso entre a liberação da ficha no cliente e a chegada ao servidor
+    handler = opencage_local(cota=10, folga=2, latencia=0.02)
+    with servidor_opencage_local(handler):
+        inicio = time.perf_counter()
+        resultado = geo_utils.geocode_concurrently(LOCAIS, "chave", max_workers=8, rate_limit=10, backoff=0.01)
+        segundos = time.perf_counter() - inicio
+
+    assert resultado == {local: esperado(local) for local in LOCAIS}
+    assert handler.respostas_429 == 0
+    assert handler.chamadas == len(LOCAIS)
+    # Rajada de 10 e depois 10 por segundo: os 20 restantes levam ao menos 2s
+    assert segundos >= 1.9
+
+
+def test_respostas_429_sao_repetidas_com_espera():
+    handler = opencage_local(cota=10, latencia=0.02)
+    with servidor_opencage_local(handler):
+        resultado = geo_utils.geocode_concurrently(
+            LOCAIS, "chave", max_workers=8, rate_limit=1_000, max_retries=10, backoff=0.05)
+
+    assert resultado == {local: esperado(local) for local in LOCAIS}
+    assert handler.respostas_429 > 0
+    assert handler.chamadas == len(LOCAIS) + handler.respostas_429
+
+
+def test_falhas_temporarias_5xx_sao_repetidas():
+    handler = opencage_local(falhas_por_local=2)
+    with servidor_opencage_local(handler):
+        resultado = geo_utils.geocode_concurrently(LOCAIS[:5], "chave", rate_limit=1_000, backoff=0.01)
+
+    assert resultado == {local: esperado(local) for local in LOCAIS[:5]}
+    assert handler.respostas_503 == 10
+    assert handler.chamadas == 15
+
+
+def test_falha_persistente_fica_fora_do_cache():
+    handler = opencage_local(falhas_por_local=100)
+    cache = MemoryLRUCache()
+    with servidor_opencage_local(handler):
+        coordenadas = geo_utils.get_coordinates_batch(
+            ["RUA 1 -CIDADE 1"], "chave", cache, rate_limit=1_000, max_retries=2, backoff=0.01)
+
+    assert coordenadas == {"RUA 1 -CIDADE 1": (None, None)}
+    assert handler.chamadas == 3
+    assert len(cache) == 0
+
+
+def test_consultas_concorrentes_sobrepoem_a_latencia():
+    handler = opencage_local(latencia=0.3)
+    with servidor_opencage_local(handler):
+        inicio = time.perf_counter()
+        geo_utils.geocode_concurrently(LOCAIS[:8], "chave", max_workers=8, rate_limit=1_000)
+        segundos = time.perf_counter() - inicio
+
+    # Em série seriam 8 x 0,3s
+    assert segundos < 1.2
+
+
+def test_local_sem_resultado_e_cacheado_como_negativo(tmp_path):
+    handler = opencage_local()
+    cache = JsonFileCache(str(tmp_path / "coordinates_cache.json"))
+    locais = ["SEM RESULTADO 1", "RUA 1 -CIDADE 1"]
+    with servidor_opencage_local(handler):
+        primeira = geo_utils.get_coordinates_batch(locais, "chave", cache, rate_limit=1_000)
+        segunda = geo_utils.get_coordinates_batch(locais, "chave", cache, rate_limit=1_000)
+
+    assert primeira == segunda == {"SEM RESULTADO 1": (None, None), "RUA 1 -CIDADE 1": esperado("RUA 1 -CIDADE 1")}
+    assert JsonFileCache(cache.path).get_many(["SEM RESULTADO 1"]) == {"SEM RESULTADO 1": None}
+    assert handler.chamadas == 2
+
+
+def test_local_avulso_usa_o_caminho_com_repeticao():
+    handler = opencage_local(falhas_por_local=1)
+    cache = MemoryLRUCache()
+    opcoes = {"rate_limit": 1_000, "backoff": 0.01}
+    with servidor_opencage_local(handler):
+        coordenadas = geo_utils.get_cached_coordinates("Rua 1 -Cidade 1", "chave", cache, **opcoes)
+        sem_resultado = geo_utils.get_cached_coordinates("SEM RESULTADO 2", "chave", cache, **opcoes)
+        repetido = geo_utils.get_cached_coordinates("SEM RESULTADO 2", "chave", cache, **opcoes)
+
+    assert coordenadas == esperado("Rua 1 -Cidade 1")
+    assert sem_resultado == repetido == (None, None)
+    assert cache.get_many(["RUA 1-CIDADE 1", "SEM RESULTADO 2"]) == {
+        "RUA 1-CIDADE 1": coordenadas, "SEM RESULTADO 2": None}
+    assert len(cache) == 2
+    assert handler.respostas_503 == 2
+    assert handler.chamadas == 4
@@ -0,0 +1,69 @@
+import pandas as pd
+import pytest
+
+import data_loader
+from daily_cube import DailyCube
+from data_processing import calcular_ranking_localidades, filtrar_dados_por_periodo
+from graph_common_infractions import create_common_infractions_chart, create_common_infractions_figure
+from graph_fines_accumulated import create_fines_accumulated_chart
+from graph_vehicles_fines import create_vehicle_fines_chart
+from graph_weekday_infractions import create_weekday_infractions_chart, create_weekday_infractions_figure
+from helpers import gerar_frame_multas_sintetico
+
+GRAFICOS = {
+    "infracoes": create_common_infractions_chart,
+    "acumulado_mensal": lambda df: create_fines_accumulated_chart(df, 'M'),
+    "acumulado_semanal": lambda df: create_fines_accumulated_chart(df, 'W'),
+    "veiculos": create_vehicle_fines_chart,
+    "dia_semana": create_weekday_infractions_chart,
+}
+
+PERIODOS = [("2024-01-01", "2024-12-31"), ("2024-03-10", "2024-03-10"), ("2024-05-01", "2024-08-15")]
+
+
+@pytest.fixture(scope="module")
+def frames():
+    """Retorna (texto, codificado): o mesmo frame com as colunas categóricas como texto e codificadas."""
+    codificado = gerar_frame_multas_sintetico(4_000, n_dias=200, seed=5)
+    texto = codificado.astype({col: "str" for col in data_loader.COLUNAS_CATEGORICAS})
+    return texto, data_loader.codificar_colunas_categoricas(texto.copy())
+
+
+@pytest.mark.parametrize("nome", GRAFICOS)
+def test_graficos_iguais_com_e_sem_categorias(frames, nome):
+    texto, codificado = frames
+    assert not isinstance(texto['Local da Infração'].dtype, pd.CategoricalDtype)
+
+    assert GRAFICOS[nome](codificado).to_json() == GRAFICOS[nome](texto).to_json()
+
+
+@pytest.mark.parametrize("data_inicial, data_final", PERIODOS)
+def test_graficos_do_cubo_iguais_aos_do_texto(frames, data_inicial, data_final):
+    texto, codificado = frames
+    cubo = DailyCube(codificado)
+    periodo = filtrar_dados_por_periodo(texto, pd.Timestamp(data_inicial), pd.Timestamp(data_final))
+
+    assert create_common_infractions_figure(cubo.infraction_frequencies(data_inicial, data_final)).to_json() \
+        == create_common_infractions_chart(periodo).to_json()
+    assert create_weekday_infractions_figure(cubo.weekday_counts(data_inicial, data_final)).to_json() \
+        == create_weekday_infractions_chart(periodo).to_json()
+
+
+def test_ranking_igual_com_e_sem_categorias(frames):
+    texto, codificado = frames
+
+    esperado = calcular_ranking_localidades(texto).reset_index(drop=True)
+    ranking = calcular_ranking_localidades(codificado).reset_index(drop=True)
+
+    pd.testing.assert_frame_equal(ranking.astype({'Local da Infração': "str"}), esperado)
+
+
+def test_relatorio_de_memoria_por_coluna(frames):
+    texto, _ = frames
+    data_loader.codificar_colunas_categoricas(texto.copy())
+
+    relatorio = data_loader.relatorio_memoria_categorias()
+
+    assert list(relatorio['Coluna']) == data_loader.COLUNAS_CATEGORICAS
+    assert (relatorio['Bytes depois'] < relatorio['Bytes antes']).all()
+    assert relatorio.set_index('Coluna').loc['Status de Pagamento', 'Valores distintos'] == 1
@@ -0,0 +1,80 @@
+import pandas as pd
+import pytest
+
+import graph_common_infractions
+import graph_fines_accumulated
+import graph_vehicles_fines
+import graph_weekday_infractions
+from data_processing import validar_frame_multas
+from helpers import gerar_frame_multas_sintetico
+
+GRAFICOS = {
+    "infracoes": graph_common_infractions.create_common_infractions_chart,
+    "acumulado_mensal": lambda df: graph_fines_accumulated.create_fines_accumulated_chart(df, 'M'),
+    "acumulado_semanal": lambda df: graph_fines_accumulated.create_fines_accumulated_chart(df, 'W'),
+    "veiculos": graph_vehicles_fines.create_vehicle_fines_chart,
+    "dia_semana": graph_weekday_infractions.create_weekday_infractions_chart,
+}
+
+MODULOS_COM_CONVERSAO = [graph_fines_accumulated, graph_vehicles_fines, graph_weekday_infractions]
+
+
+@pytest.fixture(scope="module")
+def frame():
+    return validar_frame_multas(gerar_frame_multas_sintetico(5_000, seed=3))
+
+
+@pytest.fixture
+def copias(monkeypatch):
+    """Registra o formato de cada DataFrame copiado com DataFrame.copy."""
+    registro = []
+    copiar = pd.DataFrame.copy
+
+    def copy(self, deep=True):
+        registro.append(self.shape)
+        return copiar(self, deep)
+
+    monkeypatch.setattr(pd.DataFrame, "copy", copy)
+    return registro
+
+
+@pytest.fixture
+def conversoes(monkeypatch):
+    """Registra, para cada conversão de coluna feita pelos gráficos, se a coluna foi devolvida sem alteração."""
+    registro = []
+    for modulo in MODULOS_COM_CONVERSAO:
+        for nome in ("process_date_column", "process_currency_column"):
+            if not hasattr(modulo, nome):
+                continue
+
+            def espiar(serie, *args, _converter=getattr(modulo, nome), _nome=nome, **kwargs):
+                resultado = _converter(serie, *args, **kwargs)
+                registro.append((_nome, serie.name, resultado is serie))
+                return resultado
+
+            monkeypatch.setattr(modulo, nome, espiar)
+    return registro
+
+
+@pytest.mark.parametrize("nome", GRAFICOS)
+def test_grafico_nao_copia_o_frame(frame, copias, nome):
+    GRAFICOS[nome](frame)
+
+    assert [forma for forma in copias if forma[0] == len(frame)] == []
+
+
+@pytest.mark.parametrize("nome", GRAFICOS)
+def test_grafico_nao_reconverte_colunas(frame, conversoes, nome):
+    GRAFICOS[nome](frame)
+
+    assert all(sem_alteracao for _, _, sem_alteracao in conversoes), conversoes
+
+
+@pytest.mark.parametrize("nome", GRAFICOS)
+def test_grafico_nao_altera_o_frame(frame, nome):
+    antes = frame.copy()
+
+    GRAFICOS[nome](frame)
+
+    pd.testing.assert_frame_equal(frame, antes)
+    validar_frame_multas(frame)
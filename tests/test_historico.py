@@ -0,0 +1,71 @@
+import json
+import os
+
+import openpyxl
+import pytest
+
+import data_loader
+from helpers import DriveLocal, gerar_planilha_sintetica
+from data_loader import DadosInvalidos, load_data_historico
+
+
+def salvar_planilha(pasta, nome, linhas):
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    for linha in linhas:
+        sheet.append(linha)
+    workbook.save(os.path.join(pasta, nome))
+
+
+@pytest.fixture
+def pasta(tmp_path, monkeypatch):
+    # Os arquivos locais do carregador (.cache_dados) ficam no diretório de trabalho
+    trabalho = tmp_path / "trabalho"
+    trabalho.mkdir()
+    monkeypatch.chdir(trabalho)
+    pasta = tmp_path / "drive"
+    pasta.mkdir()
+    return str(pasta)
+
+
+def test_pasta_mista_ignora_planilhas_invalidas(pasta):
+    with open(os.path.join(pasta, "a_valida.xlsx"), "wb") as f:
+        f.write(gerar_planilha_sintetica(200, seed=1).getbuffer())
+    salvar_planilha(pasta, "b_so_cabecalho.xlsx", [["Status de Pagamento", "Auto de Infração", "Dia da Consulta",
+                                                     "Data da Infração", "Valor a ser pago R$", "Local da Infração"]])
+    salvar_planilha(pasta, "c_outra_planilha.xlsx", [["Produto", "Quantidade"], ["Parafuso", 10]])
+    with open(os.path.join(pasta, "d_corrompida.xlsx"), "wb") as f:
+        f.write(b"isto nao e um xlsx")
+
+    df = load_data_historico(DriveLocal(pasta), "pasta")
+    esperado = data_loader.carregar_multas_nao_pagas(gerar_planilha_sintetica(200, seed=1))
+    assert set(df['Auto de Infração']) == set(esperado['Auto de Infração'])
+
+    with open(data_loader.ESTADO_HISTORICO_FILE) as f:
+        estado = json.load(f)
+    assert set(estado["ignoradas"]) == {"b_so_cabecalho.xlsx", "c_outra_planilha.xlsx", "d_corrompida.xlsx"}
+    assert "Faltam as colunas" in estado["ignoradas"]["c_outra_planilha.xlsx"]
+    assert estado["resumo"]["planilhas_lidas"] == 1
+
+
+def test_planilhas_invalidas_nao_sao_relidas(pasta, monkeypatch):
+    with open(os.path.join(pasta, "a_valida.xlsx"), "wb") as f:
+        f.write(gerar_planilha_sintetica(50).getbuffer())
+    salvar_planilha(pasta, "b_outra_planilha.xlsx", [["Produto"], ["Parafuso"]])
+    primeira = load_data_historico(DriveLocal(pasta), "pasta")
+
+    def falhar(*args, **kwargs):
+        raise AssertionError("nenhuma planilha deveria ser relida")
+
+    monkeypatch.setattr(data_loader, "ler_planilhas_historico", falhar)
+    segunda = load_data_historico(DriveLocal(pasta), "pasta")
+    assert segunda.attrs == primeira.attrs
+    assert len(segunda) == len(primeira)
+
+
+def test_falha_apenas_sem_planilha_valida(pasta):
+    salvar_planilha(pasta, "a_outra_planilha.xlsx", [["Produto"], ["Parafuso"]])
+    with open(os.path.join(pasta, "b_corrompida.xlsx"), "wb") as f:
+        f.write(b"")
+    with pytest.raises(DadosInvalidos, match="não possui planilhas com linhas válidas"):
+        load_data_historico(DriveLocal(pasta), "pasta")
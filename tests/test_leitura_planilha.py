@@ -0,0 +1,73 @@
+import io
+import tracemalloc
+
+import numpy as np
+import openpyxl
+import pandas as pd
+import pytest
+
+import data_loader
+from helpers import gerar_planilha_sintetica
+from data_loader import carregar_multas_nao_pagas, hash_linhas, ler_planilha_em_lotes
+
+MOTORES = ["openpyxl", pytest.param("calamine", marks=pytest.mark.skipif(
+    data_loader.motor_planilha_padrao() != "calamine", reason="python-calamine não instalado"))]
+
+
+@pytest.fixture(scope="module")
+def planilha():
+    return gerar_planilha_sintetica(1_200, seed=3).getvalue()
+
+
+@pytest.mark.parametrize("motor", MOTORES)
+def test_lotes_respeitam_o_tamanho(planilha, motor):
+    lotes = list(ler_planilha_em_lotes(io.BytesIO(planilha), tamanho_lote=500, motor=motor))
+    assert [len(lote) for lote in lotes] == [500, 500, 200]
+    assert set(lotes[0].columns) <= set(data_loader.COLUNAS_PLANILHA)
+
+
+def test_motores_geram_os_mesmos_lotes(planilha):
+    if data_loader.motor_planilha_padrao() != "calamine":
+        pytest.skip("python-calamine não instalado")
+    openpyxl_ = pd.concat(ler_planilha_em_lotes(io.BytesIO(planilha), motor="openpyxl"), ignore_index=True)
+    calamine = pd.concat(ler_planilha_em_lotes(io.BytesIO(planilha), motor="calamine"), ignore_index=True)
+    pd.testing.assert_frame_equal(openpyxl_, calamine[openpyxl_.columns], check_dtype=False)
+    # A base incremental reconhece as mesmas linhas com qualquer motor
+    np.testing.assert_array_equal(hash_linhas(openpyxl_), hash_linhas(calamine))
+
+
+@pytest.mark.parametrize("motor", MOTORES)
+def test_carga_usa_o_motor_escolhido(planilha, motor, monkeypatch):
+    monkeypatch.setattr(data_loader, "motor_planilha_padrao", lambda: motor)
+    chamados = []
+    for nome, leitor in list(data_loader.LEITORES_LOTES_PLANILHA.items()):
+        monkeypatch.setitem(data_loader.LEITORES_LOTES_PLANILHA, nome,
+                            lambda *a, _nome=nome, _leitor=leitor, **k: chamados.append(_nome) or _leitor(*a, **k))
+    df = carregar_multas_nao_pagas(io.BytesIO(planilha))
+    assert (df['Status de Pagamento'] == 'NÃO PAGO').all()
+    assert chamados == [motor]
+
+
+@pytest.mark.parametrize("motor", MOTORES)
+def test_planilha_so_com_cabecalho_nao_gera_lotes(motor):
+    workbook = openpyxl.Workbook(write_only=True)
+    workbook.create_sheet().append(["Status de Pagamento", "Auto de Infração"])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    assert list(ler_planilha_em_lotes(io.BytesIO(buffer.getvalue()), motor=motor)) == []
+
+
+def test_pico_de_memoria_acompanha_o_tamanho_do_lote():
+    # Leitor padrão, o usado na carga; com o calamine, só o lote atual vira objetos Python
+    planilha = gerar_planilha_sintetica(4_000, seed=4).getvalue()
+
+    def pico(tamanho_lote):
+        tracemalloc.start()
+        try:
+            for _ in ler_planilha_em_lotes(io.BytesIO(planilha), tamanho_lote=tamanho_lote):
+                pass
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    assert pico(200) * 3 < pico(4_000)
@@ -0,0 +1,23 @@
+import numpy as np
+import pandas as pd
+
+from graph_geo_distribution import _mercator_lat, fines_in_hex_cell, hexbin_fines
+
+
+def test_clique_no_hexagono_seleciona_as_multas_da_celula():
+    rng = np.random.default_rng(3)
+    map_data = pd.DataFrame({
+        'Latitude': rng.uniform(-23.7, -23.4, 2_000),
+        'Longitude': rng.uniform(-46.8, -46.4, 2_000),
+        'Valor a ser pago R$': rng.uniform(100, 1_000, 2_000),
+    })
+    celulas = hexbin_fines(map_data['Latitude'], map_data['Longitude'], map_data['Valor a ser pago R$'], zoom=11)
+    maior = int(np.argmax(celulas["count"]))
+
+    # Clique perto do centro do hexágono, fora de qualquer marcador
+    lat = _mercator_lat(celulas["y"][maior] + celulas["size"] / 4)
+    lng = celulas["x"][maior] - celulas["size"] / 4
+    selecionadas = fines_in_hex_cell(map_data, lat, lng, zoom=11)
+
+    assert len(selecionadas) == celulas["count"][maior]
+    assert np.isclose(selecionadas['Valor a ser pago R$'].sum(), celulas["total"][maior])
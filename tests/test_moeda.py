@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_loader import _converter_textos_moeda, process_currency_column
+from helpers import formatar_real
+
+CASOS_TEXTO = [
+    # Separadores de milhar
+    ("R$ 1.234,56", 1234.56),
+    ("R$ 1.234.567,89", 1234567.89),
+    ("R$ 1.000.000,00", 1000000.0),
+    ("R$ 1.234.567", 1234567.0),
+    ("1.234", 1234.0),
+    ("10.000", 10000.0),
+    # Sem 'R$'
+    ("1.234,56", 1234.56),
+    ("1234,56", 1234.56),
+    ("0,01", 0.01),
+    ("1234.56", 1234.56),
+    ("1.5", 1.5),
+    ("88", 88.0),
+    # Casas decimais incompletas e espaços
+    ("R$ 0,5", 0.5),
+    ("R$ 12,3", 12.3),
+    (" R$  99,90 ", 99.9),
+    ("R$ 1.234,56", 1234.56),
+    # Negativos
+    ("-R$ 1.234,56", -1234.56),
+    ("R$ -1.234,56", -1234.56),
+    ("- 5,00", -5.0),
+    ("-0,50", -0.5),
+    # Sem dígitos
+    ("", np.nan),
+    ("R$", np.nan),
+    ("não informado", np.nan),
+]
+
+
+@pytest.mark.parametrize("texto, esperado", CASOS_TEXTO)
+def test_converter_textos_moeda(texto, esperado):
+    np.testing.assert_equal(_converter_textos_moeda(np.array([texto]))[0], esperado)
+
+
+def test_converter_textos_moeda_em_lote():
+    textos = np.array([texto for texto, _ in CASOS_TEXTO])
+
+    np.testing.assert_array_equal(_converter_textos_moeda(textos), [valor for _, valor in CASOS_TEXTO])
+
+
+def test_converter_textos_moeda_vazio():
+    assert _converter_textos_moeda(np.array([], dtype=str)).shape == (0,)
+
+
+@pytest.mark.parametrize("valores, dtype, esperado", [
+    # Texto, inclusive com ausentes (None, NaN e pd.NA)
+    (["R$ 1,00", None, "R$ 2.000,50"], object, [1.0, np.nan, 2000.5]),
+    (["R$ 1,00", np.nan, "-R$ 3,00"], object, [1.0, np.nan, -3.0]),
+    (["R$ 1,00", pd.NA, "R$ 1,00"], "str", [1.0, np.nan, 1.0]),
+    (["R$ 1,00", "R$ 1,00", None], "category", [1.0, 1.0, np.nan]),
+    # Tipos mistos: números são mantidos, textos convertidos, o resto vira NaN
+    ([1, 2.5, "R$ 3,00", None, -4], object, [1.0, 2.5, 3.0, np.nan, -4.0]),
+    ([np.float32(1.5), "1.234,56", "sem valor"], object, [1.5, 1234.56, np.nan]),
+    # Já numéricos
+    ([1, 2, -3], "int64", [1.0, 2.0, -3.0]),
+    ([], object, []),
+])
+def test_process_currency_column(valores, dtype, esperado):
+    serie = pd.Series(valores, dtype=dtype, name="Valor a ser pago R$", index=range(10, 10 + len(valores)))
+
+    resultado = process_currency_column(serie)
+
+    assert resultado.dtype == np.float64
+    assert resultado.name == serie.name
+    assert resultado.index.equals(serie.index)
+    np.testing.assert_array_equal(resultado.to_numpy(), esperado)
+
+
+def test_coluna_float_e_devolvida_sem_copia():
+    serie = pd.Series([1.5, np.nan, -2.0])
+
+    assert process_currency_column(serie) is serie
+
+
+def test_valores_formatados_positivos_e_negativos():
+    centavos = np.random.default_rng(0).integers(-10_000_000_000, 10_000_000_000, 5_000)
+    textos = pd.Series([("-" if c < 0 else "") + formatar_real(abs(c)) for c in centavos])
+
+    np.testing.assert_array_equal(process_currency_column(textos).to_numpy(), centavos / 100)
@@ -0,0 +1,36 @@
+import json
+
+import pytest
+
+import geo_utils
+
+
+@pytest.mark.parametrize("local, esperado", [
+    ("RODOVIA BR 101 414KM 900M NORTE -ITAGUAI", "BR-101 KM-414 -ITAGUAI"),
+    ("RODOVIA BR 101 414KM 900M SUL -ITAGUAI", "BR-101 KM-414 -ITAGUAI"),
+    ("Rodovia BR 101 414Km 900m SUL -ITAGUAI", "BR-101 KM-414 -ITAGUAI"),
+    ("ROD. BR-116 KM 383 -São Paulo", "BR-116 KM-383 -SAO PAULO"),
+    ("Avenida  Brasil,  500 - Rio de Janeiro", "AVENIDA BRASIL 500-RIO DE JANEIRO"),
+])
+def test_normalize_address(local, esperado):
+    assert geo_utils.normalize_address(local) == esperado
+
+
+def test_migracao_regrava_o_arquivo_informado(tmp_path, monkeypatch):
+    padrao = tmp_path / "padrao.json"
+    monkeypatch.setattr(geo_utils, "CACHE_FILE", str(padrao))
+    caminho = tmp_path / "coordinates_cache.json"
+    caminho.write_text(json.dumps({
+        "RODOVIA BR 101 414KM 900M NORTE -ITAGUAI": None,
+        "RODOVIA BR 101 414KM 900M SUL -ITAGUAI": [-22.8, -43.7],
+        "Rodovia BR 101 414Km 900m SUL -ITAGUAI": [-22.9, -43.8],
+        "Rua 1 -Cidade": [-10.0, -40.0],
+    }))
+
+    relatorio = geo_utils.migrate_cache_file(str(caminho))
+
+    assert relatorio == {"enderecos_originais": 4, "enderecos_normalizados": 2, "consultas_economizadas": 2}
+    # Prevalece a primeira variante com coordenadas
+    assert json.loads(caminho.read_text()) == {"BR-101 KM-414 -ITAGUAI": [-22.8, -43.7], "RUA 1-CIDADE": [-10.0, -40.0]}
+    assert geo_utils.CACHE_FILE == str(padrao)
+    assert not padrao.exists()